@@ -1,13 +1,24 @@
 import streamlit as st
 import os
 import pandas as pd
-from main import scan_and_process, append_to_master
+from main import (
+    scan_and_process, append_to_master, recategorize_keyword, recategorize_all,
+    master_exists, read_master, use_partitioned_ledger, open_ledger, search_transactions, get_master_store,
+    LEDGER_DIR, STATEMENT_FINGERPRINTS_FILE, SEARCH_INDEX_FILE
+)
+from processors.scan_jobs import ScanJobManager
+from processors.ingest import UploadIngestor
+from utils.export_utils import EXPORT_FORMATS, export_bytes
+from utils.file_utils import is_statement_file
+from utils.schema_utils import with_rupees
 import shutil
+import time
 
 st.set_page_config(page_title="Personal Finance Analyzer", page_icon="💰", layout="wide")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RAW_DIR = os.path.join(BASE_DIR, 'data', 'raw_pdfs')
+PROCESSED_DIR = os.path.join(BASE_DIR, 'data', 'processed')
 MASTER_FILE = os.path.join(BASE_DIR, 'data', 'master_transactions.xlsx')
 
 st.title("💰 Offline Personal Finance Analyzer")
@@ -16,6 +27,49 @@ st.markdown("Upload your Bank, Credit Card, or Wallet statements to analyze your
 # Initialize session state for staging data
 if 'staging_data' not in st.session_state:
     st.session_state['staging_data'] = None
+if 'scan_job_id' not in st.session_state:
+    st.session_state['scan_job_id'] = None
+if 'ingestor' not in st.session_state:
+    # Uploads stay in memory (hash-deduplicated) until committed or explicitly saved
+    st.session_state['ingestor'] = UploadIngestor(RAW_DIR, PROCESSED_DIR)
+    st.session_state['upload_results'] = {}
+ingestor = st.session_state['ingestor']
+
+@st.cache_resource
+def get_scan_manager():
+    # One worker pool per server process, shared across reruns and sessions
+    return ScanJobManager(scan_and_process, max_workers=2)
+
+@st.cache_data(max_entries=4, show_spinner="Preparing download...")
+def build_export(fmt, signature, sources=None, years=None):
+    """
+    Export bytes of the master (or the selected partitions). Cached per master
+    signature, so unchanged data is serialized once, not on every rerun.
+    """
+    if fmt == "xlsx" and not use_partitioned_ledger():
+        # The workbook on disk already is the export
+        with open(MASTER_FILE, "rb") as f:
+            return f.read()
+    return export_bytes(read_master(sources=sources, years=years), fmt)
+
+def sync_staging_from_job():
+    """
+    Copies the rows of the current scan job into the staging area so the
+    preview fills in file by file while the job is still running.
+    Returns True while the job is still active.
+    """
+    job_id = st.session_state['scan_job_id']
+    job = get_scan_manager().get(job_id) if job_id else None
+    if job is None:
+        return False
+    if job.is_active or not st.session_state.get('scan_job_synced'):
+        results = job.results()
+        st.session_state['staging_data'] = results if not results.empty else None
+        # Stop overwriting staging (e.g. after "Remove") once the final results are in
+        st.session_state['scan_job_synced'] = not job.is_active
+    return job.is_active
+
+scan_running = sync_staging_from_job()
 
 # Sidebar for controls
 with st.sidebar:
@@ -41,43 +95,73 @@ with st.sidebar:
     if selected_source != "Auto":
         final_source = custom_source if selected_source == "Other" else selected_source
 
+    with st.expander("Advanced"):
+        low_memory = st.checkbox("Low-memory mode", help="Release each page as soon as it is parsed. Use for statements with hundreds of pages.")
+        rss_budget_mb = st.number_input("Memory budget per file (MB, 0 = unlimited)", min_value=0, value=0, step=128)
+        reingest = st.checkbox("Re-ingest already ingested statements",
+                               help="Scan statements whose issuer, account and period were already committed "
+                                    "(e.g. to recover the rest of a cancelled scan). Duplicates are still dropped.")
+    extractor_options = {}
+    if low_memory:
+        extractor_options['low_memory'] = True
+    if rss_budget_mb:
+        extractor_options['rss_budget_mb'] = rss_budget_mb
+    if reingest:
+        extractor_options['reingest'] = True
+
     # Step 1: Select Files
     import glob
-    # Get PDFs in raw folder
-    pdf_files = [f for f in os.listdir(RAW_DIR) if f.endswith('.pdf')]
+    # Get PDFs and CSV/XLS exports in raw folder
+    pdf_files = [f for f in os.listdir(RAW_DIR) if is_statement_file(f)]
+    # Uploaded (not yet saved) statements are scanned straight from memory
+    upload_targets = {f"📎 {stmt.name}": stmt for stmt in ingestor.staged.values()}
     
     selected_files = st.multiselect(
         "Select Files to Process", 
-        pdf_files, 
-        default=pdf_files,
+        list(upload_targets) + pdf_files, 
+        default=list(upload_targets) + pdf_files,
         help="Choose which files to scan."
     )
 
-    # Step 2: Scan and Preview
-    if st.button("🔎 Scan & Preview"):
+    # Step 2: Scan and Preview (runs as a background job, see bottom of page for polling)
+    scan_manager = get_scan_manager()
+    active_job = scan_manager.get(st.session_state['scan_job_id']) if st.session_state['scan_job_id'] else None
+
+    if active_job is not None and active_job.is_active:
+        progress, _ = active_job.snapshot()
+        st.write(f"Scanning **{progress['file'] or '...'}** "
+                 f"(file {progress['file_index']}/{progress['files']}, page {progress['page']}/{progress['pages']})")
+        st.progress(progress['file_index'] / max(progress['files'], 1))
+        st.caption(f"{progress['transactions']} new transactions so far")
+        if st.button("⏹️ Cancel Scan"):
+            active_job.cancel()
+    elif st.button("🔎 Scan & Preview"):
         if not selected_files:
             st.warning("Please select at least one file.")
         else:
-            with st.spinner("Scanning files..."):
-                try:
-                    # Construct full paths
-                    target_paths = [os.path.join(RAW_DIR, f) for f in selected_files]
-                    
-                    # Call scan with specific paths
-                    df_new, logs = scan_and_process(file_paths=target_paths, password=password, source=final_source)
-                    
-                    # Display logs
-                    with st.expander("Process Logs", expanded=True):
-                        for log in logs:
-                            st.markdown(log)
-                    
-                    if not df_new.empty:
-                        st.session_state['staging_data'] = df_new
-                        st.success(f"Found {len(df_new)} new transactions!")
-                    else:
-                        st.warning("No new transactions found.")
-                except Exception as e:
-                    st.error(f"Error during scanning: {e}")
+            # Construct full paths
+            target_paths = [upload_targets[f] if f in upload_targets else os.path.join(RAW_DIR, f) for f in selected_files]
+            job = scan_manager.submit(target_paths, password=password, source=final_source,
+                                     extractor_options=extractor_options)
+            st.session_state['scan_job_id'] = job.job_id
+            st.session_state['scan_job_synced'] = False
+            st.session_state['staging_data'] = None
+            st.rerun()
+
+    if active_job is not None and not active_job.is_active:
+        # Finished (or cancelled) job: show its logs once the results are staged
+        _, logs = active_job.snapshot()
+        with st.expander("Process Logs", expanded=False):
+            for log in logs:
+                st.markdown(log)
+        if active_job.status == "failed":
+            st.error(f"Error during scanning: {active_job.error}")
+        elif active_job.status == "cancelled":
+            st.warning(f"Scan cancelled. Kept {len(active_job.results())} transactions from the pages already scanned.")
+        elif st.session_state['staging_data'] is None or st.session_state['staging_data'].empty:
+            st.warning("No new transactions found.")
+        else:
+            st.success(f"Found {len(st.session_state['staging_data'])} new transactions!")
                 
     st.divider()
     
@@ -87,10 +171,11 @@ with st.sidebar:
         if st.button("💾 Add to Master Sheet"):
              with st.spinner("Saving to Master Record..."):
                  try:
-                     success = append_to_master(st.session_state['staging_data'])
+                     success = append_to_master(st.session_state['staging_data'], ingestor=ingestor)
                      if success:
                          st.success("Successfully saved to Master Sheet!")
                          st.session_state['staging_data'] = None # Clear staging
+                         st.session_state['scan_job_id'] = None
                          st.rerun()
                  except Exception as e:
                      st.error(f"Error saving: {e}")
@@ -116,31 +201,35 @@ with st.sidebar:
         if new_keyword and target_cat:
             success, existing_cat = cat_engine.add_keyword(target_cat, new_keyword)
             if success:
-                st.success(f"Added '{new_keyword}' to '{target_cat}'")
+                # Only rows containing the keyword can change category
+                updated = recategorize_keyword(new_keyword, categorizer=cat_engine)
+                st.success(f"Added '{new_keyword}' to '{target_cat}'. Updated {updated} existing transactions.")
             else:
                 st.error(f"Keyword '{new_keyword}' already exists in '{existing_cat}'")
+                st.session_state['move_keyword'] = (new_keyword, existing_cat)
         else:
             st.warning("Please enter both category and keyword.")
+
+    pending_move = st.session_state.get('move_keyword')
+    if pending_move and pending_move[0] == new_keyword and target_cat and target_cat != pending_move[1]:
+        if st.button(f"↪️ Move '{new_keyword}' from '{pending_move[1]}' to '{target_cat}'"):
+            cat_engine.move_keyword(new_keyword, target_cat)
+            updated = recategorize_keyword(new_keyword, categorizer=cat_engine)
+            st.session_state['move_keyword'] = None
+            st.success(f"Moved '{new_keyword}' to '{target_cat}'. Updated {updated} existing transactions.")
             
     if st.button("🔄 Re-categorize All Existing Data"):
-        if os.path.exists(MASTER_FILE):
+        if master_exists():
             with st.spinner("Re-applying categories to all transactions..."):
                 try:
-                    df = pd.read_excel(MASTER_FILE)
-                    if not df.empty:
-                        # Handle potential column name migration for old files
-                        if "Description" in df.columns and "Transaction made at" not in df.columns:
-                             df.rename(columns={"Description": "Transaction made at"}, inplace=True)
-                             
-                        if "Transaction made at" in df.columns:
-                            df['Category'] = df['Transaction made at'].apply(cat_engine.categorize)
-                            df.to_excel(MASTER_FILE, index=False)
-                            st.success("Successfully re-categorized all transactions!")
-                            st.rerun()
-                        else:
-                            st.error("Column 'Transaction made at' (or 'Description') not found in Master File.")
+                    count = recategorize_all(categorizer=cat_engine)
+                    if count:
+                        st.success("Successfully re-categorized all transactions!")
+                        st.rerun()
                     else:
                         st.warning("No data to re-categorize.")
+                except KeyError:
+                    st.error("Column 'Transaction made at' (or 'Description') not found in Master File.")
                 except Exception as e:
                     st.error(f"Error re-categorizing: {e}")
         else:
@@ -161,7 +250,7 @@ with st.sidebar:
         count = reset_processed_files(PROCESSED_DIR, RAW_DIR)
         
         # 2. Clear Master File
-        clear_data([], [MASTER_FILE])
+        clear_data([LEDGER_DIR], [MASTER_FILE, STATEMENT_FINGERPRINTS_FILE, SEARCH_INDEX_FILE])
         
         st.success(f"All data cleared! {count} files moved back to 'Pending' for re-scanning.")
         st.rerun()
@@ -171,21 +260,36 @@ col1, col2 = st.columns([1, 2])
 
 with col1:
     st.subheader("Upload Statements")
-    uploaded_files = st.file_uploader("Drop PDF files here", type="pdf", accept_multiple_files=True)
+    uploaded_files = st.file_uploader("Drop PDF statements or CSV/XLS exports here",
+                                      type=["pdf", "csv", "xls", "xlsx"], accept_multiple_files=True)
     
     if uploaded_files:
+        upload_results = st.session_state['upload_results']
+        newly_staged = False
         for uploaded_file in uploaded_files:
-            # Save uploaded file to raw_pdfs
-            if not os.path.exists(RAW_DIR):
-                os.makedirs(RAW_DIR)
-                
-            file_path = os.path.join(RAW_DIR, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            # Hash each upload once per session, not on every rerun
+            upload_key = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+            if upload_key not in upload_results:
+                statement, reason = ingestor.add(uploaded_file.name, uploaded_file.getvalue())
+                upload_results[upload_key] = (uploaded_file.name, reason)
+                newly_staged = newly_staged or reason is None
+
+        for name, reason in upload_results.values():
+            if reason == "staged":
+                st.caption(f"⏭️ {name}: same content is already uploaded.")
+            elif reason in ("raw", "processed"):
+                st.caption(f"⏭️ {name}: already in the {'processing' if reason == 'raw' else 'processed'} folder, skipped.")
+
+        if newly_staged:
+            # Refresh so the sidebar file list picks up the new uploads
+            st.rerun()
         
-        if st.button("Save to Processing Folder"):
-            st.success(f"Saved {len(uploaded_files)} files to {RAW_DIR}")
-            # Clear uploader state workaround (experimental) or just let user trigger process
+        if ingestor.staged and st.button("Save to Processing Folder"):
+            count = len(ingestor.staged)
+            for statement in list(ingestor.staged.values()):
+                ingestor.persist(statement, RAW_DIR)
+            st.success(f"Saved {count} files to {RAW_DIR}")
+            st.rerun()
 
 with col2:
     # Section: Preview (Staging)
@@ -210,16 +314,40 @@ with col2:
 
         if st.session_state['staging_data'] is not None and not st.session_state['staging_data'].empty:
             st.caption("Review data below. Click 'Add to Master Sheet' in sidebar to save.")
-            st.dataframe(st.session_state['staging_data'], use_container_width=True)
+            st.dataframe(with_rupees(st.session_state['staging_data']), use_container_width=True)
         else:
             st.info("Preview cleared.")
         st.divider()
 
     st.subheader("📚 Master Records")
-    if os.path.exists(MASTER_FILE):
+    if master_exists():
+        # Answered from the full-text index across all years, without loading the master
+        search_query = st.text_input("Search transactions", placeholder="e.g. swiggy, amazon pay")
+        if search_query.strip():
+            try:
+                results, total = search_transactions(search_query)
+                shown = f" (showing the latest {len(results)})" if total > len(results) else ""
+                st.write(f"**{total}** matching transactions{shown}")
+                if results:
+                    st.dataframe(pd.DataFrame(results), use_container_width=True)
+            except Exception as e:
+                st.error(f"Search failed: {e}")
+
         try:
-            df = pd.read_excel(MASTER_FILE)
-            st.write(f"Total Transactions: **{len(df)}**")
+            partitioned = use_partitioned_ledger()
+            if partitioned:
+                # Only the partitions for the selected sources/years are read
+                ledger = open_ledger()
+                st.write(f"Total Transactions: **{len(ledger)}**")
+                f_col1, f_col2 = st.columns(2)
+                selected_sources = f_col1.multiselect("Source", ledger.sources(), default=ledger.sources())
+                selected_years = f_col2.multiselect("Year", ledger.years(), default=ledger.years()[-1:])
+                df = read_master(sources=selected_sources, years=selected_years)
+                export_scope = (tuple(selected_sources), tuple(selected_years))
+            else:
+                df = read_master()
+                export_scope = (None, None)
+                st.write(f"Total Transactions: **{len(df)}**")
             
             # Simple metrics
             if not df.empty:
@@ -233,16 +361,27 @@ with col2:
                 else:
                     filtered_df = df
                     
-                st.dataframe(filtered_df.sort_values(by="Date", ascending=False), use_container_width=True)
+                st.dataframe(with_rupees(filtered_df.sort_values(by="Date", ascending=False)), use_container_width=True)
                 
-                # Download button
-                with open(MASTER_FILE, "rb") as f:
-                    st.download_button(
-                        label="Download Excel",
-                        data=f,
-                        file_name="master_transactions.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                # Downloads: the export is only built once asked for (not on every rerun,
+                # e.g. while a scan polls), then cached until the master changes
+                dl_col1, dl_col2, dl_col3 = st.columns([1, 1, 1])
+                formats = ["xlsx"] + [f for f in EXPORT_FORMATS if f != "xlsx"]
+                export_fmt = dl_col1.selectbox("Export format", formats, label_visibility="collapsed")
+                export_key = (export_fmt, tuple(get_master_store().signature() or ()), export_scope)
+                if dl_col2.button("Prepare download"):
+                    st.session_state['export_key'] = export_key
+                if st.session_state.get('export_key') == export_key:
+                    try:
+                        mime, ext = EXPORT_FORMATS[export_fmt]
+                        dl_col3.download_button(
+                            label=f"Download {export_fmt.upper()}",
+                            data=build_export(export_fmt, export_key[1], *export_scope),
+                            file_name=f"master_transactions{ext}",
+                            mime=mime
+                        )
+                    except ImportError as e:
+                        dl_col3.warning(str(e))
             else:
                 st.info("Master file is empty.")
         except Exception as e:
@@ -253,3 +392,8 @@ with col2:
 # Footer
 st.divider()
 st.caption("🔒 Fully Offline | Python Powered | Secure")
+
+# Poll the background scan: rerun until the job finishes so progress and staging stay live
+if scan_running:
+    time.sleep(1)
+    st.rerun()
@@ -0,0 +1,62 @@
+from extractors.backends import BACKENDS, DEFAULT_BACKEND
+from extractors.creditcard_extractor import CreditCardExtractor
+from extractors.upi_extractor import UPIExtractor
+from extractors.bank_extractor import BankExtractor
+import sys
+import os
+import time
+
+EXTRACTORS = {
+    "cc": CreditCardExtractor,
+    "upi": UPIExtractor,
+    "bank": BankExtractor,
+}
+
+def run_extractor(extractor_cls, file_path, password, backend_name):
+    extractor = extractor_cls(file_path, password=password, text_backend=backend_name)
+    start = time.perf_counter()
+    transactions = extractor.extract_transactions()
+    elapsed = time.perf_counter() - start
+    return transactions, elapsed, extractor.text_backend.name
+
+def transaction_keys(transactions):
+    return {(t['date'], t['amount'], t['type']) for t in transactions}
+
+def benchmark(file_path, extractor_name="cc", password=None):
+    """
+    Compares every available backend against pdfplumber (the reference) for speed
+    and for how many of the reference transactions it reproduces.
+    """
+    extractor_cls = EXTRACTORS[extractor_name]
+    print(f"--- Benchmarking {extractor_cls.__name__} on {os.path.basename(file_path)} ---")
+
+    reference, ref_time, _ = run_extractor(extractor_cls, file_path, password, DEFAULT_BACKEND)
+    ref_keys = transaction_keys(reference)
+    print(f"{'backend':<16}{'time (s)':>10}{'speedup':>10}{'found':>8}{'recall':>9}{'extra':>7}")
+
+    for name, backend in BACKENDS.items():
+        if not backend.is_available():
+            print(f"{name:<16}  (not installed)")
+            continue
+        try:
+            transactions, elapsed, used = run_extractor(extractor_cls, file_path, password, name)
+        except Exception as e:
+            print(f"{name:<16}  failed: {repr(e)}")
+            continue
+        if used != name:
+            print(f"{name:<16}  (not usable for {extractor_cls.__name__}, fell back to {used})")
+            continue
+        keys = transaction_keys(transactions)
+        recall = len(keys & ref_keys) / len(ref_keys) if ref_keys else 1.0
+        speedup = ref_time / elapsed if elapsed else float('inf')
+        print(f"{name:<16}{elapsed:>10.3f}{speedup:>9.1f}x{len(transactions):>8}{recall:>8.0%}{len(keys - ref_keys):>7}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 benchmark_backends.py <pdf_path> [cc|upi|bank] [password]")
+    else:
+        fpath = sys.argv[1]
+        kind = sys.argv[2] if len(sys.argv) > 2 else "cc"
+        pwd = sys.argv[3] if len(sys.argv) > 3 else None
+        if pwd == "None": pwd = None
+        benchmark(fpath, kind, pwd)
@@ -1,4 +1,17 @@
-from .base_extractor import BaseExtractor
-from .bank_extractor import BankExtractor
-from .creditcard_extractor import CreditCardExtractor
-from .upi_extractor import UPIExtractor
+# Re-exports are resolved lazily so that importing a light submodule
+# (e.g. extractors.backends) doesn't pull in pdfplumber.
+_EXPORTS = {
+    "BaseExtractor": ".base_extractor",
+    "BankExtractor": ".bank_extractor",
+    "CreditCardExtractor": ".creditcard_extractor",
+    "UPIExtractor": ".upi_extractor",
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        module = importlib.import_module(_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = list(_EXPORTS)
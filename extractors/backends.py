@@ -0,0 +1,159 @@
+import io
+
+# Low-level text backends for the extractors.
+# Every backend yields the text of each page; some can do more (tables, words).
+# Extractors declare the capabilities they need and fall back to pdfplumber
+# when the selected backend can't provide them.
+
+TEXT = "text"
+TABLES = "tables"
+WORDS = "words"
+
+def as_stream(source):
+    """
+    Returns a binary stream for a file path, raw bytes or an in-memory statement.
+    """
+    if hasattr(source, 'data'):
+        source = source.data
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(bytes(source))
+    return open(source, 'rb')
+
+class TextBackend:
+    name = None
+    capabilities = frozenset()
+
+    def is_available(self):
+        return True
+
+    def iter_page_texts(self, extractor, transactions=None):
+        """
+        Yields (index, text) for every page of the extractor's file,
+        going through extractor.iter_pages for progress/cancel/low-memory handling.
+        """
+        raise NotImplementedError
+
+class PdfplumberBackend(TextBackend):
+    """
+    Full character-level layout analysis. Slowest, but supports tables and words.
+    """
+    name = "pdfplumber"
+    capabilities = frozenset({TEXT, TABLES, WORDS})
+
+    def iter_page_texts(self, extractor, transactions=None):
+        with extractor.open_pdf() as pdf:
+            for i, page in extractor.iter_pages(pdf, transactions):
+                # Only the issuer's transactions region once its layout is known
+                yield i, extractor.layout_region(i, page).extract_text() or ""
+                # The caller has parsed the page by now; learn where its transactions were
+                extractor.learn_layout(i, page)
+        extractor.save_layout_templates()
+
+class PyPDF2Backend(TextBackend):
+    """
+    Content-stream text extraction via PyPDF2, no layout analysis. Text only.
+    """
+    name = "pypdf2"
+    capabilities = frozenset({TEXT})
+
+    def is_available(self):
+        try:
+            import PyPDF2
+            return True
+        except ImportError:
+            return False
+
+    def iter_page_texts(self, extractor, transactions=None):
+        from PyPDF2 import PdfReader
+        with as_stream(extractor.file_path) as stream:
+            reader = PdfReader(stream)
+            if reader.is_encrypted:
+                reader.decrypt(extractor.password or "")
+            for i, page in extractor.iter_pages(reader, transactions):
+                yield i, page.extract_text() or ""
+
+class _PdfminerDocument:
+    """
+    Minimal `.pages` container so pdfminer pages go through extractor.iter_pages.
+    """
+    def __init__(self, pages):
+        self.pages = pages
+
+class PdfminerFastBackend(TextBackend):
+    """
+    pdfminer with layout analysis disabled (laparams=None): characters are
+    grouped into lines by their vertical position only. Text only.
+    """
+    name = "pdfminer-fast"
+    capabilities = frozenset({TEXT})
+    # Characters whose tops differ by less than this (in points) share a line
+    line_tolerance = 3.0
+
+    def is_available(self):
+        try:
+            import pdfminer
+            return True
+        except ImportError:
+            return False
+
+    def iter_page_texts(self, extractor, transactions=None):
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        from pdfminer.converter import PDFPageAggregator
+
+        with as_stream(extractor.file_path) as stream:
+            document = PDFDocument(PDFParser(stream), password=extractor.password or "")
+            resources = PDFResourceManager(caching=True)
+            device = PDFPageAggregator(resources, laparams=None)
+            interpreter = PDFPageInterpreter(resources, device)
+            pages = _PdfminerDocument(list(PDFPage.create_pages(document)))
+            for i, page in extractor.iter_pages(pages, transactions):
+                interpreter.process_page(page)
+                yield i, self._layout_to_text(device.get_result())
+
+    def _layout_to_text(self, layout):
+        chars = [obj for obj in layout if hasattr(obj, 'get_text') and hasattr(obj, 'x0')]
+        # Top-down, left-to-right
+        chars.sort(key=lambda c: (-c.y1, c.x0))
+        lines = []
+        current, current_top = [], None
+        for char in chars:
+            if current_top is None or abs(char.y1 - current_top) > self.line_tolerance:
+                if current:
+                    lines.append(current)
+                current, current_top = [], char.y1
+            current.append(char)
+        if current:
+            lines.append(current)
+
+        text_lines = []
+        for line in lines:
+            line.sort(key=lambda c: c.x0)
+            parts = []
+            prev = None
+            for char in line:
+                # Insert a space where the gap is wider than a fraction of a character
+                if prev is not None and char.x0 - prev.x1 > 0.3 * max(prev.width, 1.0):
+                    parts.append(" ")
+                parts.append(char.get_text())
+                prev = char
+            text_lines.append("".join(parts))
+        return "\n".join(text_lines)
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PdfplumberBackend(), PyPDF2Backend(), PdfminerFastBackend())
+}
+DEFAULT_BACKEND = "pdfplumber"
+
+def get_backend(name):
+    """
+    Returns the backend registered under `name` (default: pdfplumber).
+    """
+    if not name:
+        return BACKENDS[DEFAULT_BACKEND]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown text backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
@@ -1,20 +1,53 @@
 import re
-import pdfplumber
+from functools import lru_cache
 from .base_extractor import BaseExtractor
+from .backends import TEXT, TABLES
 from utils.date_utils import parse_date
+from utils.amount_utils import parse_amount, parse_marker, to_rupees, CREDIT, DEBIT
+from .reconcile import reconcile_balances, describe_break
+
+UPI_PAYEE_RE = re.compile(r'UPI/\s*([^/]+)\s*/')
+ACH_PAYEE_RE = re.compile(r'ACH/\s*([^/]+)\s*/')
+
+def text_row_direction(parts, selected):
+    """
+    (marker, hint) for a text-mode row whose amount is the candidate `selected`
+    (token at parts[-k]). The token after the amount counts as an explicit marker
+    only when it is a standalone Cr/Dr; usually it is the balance, and a
+    "12,345.00Cr" balance says the account is in credit, not that this row is a
+    deposit, so its Cr/Dr is only a hint for when the balance movement is unclear.
+    """
+    marker = CREDIT if selected['is_credit'] else DEBIT if selected['is_debit'] else None
+    hint = None
+    k = selected['k']
+    if marker is None and k > 1:
+        next_token = parts[-k + 1]
+        marker = parse_marker(next_token)
+        if marker is None:
+            lowered = next_token.lower()
+            hint = CREDIT if 'cr' in lowered else DEBIT if 'dr' in lowered else None
+    return marker, hint
 
 class BankExtractor(BaseExtractor):
+    # Table extraction needs full layout analysis
+    required_capabilities = frozenset({TEXT, TABLES})
+
     def extract_transactions(self):
         """
         Tries to extract transactions from table-like structures in bank statements.
         """
         transactions = []
+        # Rows and balances in statement order, reconciled once at the end (see _reconcile)
+        self._chain = []
+        self.last_balance = None
+        self.balance_breaks = []
         
-        with pdfplumber.open(self.file_path, password=self.password) as pdf:
-            self.previous_balance = None
-            for i, page in enumerate(pdf.pages):
+        with self.open_pdf() as pdf:
+            for page_index, page in self.iter_pages(pdf, transactions):
                 page_transactions = []
-                print(f"  Processing Page {i+1}...")
+                print(f"  Processing Page {page_index+1}...")
+                # Only the issuer's transactions region once its layout is known
+                region = self.layout_region(page_index, page)
                 
                 # Reset balance tracking per page? No, it should be continuous if logical order.
                 # But typically PDFs flow linearly.
@@ -22,10 +55,14 @@ class BankExtractor(BaseExtractor):
                 # We'll initialize it to None at start of method (which it is).
                 
                 # Method A: Table Extraction
-                tables = page.extract_tables()
+                # Learned column boundaries replace vertical ruling-line detection
+                columns = self.layout_columns(page)
+                table_settings = {"vertical_strategy": "explicit", "explicit_vertical_lines": columns} if columns else {}
+                tables = region.find_tables(table_settings)
                 if tables:
                     for table in tables:
-                        for row in table:
+                        found_before = len(page_transactions)
+                        for row in table.extract():
                             if not row or len(row) < 3: continue
                             
                             # (Existing table row logic...)
@@ -52,23 +89,23 @@ class BankExtractor(BaseExtractor):
                             
                             # 2. Identify Amounts (Scan all columns)
                             # We collect ALL numbers in the row to distinguish Amount vs Balance
+                            # Values are integer paise, so the balance math below is exact
                             numerical_cells = []
                             for i in range(len(row)):
                                 if i <= date_idx: continue
                                 col_val = row[i].strip()
-                                clean_val = col_val.replace(',', '').replace('Cr', '').replace('Dr', '')
-                                if not clean_val: continue
-                                try:
-                                    val = float(clean_val)
-                                    # Filter simple integers that look like years or IDs if needed, 
-                                    # but inside a table, numbers are usually money.
-                                    numerical_cells.append({'val': val, 'idx': i, 'txt': col_val})
-                                except ValueError:
-                                    pass
+                                parsed = parse_amount(col_val)
+                                if parsed is None: continue
+                                # Filter simple integers that look like years or IDs if needed, 
+                                # but inside a table, numbers are usually money.
+                                numerical_cells.append({'val': parsed[0], 'marker': parsed[1], 'idx': i, 'txt': col_val})
                             
                             current_balance = None
-                            amount = 0.0
-                            trans_type = "DEBIT" # Default, but math will override
+                            amount = 0
+                            # CREDIT/DEBIT is settled by _reconcile(): explicit marker first,
+                            # then the balance movement, then the weaker hint
+                            marker = None
+                            hint = None
                             amount_idx = -1
                             
                             if not numerical_cells:
@@ -84,19 +121,10 @@ class BankExtractor(BaseExtractor):
                                 amount = numerical_cells[-2]['val']
                                 amount_idx = numerical_cells[-2]['idx']
                                 
-                                # Math Check for Type (Crucial for Deposit vs Withdrawal columns)
-                                if self.previous_balance is not None:
-                                    diff = current_balance - self.previous_balance
-                                    if abs(diff - amount) < 1.0: # lenient float
-                                        trans_type = "CREDIT"
-                                    elif abs(diff + amount) < 1.0:
-                                        trans_type = "DEBIT"
-                                    # Else: Math didn't match perfectly. Trust explicit markers if any, or default.
-                                    
-                                # explicit markers check
-                                target_cell_txt = numerical_cells[-2]['txt']
-                                if 'Cr' in target_cell_txt or 'Cr' in str(row): trans_type = "CREDIT"
-                                elif 'Dr' in target_cell_txt: trans_type = "DEBIT"
+                                # explicit markers check; a 'Cr' elsewhere in the row is only a hint
+                                # (the balance movement decides Deposit vs Withdrawal columns)
+                                marker = numerical_cells[-2]['marker']
+                                if 'Cr' in str(row): hint = CREDIT
                                 
                             elif len(numerical_cells) == 1:
                                 # Only 1 number.
@@ -104,28 +132,27 @@ class BankExtractor(BaseExtractor):
                                 # If B/F line, it's balance.
                                 if "B/F" in str(row) or "BROUGHT FORWARD" in str(row).upper():
                                     current_balance = val
-                                    self.debug_logs.append(f"  Start Balance (Table): {current_balance}")
-                                    if self.previous_balance is None: self.previous_balance = current_balance
+                                    self.debug_logs.append(f"  Start Balance (Table): {to_rupees(current_balance)}")
+                                    self._record(balance=current_balance)
                                     continue
                                 else:
                                     # Ambiguous. Is it Amount or Balance?
                                     # If we have previous balance, check if this val is close to it?
-                                    if self.previous_balance is not None and abs(val - self.previous_balance) < (val * 0.1):
+                                    if self.last_balance is not None and abs(val - self.last_balance) * 10 < val:
                                         # Likely just a balance update line?
                                         current_balance = val
                                         # Skip transaction
-                                        amount = 0.0
+                                        amount = 0
                                     else:
                                         # Assume Amount?
                                         amount = val
                                         amount_idx = numerical_cells[0]['idx']
-                                        if 'Cr' in numerical_cells[0]['txt']: trans_type = "CREDIT"
-                                
-                            # Update Balance State
-                            if current_balance is not None:
-                                self.previous_balance = current_balance
+                                        marker = numerical_cells[0]['marker']
                             
                             if amount <= 0:
+                                # Still a balance checkpoint for the reconciliation
+                                if current_balance is not None:
+                                    self._record(balance=current_balance)
                                 continue
 
                             # 3. Join Description Columns
@@ -152,18 +179,24 @@ class BankExtractor(BaseExtractor):
                             if amount > 0:
                                 description = self._clean_description(full_desc.replace("\n", " "))
                                 self.debug_logs.append(f"  Cleaned: '{description}'")
-                                page_transactions.append({
+                                transaction = {
                                     "date": date,
                                     "description": description,
                                     "amount": amount,
-                                    "type": trans_type,
+                                    "type": None, # set by _reconcile()
                                     "source": "Bank"
-                                })
+                                }
+                                page_transactions.append(transaction)
+                                self._record(transaction, amount, current_balance, marker, hint)
+
+                        if len(page_transactions) > found_before:
+                            edges = [cell[0] for cell in table.cells] + [cell[2] for cell in table.cells]
+                            self.note_accepted(bbox=table.bbox, columns=edges)
 
                 # Method B: Text Fallback (if A failed for this page)
                 if not page_transactions:
                     # print(f"    No table transactions on Page {i+1}. Trying text fallback...")
-                    text = page.extract_text()
+                    text = region.extract_text()
                     if text:
                         lines = text.split('\n')
                         self.previous_line_content = None
@@ -190,40 +223,29 @@ class BankExtractor(BaseExtractor):
                             for k in range(1, 5): # Check last 4 tokens
                                 if len(parts) < k + 2: break
                                 token = parts[-k]
-                                clean_token = token.replace(',', '').lower()
-                                
-                                # Check for Credit/Debit suffixes
-                                is_credit_suffix = False
-                                is_debit_suffix = False
-                                if 'cr' in clean_token: 
-                                    is_credit_suffix = True
-                                    clean_token = clean_token.replace('cr', '')
-                                if 'dr' in clean_token:
-                                    clean_token = clean_token.replace('dr', '')
-                                    is_debit_suffix = True
-                                    
-                                try:
-                                    val = float(clean_token)
-                                    # Heuristics to reject non-amounts
+                                # Integer paise plus any Cr/Dr suffix, in one pass
+                                parsed = parse_amount(token)
+                                if parsed is None:
+                                    continue
+                                val, marker = parsed
+                                # Heuristics to reject non-amounts
+                                if marker is None and '.' not in token:
                                     # 1. Year check (1900-2100) if looks like integer
-                                    if val > 1900 and val < 2100 and float(token.replace(',','')) == val and '.' not in token:
+                                    if 190000 < val < 210000:
                                         # self.debug_logs.append(f"  Rejected token {token} (Year-like)")
                                         continue
                                     # 2. Pincode check (large integer, no decimal) - e.g., 500062
-                                    if val > 10000 and float(token.replace(',','')) == val and '.' not in token:
+                                    if val > 1000000:
                                         # self.debug_logs.append(f"  Rejected token {token} (Pincode-like)")
                                         continue
-                                        
-                                    amount_candidates.append({
-                                        'val': val,
-                                        'k': k,
-                                        'token': token,
-                                        'is_credit': is_credit_suffix,
-                                        'is_debit': is_debit_suffix,
-                                        'clean_token': clean_token
-                                    })
-                                except ValueError:
-                                    continue
+                                    
+                                amount_candidates.append({
+                                    'val': val,
+                                    'k': k,
+                                    'token': token,
+                                    'is_credit': marker == CREDIT,
+                                    'is_debit': marker == DEBIT
+                                })
                             
                             if not amount_candidates:
                                 self.previous_line_content = " ".join(parts)
@@ -243,14 +265,9 @@ class BankExtractor(BaseExtractor):
                             if len(amount_candidates) == 1:
                                 # Only one number found. Assume it's Balance.
                                 current_balance = amount_candidates[0]['val']
-                                self.debug_logs.append(f"  Skipped Line (Single Number): Found {current_balance} (treated as Balance). Transaction Amount missing.")
+                                self.debug_logs.append(f"  Skipped Line (Single Number): Found {to_rupees(current_balance)} (treated as Balance). Transaction Amount missing.")
                                 # We treat this as a balance update but NO transaction.
-                                # Update previous balance and continue?
-                                if self.previous_balance is None:
-                                     self.previous_balance = current_balance
-                                else:
-                                     # Optionally check continuity?
-                                     self.previous_balance = current_balance
+                                self._record(balance=current_balance)
                                 
                                 # Store this line too? Maybe the description is here but amount missing?
                                 self.previous_line_content = " ".join(parts)
@@ -258,7 +275,7 @@ class BankExtractor(BaseExtractor):
 
                             elif len(amount_candidates) > 1:
                                 # Candidate 0 is right-most (Balance). Candidate 1 is to its left (Amount).
-                                self.debug_logs.append(f"  Found Multiple Amounts: {[c['val'] for c in amount_candidates]}. Choosing {amount_candidates[1]['val']} over {amount_candidates[0]['val']}")
+                                self.debug_logs.append(f"  Found Multiple Amounts: {[to_rupees(c['val']) for c in amount_candidates]}. Choosing {to_rupees(amount_candidates[1]['val'])} over {to_rupees(amount_candidates[0]['val'])}")
                                 
                                 current_balance = amount_candidates[0]['val']
                                 selected = amount_candidates[1]
@@ -268,40 +285,10 @@ class BankExtractor(BaseExtractor):
                             if amount is None:
                                 continue
                             
-                            # 1. Check intrinsic suffixes
-                            if selected['is_credit']: trans_type = "CREDIT"
-                            elif selected['token'].lower().endswith('cr'): trans_type = "CREDIT"
-                            
-                            # 2. Check detached marker (next token, i.e., k-1)
-                            if k > 1: # if we are not at the very end
-                                next_token = parts[-k+1].lower()
-                                if 'cr' in next_token: trans_type = "CREDIT"
-                                elif 'dr' in next_token: trans_type = "DEBIT"
-                                
-                            # 3. Balance Math Check (The specific fix for ICICI without Cr/Dr markers)
-                            if current_balance is not None and hasattr(self, 'previous_balance') and self.previous_balance is not None:
-                                diff = current_balance - self.previous_balance
-                                # Allow small float error
-                                if abs(diff - amount) < 0.1:
-                                    trans_type = "CREDIT"
-                                elif abs(diff + amount) < 0.1:
-                                    trans_type = "DEBIT"
-                                else:
-                                    # Fallback: Maybe balance logic is out of sync? Keep default or heuristic.
-                                    pass
-                            
-                            # Update previous balance if we found one
-                            if current_balance is not None:
-                                self.previous_balance = current_balance
-                            elif amount > 0 and len(parts) == 3 and "B/F" in line:
-                                # Start of statement balance line? "01-12-2025 B/F 1,57,733.02"
-                                # If this was parsed as amount, treat it as balance initialization
-                                self.previous_balance = amount
-                                # Don't add B/F as a transaction usually?
-                                # Return/Continue?
-                                # If description is "B/F", skip adding content but keep balance.
-                                if "B/F" in line or "BROUGHT FORWARD" in line.upper():
-                                     continue
+                            # 1. Intrinsic suffix, 2. detached marker token; anything weaker is a hint
+                            # 3. Unmarked rows (e.g. ICICI without Cr/Dr) are settled from the
+                            # balance movement by _reconcile()
+                            marker, hint = text_row_direction(parts, selected)
 
                             desc_end_index = -k
                             desc_start_index = 1
@@ -320,6 +307,7 @@ class BankExtractor(BaseExtractor):
                             # Explicit B/F Check (Text Mode)
                             if "B/F" in description or "BROUGHT FORWARD" in description.upper() or "B/F" in line:
                                 self.debug_logs.append(f"  Skipped Text Line (B/F): {description}")
+                                self._record(balance=current_balance)
                                 continue
 
                             if found_amount and amount > 0:
@@ -337,17 +325,21 @@ class BankExtractor(BaseExtractor):
                                 # Clean the description before storing
                                 description = self._clean_description(description)
                                 self.debug_logs.append(f"  [Text] Cleaned: '{description}'")
-                                self.debug_logs.append(f"  [ACCEPTED] Date: {date} | Amt: {amount} | Type: {trans_type} | Bal: {current_balance}")
-                                page_transactions.append({
+                                self.debug_logs.append(f"  [ACCEPTED] Date: {date} | Amt: {to_rupees(amount)} | Marker: {marker or '-'} | Bal: {to_rupees(current_balance)}")
+                                self.note_accepted(line=line)
+                                transaction = {
                                     "date": date,
                                     "description": description,
                                     "amount": amount,
-                                    "type": trans_type,
+                                    "type": None, # set by _reconcile()
                                     "source": "Bank"
-                                })
+                                }
+                                page_transactions.append(transaction)
+                                self._record(transaction, amount, current_balance, marker, hint)
                                 continue # Move to next line after finding transaction
 
                             # If we reached here, line is skipped. Store it.
+                            self._record(balance=current_balance)
                             self.previous_line_content = " ".join(parts)
                             self.debug_logs.append(f"Skipped Line (Stored for Lookback): {self.previous_line_content}")
                             continue
@@ -358,31 +350,72 @@ class BankExtractor(BaseExtractor):
                 # Add this page's results
                 if page_transactions:
                     transactions.extend(page_transactions)
+                self.learn_layout(page_index, page)
 
+        self.save_layout_templates()
+        self._reconcile()
         self.transactions = transactions
         return transactions
 
+    def _record(self, transaction=None, amount=None, balance=None, marker=None, hint=None):
+        """
+        Appends a row (or a balance-only line) to the statement's balance chain.
+        """
+        if transaction is None and balance is None:
+            return
+        self._chain.append({
+            "transaction": transaction,
+            "paise": amount if transaction is not None else None,
+            "balance": balance,
+            "marker": marker,
+            "hint": hint
+        })
+        if balance is not None:
+            self.last_balance = balance
+
+    def _reconcile(self):
+        """
+        Settles CREDIT/DEBIT for every row and reports balance breaks, in one
+        vectorized pass over the whole statement (see extractors/reconcile.py).
+        """
+        types, breaks = reconcile_balances(self._chain)
+        for row, trans_type in zip(self._chain, types):
+            if row["transaction"] is not None:
+                row["transaction"]["type"] = trans_type
+        self.balance_breaks = [
+            describe_break(entry, self._chain[entry["position"]]["transaction"]) for entry in breaks
+        ]
+        for message in self.balance_breaks:
+            self.debug_logs.append(f"  {message}")
+        if breaks:
+            self.debug_logs.append(f"Balance reconciliation: {len(breaks)} break(s) in {len(self._chain)} rows")
+
     def _clean_description(self, description):
         """
         Simplifies bank statement descriptions, specifically for UPI and ACH.
         """
-        if not description:
-            return ""
+        return clean_bank_description(description)
+
+@lru_cache(maxsize=8192)
+def clean_bank_description(description):
+    """
+    Cached cleanup for bank descriptions: statements repeat the same payees
+    constantly, so most calls skip the regexes entirely.
+    """
+    if not description:
+        return ""
+        
+    # Regex 1: Standard UPI format UPI/PAYEE/ID/...
+    # Also try lenient spacing: UPI / PAYEE / ...
+    match = UPI_PAYEE_RE.search(description)
+    if match:
+        payee = match.group(1)
+        return f"UPI - {payee}"
+        
+    # Regex 2: ACH format ACH/PAYEE/...
+    match = ACH_PAYEE_RE.search(description)
+    if match:
+        payee = match.group(1)
+        return f"ACH - {payee}"
         
-        # self.debug_logs.append(f"    _clean input: '{description}'") 
-            
-        # Regex 1: Standard UPI format UPI/PAYEE/ID/...
-        # Also try lenient spacing: UPI / PAYEE / ...
-        match = re.search(r'UPI/\s*([^/]+)\s*/', description)
-        if match:
-            payee = match.group(1)
-            # self.debug_logs.append(f"    _clean matched UPI: {payee}")
-            return f"UPI - {payee}"
-            
-        # Regex 2: ACH format ACH/PAYEE/...
-        match = re.search(r'ACH/\s*([^/]+)\s*/', description)
-        if match:
-            payee = match.group(1)
-            return f"ACH - {payee}"
-            
-        return description
+    return description
@@ -1,23 +1,317 @@
 from abc import ABC, abstractmethod
+from collections import deque
+import gc
 import pdfplumber
+from utils.memory_utils import current_rss_mb
+from .backends import TEXT, BACKENDS, DEFAULT_BACKEND, as_stream, get_backend
+from .templates import TemplateRegistry, union_bbox
+from .page_cache import PageCache
+from .page_filter import classify_page, transaction_line_count
+
+def open_pdf(source, password=None):
+    """
+    Opens a PDF from a file path, raw bytes, or an in-memory statement
+    (any object with a `data` attribute), without touching disk for the latter two.
+    """
+    if isinstance(source, str):
+        return pdfplumber.open(source, password=password)
+    return pdfplumber.open(as_stream(source), password=password)
 
 class BaseExtractor(ABC):
-    def __init__(self, file_path, password=None):
+    # Backend capabilities this extractor needs (see extractors/backends.py)
+    required_capabilities = frozenset({TEXT})
+
+    def __init__(self, file_path, password=None, low_memory=False, max_cached_pages=2, rss_budget_mb=None,
+                 text_backend=None, layout_templates=None, page_cache=None, page_prefilter=True):
         self.file_path = file_path
         self.password = password
         self.transactions = []
         self.debug_logs = []
+        # Low-memory mode: release each page's cached layout once processed,
+        # keeping at most `max_cached_pages` pages parsed at any time.
+        self.low_memory = low_memory
+        self.max_cached_pages = max(1, int(max_cached_pages))
+        # Optional per-file RSS budget (MB above the level when the file was opened)
+        self.rss_budget_mb = rss_budget_mb
+        # Record/replay raw page layout (see extractors/page_cache.py); recordings are
+        # pdfplumber layout, so the pdfplumber backend is used while it is on
+        self.page_cache = PageCache(page_cache) if page_cache else None
+        if self.page_cache is not None and text_backend not in (None, DEFAULT_BACKEND):
+            self.debug_logs.append(f"Page cache in use; ignoring text backend '{text_backend}'")
+            text_backend = None
+        self.text_backend = self._resolve_backend(text_backend)
+        # Optional hooks set by the caller (e.g. background scan jobs)
+        self.progress_callback = None
+        self.cancel_event = None
+        # Issuer layout templates (path to the registry file); the issuer is set by Parser
+        self.layout_templates = TemplateRegistry(layout_templates) if layout_templates else None
+        self.issuer = None
+        self.used_layout_template = False
+        # Whether the page being parsed is cropped to the template region
+        self._page_cropped = False
+        self._accepted_boxes = []
+        self._accepted_lines = []
+        self._accepted_columns = None
+        # Bulk parsers classify lines after all pages are read (see collect_lines)
+        self._deferred_layout = None
+        # Skip pages without any date- and amount-like token (see extractors/page_filter.py)
+        self.page_prefilter = page_prefilter
+        self.skipped_pages = []
 
     def extract_text(self):
         """
         Helper to extract raw text from all pages.
         """
         text = ""
-        with pdfplumber.open(self.file_path, password=self.password) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() + "\n"
+        for _, page_text in self.text_backend.iter_page_texts(self):
+            text += page_text + "\n"
         return text
 
+    def open_pdf(self):
+        if self.page_cache is not None:
+            return self.page_cache.open(self.file_path, password=self.password)
+        return open_pdf(self.file_path, password=self.password)
+
+    def _resolve_backend(self, name):
+        backend = get_backend(name)
+        missing = self.required_capabilities - backend.capabilities
+        if missing or not backend.is_available():
+            reason = f"lacks {', '.join(sorted(missing))}" if missing else "is not installed"
+            self.debug_logs.append(f"Text backend '{backend.name}' {reason}; using {DEFAULT_BACKEND}")
+            backend = BACKENDS[DEFAULT_BACKEND]
+        return backend
+
+    def iter_page_texts(self, transactions=None):
+        """
+        Yields (index, text) per page using the selected text backend.
+        """
+        return self.text_backend.iter_page_texts(self, transactions)
+
+    @property
+    def layout_key(self):
+        if self.layout_templates is None or self.issuer is None:
+            return None
+        return f"{self.issuer}/{type(self).__name__}"
+
+    def layout_region(self, page_index, page):
+        """
+        Returns the page cropped to the issuer's learned transactions region,
+        or the full page while that layout is still being learned.
+        The crop is only used when it holds as many transaction-like lines as the
+        full page; otherwise the full page is parsed and learned from, widening
+        the region to the lines it missed.
+        """
+        self._accepted_boxes, self._accepted_lines, self._accepted_columns = [], [], None
+        self._page_cropped = False
+        key = self.layout_key
+        if key is None:
+            return page
+        bbox = self.layout_templates.region(key, page_index, page.bbox)
+        if bbox is None:
+            return page
+        region = page.crop(bbox)
+        expected = transaction_line_count(page)
+        if expected is not None:
+            found = transaction_line_count(region)
+            if found != expected:
+                self.debug_logs.append(
+                    f"Layout template {key}: region holds {found} of {expected} transaction lines "
+                    f"on page {page_index+1}; parsing the full page"
+                )
+                return page
+        self.used_layout_template = True
+        self._page_cropped = True
+        return region
+
+    def layout_columns(self, page):
+        """
+        Learned table column boundaries for this issuer (only on pages cropped to its template).
+        """
+        if not self._page_cropped:
+            return None
+        return self.layout_templates.columns(self.layout_key, page.bbox)
+
+    def note_accepted(self, line=None, bbox=None, columns=None):
+        """
+        Records where a transaction was found on the current page, for template learning.
+        """
+        if line is not None:
+            self._accepted_lines.append(line)
+        if bbox is not None:
+            self._accepted_boxes.append(bbox)
+        if columns:
+            self._accepted_columns = columns
+
+    def learn_layout(self, page_index, page):
+        """
+        Widens the issuer template with the region of this page's transactions.
+        Only full (uncropped) pages are learned from.
+        """
+        key = self.layout_key
+        if key is None or self._page_cropped:
+            return
+        if self._deferred_layout is not None:
+            # Lines are classified later; keep this page's line boxes until then
+            if hasattr(page, 'extract_text_lines'):
+                self._deferred_layout[page_index] = (page.bbox, page.extract_text_lines())
+            return
+        if not (self._accepted_boxes or self._accepted_lines):
+            return
+        boxes = list(self._accepted_boxes)
+        if self._accepted_lines and hasattr(page, 'extract_text_lines'):
+            wanted = set(self._accepted_lines)
+            boxes.extend(
+                (line['x0'], line['top'], line['x1'], line['bottom'])
+                for line in page.extract_text_lines() if line['text'] in wanted
+            )
+        bbox = union_bbox(boxes)
+        if bbox is not None:
+            self.layout_templates.learn(key, page_index, page.bbox, bbox, self._accepted_columns)
+
+    def collect_lines(self):
+        """
+        Reads every page through the text backend and returns (lines, page_indexes)
+        for parsers that classify a whole document at once. Template learning is
+        deferred until finish_layout_learning() gets the accepted lines.
+        """
+        lines, page_indexes = [], []
+        self._deferred_layout = {}
+        try:
+            for page_index, text in self.iter_page_texts():
+                page_lines = text.split('\n')
+                lines.extend(page_lines)
+                page_indexes.extend([page_index] * len(page_lines))
+        except BaseException:
+            self._deferred_layout = None
+            raise
+        return lines, page_indexes
+
+    def finish_layout_learning(self, accepted):
+        """
+        Learns the template from the pages collected by collect_lines().
+        `accepted` maps page index -> accepted lines on that page.
+        Only full pages were collected (see learn_layout).
+        """
+        deferred, self._deferred_layout = self._deferred_layout or {}, None
+        key = self.layout_key
+        if key is None:
+            return
+        for page_index, (page_bbox, text_lines) in sorted(deferred.items()):
+            wanted = set(accepted.get(page_index, ()))
+            bbox = union_bbox([
+                (line['x0'], line['top'], line['x1'], line['bottom'])
+                for line in text_lines if line['text'] in wanted
+            ])
+            if bbox is not None:
+                self.layout_templates.learn(key, page_index, page_bbox, bbox)
+        self.save_layout_templates()
+
+    def forget_layout_template(self):
+        """
+        Drops the issuer template (e.g. it matched nothing in this statement).
+        """
+        if self.layout_key is not None:
+            self.layout_templates.forget(self.layout_key)
+            self.layout_templates.save()
+        self.used_layout_template = False
+        self._page_cropped = False
+
+    def save_layout_templates(self):
+        if self.layout_templates is not None:
+            self.layout_templates.save()
+
+    def iter_pages(self, pdf, transactions=None):
+        """
+        Yields (index, page) for each page of an open document (anything with `.pages`).
+        Reports progress after every page and stops early if the scan was cancelled,
+        so callers keep whatever was extracted from the pages already seen.
+        With the page pre-filter on, pages that cannot hold a transaction are not yielded.
+        In low-memory mode, pages are released as soon as they fall out of the
+        `max_cached_pages` window and the per-file RSS budget is enforced.
+        """
+        total_pages = len(pdf.pages)
+        cached_pages = deque()
+        baseline_rss = current_rss_mb() if self.rss_budget_mb else None
+        self.skipped_pages = []
+        try:
+            for i, page in enumerate(pdf.pages):
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.debug_logs.append(f"Cancelled before page {i+1} of {total_pages}")
+                    break
+                if self._keep_page(i, page):
+                    yield i, page
+                self._report_progress(i + 1, total_pages, len(transactions) if transactions is not None else 0)
+
+                if self.low_memory:
+                    cached_pages.append(page)
+                    while len(cached_pages) > self.max_cached_pages:
+                        self._release_page(cached_pages.popleft())
+                if baseline_rss is not None:
+                    self._check_rss_budget(baseline_rss, i + 1, cached_pages)
+        finally:
+            if self.low_memory:
+                while cached_pages:
+                    self._release_page(cached_pages.popleft())
+            if self.skipped_pages:
+                self.debug_logs.append(
+                    f"Pre-filter skipped {len(self.skipped_pages)} of {total_pages} pages: "
+                    f"{', '.join(str(n) for n in self.skipped_pages)}"
+                )
+
+    def _keep_page(self, page_index, page):
+        """
+        Page pre-filter: counts date- and amount-like tokens in the raw character
+        stream, before any text, line or table extraction.
+        """
+        if not self.page_prefilter:
+            return True
+        keep, dates, amounts = classify_page(page)
+        if not keep:
+            self.skipped_pages.append(page_index + 1)
+            self.debug_logs.append(f"Skipped page {page_index+1}: {dates} date-like, {amounts} amount-like tokens")
+        return keep
+
+    def _release_page(self, page):
+        """
+        Drops pdfplumber's cached objects/layout for a page that has been processed.
+        """
+        close = getattr(page, 'close', None)
+        if close is not None:
+            close()
+        elif hasattr(page, 'flush_cache'):
+            page.flush_cache()
+        # Older pdfplumber versions keep the pdfminer layout outside flush_cache
+        getattr(page, '__dict__', {}).pop('_layout', None)
+
+    def _check_rss_budget(self, baseline_rss, page_number, cached_pages):
+        rss = current_rss_mb()
+        if rss is None or rss - baseline_rss <= self.rss_budget_mb:
+            return
+        # Over budget: release everything still cached and collect before giving up
+        while cached_pages:
+            self._release_page(cached_pages.popleft())
+        gc.collect()
+        rss = current_rss_mb()
+        if rss is not None and rss - baseline_rss > self.rss_budget_mb:
+            raise MemoryError(
+                f"RSS budget of {self.rss_budget_mb} MB exceeded at page {page_number} "
+                f"({rss - baseline_rss:.0f} MB used by this file)"
+            )
+
+    def _report_progress(self, page_number, total_pages, found):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback({
+                "stage": "page",
+                "page": page_number,
+                "pages": total_pages,
+                "transactions": found
+            })
+        except Exception as e:
+            # Progress reporting must never break extraction
+            self.debug_logs.append(f"Progress callback failed: {e!r}")
+
     @abstractmethod
     def extract_transactions(self):
         """
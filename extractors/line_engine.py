@@ -0,0 +1,103 @@
+from functools import lru_cache
+import pandas as pd
+from utils.date_utils import parse_date
+
+# Bulk line classification for text statements (credit card, UPI).
+# All lines of a document go into one Series and are classified with vectorized
+# regex extraction. Most lines are headers, summaries or terms text and are
+# discarded in bulk; lines in the common "date ... description ... amount [Cr/Dr]"
+# shape are parsed without a Python loop; only the ambiguous rest goes through
+# the extractor's line-by-line logic.
+
+# Leading date: one token (25/11/2025, 25-11-2025, 25-Nov-2025, 2025-11-25, 25.11.2025)
+# or three tokens (25 Nov 25 / 25 Nov 2025), then description, amount and an optional marker
+CC_LINE_RE = (
+    r'^(?:(?P<date1>\d{2}/\d{2}/\d{4}|\d{2}-\d{2}-\d{4}|\d{1,2}-[A-Za-z]{3}-\d{4}|\d{4}-\d{2}-\d{2}|\d{2}\.\d{2}\.\d{4})'
+    r'|(?P<date3>\d{1,2} [A-Za-z]{3} \d{2}(?:\d{2})?))'
+    r'\s+(?P<desc>.*?\S)\s+(?P<amount>\d[\d,]*\.\d{2})(?:\s*(?P<marker>[CcDd][Rr]?))?$'
+)
+# Any digit among the last three tokens: without one there is no amount
+TRAILING_NUMBER_RE = r'\d\S*(?:\s+\S+){0,2}$'
+
+UPI_DATE_RE = r'^(\w{3}\s\d{1,2},?\s\d{4}|\d{2}/\d{2}/\d{4})'
+UPI_AMOUNT_RE = r'((?:Rs\.?|₹)?\s?([\d,]+\.\d{2}))'
+
+# Statements repeat the same few dates on every line
+cached_parse_date = lru_cache(maxsize=4096)(parse_date)
+
+def _dates(series):
+    """
+    parse_date over a Series, evaluated once per distinct value.
+    """
+    return series.map({value: cached_parse_date(value) for value in series.dropna().unique()})
+
+def classify_credit_card_lines(lines):
+    """
+    Classifies credit card statement lines in bulk.
+    Returns (parsed, fallback):
+        parsed: DataFrame indexed by line number with date, description, paise, type
+            for lines whose shape leaves no doubt.
+        fallback: sorted line numbers that need the line-by-line logic.
+    Every other line cannot hold a transaction and is dropped.
+    """
+    text = pd.Series(lines, dtype=object).str.strip()
+    tokens = text.str.count(r'\S+')
+    candidate = (tokens >= 3) & text.str.contains(TRAILING_NUMBER_RE, regex=True)
+    text = text[candidate]
+    if text.empty:
+        return pd.DataFrame(columns=["date", "description", "paise", "type"]), []
+
+    parts = text.str.extract(CC_LINE_RE)
+    matched = parts['desc'].notna()
+
+    # The line-by-line logic tries the first token, then the second, then the
+    # three-token forms; the fast path must agree with that order
+    tokens = text.str.split(n=2)
+    first_date, second_date = _dates(tokens.str[0]), _dates(tokens.str[1])
+    one_token = parts['date1'].notna() & first_date.notna()
+    three_token = parts['date3'].notna() & first_date.isna() & second_date.isna()
+    date = first_date.where(one_token, _dates(parts['date3']))
+
+    # Exactly two decimals: dropping the separators leaves the amount in paise
+    paise = pd.to_numeric(parts['amount'].str.replace(r'[,.]', '', regex=True), errors='coerce')
+    # Year-like amounts (2001.00 .. 2029.00) are skipped over by the line logic
+    year_like = (paise > 200000) & (paise < 203000) & (paise % 100 == 0)
+
+    fast = matched & (one_token | three_token) & date.notna() & paise.notna() & ~year_like
+    parsed = pd.DataFrame({
+        "date": date[fast],
+        "description": parts.loc[fast, 'desc'].str.split().str.join(' '),
+        "paise": paise[fast].astype("int64"),
+        "type": parts.loc[fast, 'marker'].str.lower().str.startswith('c').map({True: "CREDIT"}).fillna("DEBIT")
+    })
+    fallback = sorted(text.index[~fast])
+    return parsed, fallback
+
+def parse_upi_lines(lines):
+    """
+    Parses UPI statement lines in bulk: a leading date, the first amount on the
+    line, and "Received from"/"Credit" as credit markers.
+    Returns a DataFrame indexed by line number with date, description, paise, type.
+    """
+    text = pd.Series(lines, dtype=object)
+    date_str = text.str.extract(UPI_DATE_RE)[0]
+    text, date_str = text[date_str.notna()], date_str[date_str.notna()]
+    if text.empty:
+        return pd.DataFrame(columns=["date", "description", "paise", "type"])
+
+    amount_match = text.str.extract(UPI_AMOUNT_RE)
+    date = _dates(date_str)
+    keep = amount_match[0].notna() & date.notna()
+    text, date_str, date, amount_match = text[keep], date_str[keep], date[keep], amount_match[keep]
+
+    credit = text.str.contains("Received from", regex=False) | text.str.contains("Credit", regex=False)
+    description = [
+        line.replace(d, "").replace(m, "").strip()
+        for line, d, m in zip(text, date_str, amount_match[0])
+    ]
+    return pd.DataFrame({
+        "date": date,
+        "description": description,
+        "paise": amount_match[1].str.replace(r'[,.]', '', regex=True).astype("int64"),
+        "type": credit.map({True: "CREDIT", False: "DEBIT"})
+    }, index=text.index)
@@ -0,0 +1,253 @@
+import gzip
+import json
+import os
+from utils.hash_utils import generate_content_hash, generate_file_hash
+from utils.file_utils import write_atomic
+
+# Record-and-replay cache of raw page layout.
+# The first parse of a statement records, per page, its text, text lines, words
+# and table cells (gzipped JSON keyed by file hash). Later runs replay the
+# extractors against the recording without opening the PDF, so re-extracting a
+# corpus after a heuristic change costs seconds instead of a full re-parse.
+
+PAGE_CACHE_PREFIX = "pagecache://"
+# Bump when the recorded fields change; older recordings are re-recorded
+CACHE_FORMAT_VERSION = 1
+
+# (path, size, mtime) -> key, so Parser and extractor don't both hash the same file
+_path_keys = {}
+
+def _round_box(obj):
+    return [round(obj['x0'], 2), round(obj['top'], 2), round(obj['x1'], 2), round(obj['bottom'], 2)]
+
+def _inside(box, bbox):
+    # Objects belong to a crop if their centre falls inside it
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    return bbox[0] <= cx <= bbox[2] and bbox[1] <= cy <= bbox[3]
+
+def record_page(page):
+    """
+    Captures everything the extractors read from a pdfplumber page.
+    """
+    data = {
+        "bbox": [round(v, 2) for v in page.bbox],
+        "text": page.extract_text() or "",
+        "lines": [],
+        "words": [[w['text']] + _round_box(w) for w in page.extract_words()],
+        "tables": []
+    }
+    if hasattr(page, 'extract_text_lines'):
+        data["lines"] = [[line['text']] + _round_box(line) for line in page.extract_text_lines()]
+    try:
+        for table in page.find_tables():
+            data["tables"].append({
+                "bbox": [round(v, 2) for v in table.bbox],
+                "cells": [[round(v, 2) for v in cell] for cell in table.cells],
+                "rows": table.extract()
+            })
+    except Exception:
+        # Table detection failing on a page just means no tables on replay
+        pass
+    return data
+
+class ReplayTable:
+    def __init__(self, data):
+        self.bbox = tuple(data["bbox"])
+        self.cells = [tuple(cell) for cell in data["cells"]]
+        self._rows = data["rows"]
+
+    def extract(self, **kwargs):
+        return [list(row) for row in self._rows]
+
+class ReplayPage:
+    """
+    Stand-in for a pdfplumber page served from a recording.
+    Supports the calls the extractors make, including crop(); table settings are
+    ignored (the tables found at record time are returned).
+    """
+    def __init__(self, data, page_number, bbox=None):
+        self._data = data
+        self.page_number = page_number
+        self.bbox = tuple(bbox) if bbox else tuple(data["bbox"])
+        self._cropped = bbox is not None
+        self.width = self.bbox[2] - self.bbox[0]
+        self.height = self.bbox[3] - self.bbox[1]
+
+    def crop(self, bbox, **kwargs):
+        return ReplayPage(self._data, self.page_number, bbox)
+
+    @property
+    def chars(self):
+        # The recorded text stands in for the character stream (page pre-filter)
+        return [{"text": self.extract_text()}]
+
+    def extract_text(self, **kwargs):
+        if not self._cropped:
+            return self._data["text"]
+        return "\n".join(line["text"] for line in self.extract_text_lines())
+
+    def extract_text_lines(self, **kwargs):
+        return [
+            {"text": text, "x0": x0, "top": top, "x1": x1, "bottom": bottom}
+            for text, x0, top, x1, bottom in self._data["lines"]
+            if not self._cropped or _inside((x0, top, x1, bottom), self.bbox)
+        ]
+
+    def extract_words(self, **kwargs):
+        return [
+            {"text": text, "x0": x0, "top": top, "x1": x1, "bottom": bottom}
+            for text, x0, top, x1, bottom in self._data["words"]
+            if not self._cropped or _inside((x0, top, x1, bottom), self.bbox)
+        ]
+
+    def find_tables(self, table_settings=None):
+        return [
+            ReplayTable(table) for table in self._data["tables"]
+            if not self._cropped or _inside(table["bbox"], self.bbox)
+        ]
+
+    def extract_tables(self, table_settings=None):
+        return [table.extract() for table in self.find_tables(table_settings)]
+
+class ReplayDocument:
+    """
+    Minimal pdfplumber.PDF stand-in (`.pages`, context manager) over a recording.
+    """
+    def __init__(self, recording):
+        self.name = recording.get("name")
+        self.pages = [ReplayPage(data, i + 1) for i, data in enumerate(recording["pages"])]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class _RecordingPages:
+    """
+    Lazy page sequence: each page is recorded the first time it is accessed,
+    its pdfplumber objects released, and a ReplayPage returned in its place.
+    """
+    def __init__(self, pdf):
+        self._pdf = pdf
+        self.recorded = [None] * len(pdf.pages)
+
+    def __len__(self):
+        return len(self.recorded)
+
+    def __getitem__(self, index):
+        if self.recorded[index] is None:
+            page = self._pdf.pages[index]
+            self.recorded[index] = record_page(page)
+            if hasattr(page, 'close'):
+                page.close()
+        return ReplayPage(self.recorded[index], index + 1)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+class RecordingDocument:
+    """
+    Wraps an open pdfplumber.PDF; saves the recording on close once every page was seen
+    (a cancelled or failed parse leaves no partial recording behind).
+    """
+    def __init__(self, pdf, page_cache, key, name):
+        self._pdf = pdf
+        self._page_cache = page_cache
+        self._key = key
+        self._name = name
+        self.pages = _RecordingPages(pdf)
+
+    def close(self):
+        try:
+            if all(data is not None for data in self.pages.recorded):
+                self._page_cache.save(self._key, self._name, self.pages.recorded)
+        finally:
+            self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class PageCache:
+    """
+    On-disk page layout recordings: <cache_dir>/<file-hash>.pages.json.gz
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def key_for(self, source):
+        """
+        Cache key of a file path, an in-memory statement, or a pagecache:// path.
+        """
+        if isinstance(source, str) and source.startswith(PAGE_CACHE_PREFIX):
+            return source[len(PAGE_CACHE_PREFIX):]
+        if hasattr(source, 'data'):
+            return generate_content_hash(source.data)[:32]
+        stat = os.stat(source)
+        memo_key = (os.path.abspath(source), stat.st_size, stat.st_mtime)
+        if memo_key not in _path_keys:
+            _path_keys[memo_key] = generate_file_hash(source)[:32]
+        return _path_keys[memo_key]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pages.json.gz")
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                recording = json.load(f)
+            if recording.get("version") == CACHE_FORMAT_VERSION:
+                return recording
+        except Exception as e:
+            print(f"Error loading page cache {key}: {e}")
+        return None
+
+    def save(self, key, name, pages):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        recording = {"version": CACHE_FORMAT_VERSION, "name": name, "pages": pages}
+        write_atomic(self._path(key), lambda f: json.dump(recording, f, separators=(',', ':')),
+                     mode='wt', opener=lambda path, mode: gzip.open(path, mode, encoding='utf-8'))
+
+    def entries(self):
+        """
+        Returns [(pagecache:// path, original file name)] for every recording.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for filename in sorted(os.listdir(self.cache_dir)):
+            if filename.endswith(".pages.json.gz"):
+                key = filename[:-len(".pages.json.gz")]
+                recording = self.load(key)
+                if recording is not None:
+                    entries.append((f"{PAGE_CACHE_PREFIX}{key}", recording.get("name") or key))
+        return entries
+
+    def open(self, source, password=None, record=True):
+        """
+        Returns a ReplayDocument if `source` was recorded, otherwise the opened
+        PDF (wrapped in a RecordingDocument when `record` is set).
+        """
+        from .base_extractor import open_pdf
+
+        key = self.key_for(source)
+        recording = self.load(key)
+        if recording is not None:
+            return ReplayDocument(recording)
+        if isinstance(source, str) and source.startswith(PAGE_CACHE_PREFIX):
+            raise FileNotFoundError(f"No page recording for {source}")
+        pdf = open_pdf(source, password=password)
+        if not record:
+            return pdf
+        name = getattr(source, 'name', None) or os.path.basename(str(source))
+        return RecordingDocument(pdf, self, key, name)
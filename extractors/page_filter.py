@@ -0,0 +1,86 @@
+import re
+
+# Cheap page pre-filter, run before any layout analysis.
+# Terms and conditions, reward summaries and offer inserts make up most of the
+# pages of some card statements. A transaction needs at least a date and an
+# amount, so pages whose raw character stream has no date-like token or no
+# amount-like token are skipped before text, line or table extraction.
+
+# Date shapes the extractors understand. The character stream has no layout
+# spaces, so separators between day, month and year are optional.
+DATE_TOKEN_RE = re.compile(
+    r'\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}'              # 25/11/2025, 25-11-2025, 25.11.2025
+    r'|\d{4}-\d{2}-\d{2}'                             # 2025-11-25
+    r'|\d{1,2}[\s-]?[A-Za-z]{3}[\s-]?\d{2,4}'         # 25-Nov-2025, 25 Nov 25, 25Nov2025
+    r'|[A-Za-z]{3}\s?\d{1,2},?\s?\d{4}'               # Nov 25, 2025
+)
+# Not followed by a digit or dot, so 25.11.2025 is not an amount
+AMOUNT_TOKEN_RE = re.compile(r'\d[\d,]*\.\d{2}(?![\d.])')
+
+# Minimum tokens of each kind for a page to be parsed
+MIN_DATE_TOKENS = 1
+MIN_AMOUNT_TOKENS = 1
+
+def page_stream(page):
+    """
+    The page's raw character stream (no line or word grouping), or None for page
+    objects that don't expose one (non-pdfplumber backends are not filtered).
+    """
+    chars = getattr(page, 'chars', None)
+    if chars is None:
+        return None
+    return "".join(char.get('text', '') for char in chars)
+
+def count_tokens(text):
+    """
+    Returns (date-like tokens, amount-like tokens) in `text`.
+    """
+    return len(DATE_TOKEN_RE.findall(text)), len(AMOUNT_TOKEN_RE.findall(text))
+
+def classify_page(page):
+    """
+    Returns (keep, dates, amounts). Pages without a character stream are always kept.
+    """
+    text = page_stream(page)
+    if text is None:
+        return True, None, None
+    dates, amounts = count_tokens(text)
+    return dates >= MIN_DATE_TOKENS and amounts >= MIN_AMOUNT_TOKENS, dates, amounts
+
+# Transaction-line counts from the same character stream check a learned layout
+# region against its full page (see BaseExtractor.layout_region).
+# Characters whose tops are this close (points) belong to the same text line
+LINE_TOLERANCE = 3
+
+def stream_lines(page):
+    """
+    The page's text lines built straight from its character stream, grouped by
+    vertical position (no layout analysis). Pages whose characters carry no
+    positions (recordings) fall back to their extracted text.
+    """
+    chars = getattr(page, 'chars', None)
+    if chars is None:
+        return None
+    if not chars or 'top' not in chars[0]:
+        return (page.extract_text() or "").split('\n')
+    lines, current, line_top = [], [], None
+    for char in sorted(chars, key=lambda c: (c['top'], c['x0'])):
+        if line_top is not None and char['top'] - line_top > LINE_TOLERANCE:
+            lines.append(current)
+            current = []
+        if not current:
+            line_top = char['top']
+        current.append(char)
+    if current:
+        lines.append(current)
+    return ["".join(c.get('text', '') for c in sorted(line, key=lambda c: c['x0'])) for line in lines]
+
+def transaction_line_count(page):
+    """
+    Lines with both a date-like and an amount-like token, or None for pages
+    without a character stream.
+    """
+    lines = stream_lines(page)
+    if lines is None:
+        return None
+    return sum(1 for line in lines if DATE_TOKEN_RE.search(line) and AMOUNT_TOKEN_RE.search(line))
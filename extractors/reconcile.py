@@ -0,0 +1,62 @@
+import pandas as pd
+from utils.amount_utils import CREDIT, DEBIT, to_rupees
+
+# Running-balance reconciliation for bank statements.
+# The extractor records, per row, the amount and balance it read (integer paise)
+# plus any explicit Cr/Dr marker; balance-only lines (B/F, carried forward) are
+# recorded with no amount. After extraction the whole statement is reconciled in
+# one vectorized pass:
+#   1. rows without an explicit marker get CREDIT/DEBIT from the balance movement
+#      (balance - previous balance == +amount or -amount);
+#   2. expected balances are a cumulative sum of the signed amounts, and every
+#      point where the printed balance stops following it is reported as a break.
+
+def reconcile_balances(chain):
+    """
+    chain: list of dicts with 'paise' (None for balance-only lines), 'balance'
+        (None when the row shows none), 'marker' (explicit "CR"/"DR" or None) and
+        'hint' ("CR"/"DR" from weaker evidence such as a 'Cr' elsewhere in the row).
+    Returns (types, breaks):
+        types: list aligned with `chain`, "CREDIT"/"DEBIT" (None for balance-only lines).
+        breaks: list of {'position', 'expected', 'found'} (paise) where the printed
+            balance does not follow from the previous one.
+    """
+    if not chain:
+        return [], []
+    df = pd.DataFrame({
+        "paise": pd.array([row['paise'] for row in chain], dtype="Int64"),
+        "balance": pd.array([row['balance'] for row in chain], dtype="Int64"),
+        "marker": [row.get('marker') for row in chain],
+        "hint": [row.get('hint') for row in chain],
+    })
+    has_amount = df['paise'].notna()
+
+    # 1. Balance movement since the last printed balance
+    diff = df['balance'] - df['balance'].ffill().shift(1)
+    by_math = pd.Series(None, index=df.index, dtype=object)
+    by_math[(diff == df['paise']).fillna(False)] = CREDIT
+    by_math[(diff == -df['paise']).fillna(False)] = DEBIT
+    # Explicit marker, else the balance math, else the weak hint, else debit
+    direction = df['marker'].where(df['marker'].notna(), by_math)
+    direction = direction.where(direction.notna(), df['hint']).fillna(DEBIT)
+    types = direction.map({CREDIT: "CREDIT", DEBIT: "DEBIT"}).where(has_amount, None)
+
+    # 2. Expected balances: cumulative signed amounts between printed balances
+    signed = df['paise'].where(direction == CREDIT, -df['paise']).fillna(0)
+    running = signed.cumsum()
+    residual = (df['balance'] - running).dropna()
+    steps = residual.diff()
+    breaks = []
+    for position in steps.index[(steps.fillna(0) != 0)]:
+        found = int(df.at[position, 'balance'])
+        breaks.append({
+            "position": int(position),
+            "expected": found - int(steps.at[position]),
+            "found": found
+        })
+    return types.tolist(), breaks
+
+def describe_break(entry, transaction=None):
+    what = f" ({transaction['date']} {transaction['description'][:30]})" if transaction else ""
+    return (f"Balance break at row {entry['position'] + 1}{what}: expected {to_rupees(entry['expected']):,.2f}, "
+            f"statement shows {to_rupees(entry['found']):,.2f}")
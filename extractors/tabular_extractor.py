@@ -0,0 +1,193 @@
+import csv
+import io
+import json
+import os
+import pandas as pd
+from .base_extractor import BaseExtractor
+from .backends import as_stream
+from .bank_extractor import clean_bank_description
+from .line_engine import _dates
+from .reconcile import reconcile_balances, describe_break
+from utils.amount_utils import parse_amounts, CREDIT, DEBIT
+
+# CSV / XLS bank exports.
+# Most banks offer the statement as a spreadsheet too. Its columns are already
+# separated, so a whole export is read in one go and every column is parsed with
+# vectorized string/date operations; there is no page layout to analyse.
+# Each bank's column names live in data/export_mappings.json:
+#   "columns": date, description and either debit + credit, or amount
+#              (+ optional type column with Cr/Dr values); balance is optional
+#   "date_format": strptime format tried first (other shapes fall back to parse_date)
+#   "source": "Bank" (default) or "Credit Card"
+# Mappings are tried in file order, so generic ones go last.
+
+EXPORT_MAPPINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'export_mappings.json')
+# Exports start with a preamble (account holder, address, period); the header row
+# is looked for within this many rows
+HEADER_SCAN_ROWS = 40
+
+def load_export_mappings(mappings_file=EXPORT_MAPPINGS_FILE):
+    if not os.path.exists(mappings_file):
+        return {}
+    try:
+        with open(mappings_file, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading export mappings: {e}")
+        return {}
+
+def _normalize(name):
+    return " ".join(str(name).split()).lower()
+
+def find_header(rows, mappings):
+    """
+    rows: the first rows of the export as lists of cell strings.
+    Returns (row index, mapping name, mapping) for the first row containing every
+    column of a mapping, or None.
+    """
+    for index, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+        cells = {_normalize(cell) for cell in row if cell is not None}
+        for name, mapping in mappings.items():
+            if all(_normalize(column) in cells for column in mapping['columns'].values()):
+                return index, name, mapping
+    return None
+
+def _decode(data):
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+def read_export(source, mappings):
+    """
+    Reads a CSV/XLS/XLSX export (path or in-memory statement) into a DataFrame of
+    strings with normalized column names, starting at the detected header row.
+    Returns (frame, mapping name, mapping); frame is None if no mapping matches.
+    """
+    name = str(getattr(source, 'name', source)).lower()
+    with as_stream(source) as stream:
+        data = stream.read()
+
+    if name.endswith('.csv'):
+        text = _decode(data)
+        head = list(csv.reader(io.StringIO(text)))[:HEADER_SCAN_ROWS]
+        found = find_header(head, mappings)
+        if found is None:
+            return None, None, None
+        header_row, mapping_name, mapping = found
+        # Footers ("Opening balance", totals) with extra fields are dropped
+        frame = pd.read_csv(io.StringIO(text), skiprows=header_row, dtype=str, keep_default_na=False,
+                            skipinitialspace=True, on_bad_lines='skip')
+    else:
+        if name.endswith('.xls'):
+            try:
+                import xlrd  # noqa: F401
+            except ImportError:
+                raise ImportError("Reading .xls exports needs xlrd. Install it with: pip install xlrd")
+        raw = pd.read_excel(io.BytesIO(data), header=None, dtype=str)
+        raw = raw.where(raw.notna(), "")
+        found = find_header(raw.head(HEADER_SCAN_ROWS).values.tolist(), mappings)
+        if found is None:
+            return None, None, None
+        header_row, mapping_name, mapping = found
+        frame = raw.iloc[header_row + 1:].reset_index(drop=True)
+        frame.columns = raw.iloc[header_row].tolist()
+
+    frame.columns = [_normalize(column) for column in frame.columns]
+    return frame, mapping_name, mapping
+
+def _parse_dates(values, date_format=None):
+    """
+    Column of date strings -> "YYYY-MM-DD" strings (None where unparseable).
+    """
+    values = values.str.strip()
+    if date_format:
+        parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+        parsed = parsed.where(parsed.dt.year.between(2000, 2030))
+        dates = parsed.dt.strftime("%Y-%m-%d")
+        missing = dates.isna() & (values != "")
+        if missing.any():
+            dates[missing] = _dates(values[missing])
+        return dates.where(dates.notna(), None)
+    return _dates(values.where(values != ""))
+
+class TabularExtractor(BaseExtractor):
+    required_capabilities = frozenset()
+
+    def __init__(self, file_path, export_mappings=None, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self.export_mappings = export_mappings or EXPORT_MAPPINGS_FILE
+        self.balance_breaks = []
+
+    def extract_transactions(self):
+        self.balance_breaks = []
+        frame, mapping_name, mapping = read_export(self.file_path, load_export_mappings(self.export_mappings))
+        if frame is None:
+            self.debug_logs.append("No export mapping matches this file's header row (see data/export_mappings.json)")
+            self.transactions = []
+            return []
+        self.issuer = mapping_name
+        columns = {key: _normalize(column) for key, column in mapping['columns'].items()}
+        source = mapping.get('source', "Bank")
+        self.debug_logs.append(f"Export mapping '{mapping_name}': {len(frame)} rows")
+
+        dates = _parse_dates(frame[columns['date']], mapping.get('date_format'))
+        descriptions = frame[columns['description']].str.split().str.join(" ")
+        if source == "Bank":
+            descriptions = descriptions.map(clean_bank_description)
+
+        if 'debit' in columns:
+            debit = parse_amounts(frame[columns['debit']])['paise'].abs()
+            credit = parse_amounts(frame[columns['credit']])['paise'].abs()
+            is_debit = (debit > 0).fillna(False)
+            paise = debit.where(is_debit, credit)
+            direction = pd.Series(CREDIT, index=frame.index).where(~is_debit, DEBIT)
+        else:
+            amounts = parse_amounts(frame[columns['amount']])
+            paise = amounts['paise'].abs()
+            if 'type' in columns:
+                type_marker = frame[columns['type']].str.strip().str[:1].str.upper().map({'C': CREDIT, 'D': DEBIT})
+            else:
+                # Signed amounts: negative is money out
+                type_marker = pd.Series(CREDIT, index=frame.index).where(amounts['paise'] >= 0, DEBIT)
+            direction = amounts['marker'].where(amounts['marker'].notna(), type_marker).fillna(DEBIT)
+
+        keep = dates.notna() & (paise > 0).fillna(False)
+        if 'balance' in columns:
+            self._check_balances(frame, columns['balance'], paise, direction, keep, dates, descriptions)
+
+        rows = pd.DataFrame({
+            "date": dates[keep],
+            "description": descriptions[keep],
+            "amount": paise[keep].astype("int64"),
+            "type": direction[keep].map({CREDIT: "CREDIT", DEBIT: "DEBIT"}),
+            "source": source
+        })
+        transactions = rows.to_dict('records')
+        self._report_progress(1, 1, len(transactions))
+        self.transactions = transactions
+        return transactions
+
+    def _check_balances(self, frame, balance_column, paise, direction, keep, dates, descriptions):
+        """
+        Running-balance check (see extractors/reconcile.py) when the export has a
+        balance column. Exports listed newest first are checked in reverse.
+        """
+        balances = parse_amounts(frame[balance_column])['paise'][keep]
+        kept = dates[keep]
+        if balances.notna().sum() < 2:
+            return
+        order = kept.index[::-1] if kept.iloc[0] > kept.iloc[-1] else kept.index
+        chain = [
+            {"paise": int(paise[i]), "balance": None if pd.isna(balances[i]) else int(balances[i]),
+             "marker": direction[i], "hint": None}
+            for i in order
+        ]
+        _, breaks = reconcile_balances(chain)
+        self.balance_breaks = [
+            describe_break(entry, {"date": kept[order[entry["position"]]],
+                                   "description": descriptions[order[entry["position"]]]})
+            for entry in breaks
+        ]
+        for message in self.balance_breaks:
+            self.debug_logs.append(f"  {message}")
@@ -0,0 +1,135 @@
+import json
+import os
+from utils.file_utils import file_lock, write_json_atomic
+
+# Issuer layout templates: where the transactions sit on a statement page.
+# Learned from pages that produced transactions; once a layout has been seen
+# often enough, later pages are parsed on page.crop(region) only, so headers,
+# reward summaries and terms text never go through layout analysis.
+
+# Pages a region must be learned from before it is used for cropping
+MIN_LEARNED_PAGES = 2
+# Padding around the learned region (fraction of page width/height), so wrapped
+# description lines just above/below the first/last transaction stay inside
+REGION_PADDING = 0.02
+# First pages usually carry the account summary; later pages start higher up
+FIRST_PAGE = "first"
+LATER_PAGES = "rest"
+
+def page_role(page_index):
+    return FIRST_PAGE if page_index == 0 else LATER_PAGES
+
+def union_bbox(boxes):
+    boxes = [b for b in boxes if b]
+    if not boxes:
+        return None
+    return (
+        min(b[0] for b in boxes), min(b[1] for b in boxes),
+        max(b[2] for b in boxes), max(b[3] for b in boxes)
+    )
+
+class TemplateRegistry:
+    """
+    Persistent issuer layout templates, keyed "<issuer>/<ExtractorClass>".
+    Regions and column boundaries are stored as fractions of the page size.
+    """
+    def __init__(self, template_file):
+        self.template_file = template_file
+        self.templates = {}
+        # Keys learned or forgotten since the last save
+        self._changed = set()
+        self.load()
+
+    def load(self):
+        self.templates = self._read_templates()
+
+    def _read_templates(self):
+        if not os.path.exists(self.template_file):
+            return {}
+        try:
+            with open(self.template_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading layout templates: {e}")
+            return {}
+
+    def save(self):
+        """
+        Applies this registry's changed keys to the file's current templates
+        (other extractors save too) and writes the result back, under a file lock.
+        """
+        if not self._changed:
+            return
+        try:
+            with file_lock(self.template_file):
+                templates = self._read_templates()
+                for key in self._changed:
+                    if key in self.templates:
+                        templates[key] = self.templates[key]
+                    else:
+                        templates.pop(key, None)
+                write_json_atomic(self.template_file, templates, indent=1, sort_keys=True)
+            self.templates = templates
+            self._changed.clear()
+        except Exception as e:
+            print(f"Error saving layout templates: {e}")
+
+    def region(self, key, page_index, page_bbox):
+        """
+        Returns the learned crop bbox (in page coordinates) for this page, or None
+        while the layout is still unknown.
+        """
+        entry = self.templates.get(key, {}).get("regions", {}).get(page_role(page_index))
+        if not entry or entry["pages"] < MIN_LEARNED_PAGES:
+            return None
+        x0, top, x1, bottom = entry["bbox"]
+        px0, ptop, px1, pbottom = page_bbox
+        width, height = px1 - px0, pbottom - ptop
+        # Clamp: page.crop rejects boxes reaching outside the page
+        return (
+            max(px0, px0 + (x0 - REGION_PADDING) * width),
+            max(ptop, ptop + (top - REGION_PADDING) * height),
+            min(px1, px0 + (x1 + REGION_PADDING) * width),
+            min(pbottom, ptop + (bottom + REGION_PADDING) * height)
+        )
+
+    def columns(self, key, page_bbox):
+        """
+        Returns the learned table column boundaries (x positions) for this page, or None.
+        """
+        fractions = self.templates.get(key, {}).get("columns")
+        if not fractions:
+            return None
+        px0, _, px1, _ = page_bbox
+        return [px0 + f * (px1 - px0) for f in fractions]
+
+    def learn(self, key, page_index, page_bbox, bbox, columns=None):
+        """
+        Widens the region for this page role to include `bbox` (page coordinates)
+        and records table column boundaries if given.
+        """
+        px0, ptop, px1, pbottom = page_bbox
+        width, height = px1 - px0, pbottom - ptop
+        if width <= 0 or height <= 0:
+            return
+        relative = (
+            (bbox[0] - px0) / width, (bbox[1] - ptop) / height,
+            (bbox[2] - px0) / width, (bbox[3] - ptop) / height
+        )
+        template = self.templates.setdefault(key, {"regions": {}})
+        entry = template["regions"].get(page_role(page_index))
+        if entry is None:
+            entry = template["regions"][page_role(page_index)] = {"bbox": list(relative), "pages": 0}
+        else:
+            entry["bbox"] = list(union_bbox([entry["bbox"], relative]))
+        entry["pages"] += 1
+        if columns:
+            template["columns"] = [round((x - px0) / width, 4) for x in sorted(set(columns))]
+        self._changed.add(key)
+
+    def forget(self, key):
+        """
+        Drops a template that no longer matches the issuer's statements.
+        """
+        if self.templates.pop(key, None) is not None:
+            self._changed.add(key)
@@ -1,59 +1,28 @@
 from .base_extractor import BaseExtractor
-from utils.date_utils import parse_date
-import pdfplumber
-import re
+from .line_engine import parse_upi_lines
 
 class UPIExtractor(BaseExtractor):
     def extract_transactions(self):
-        transactions = []
         # UPI statements (like PhonePe/GPay) often have cleaner layouts but can be text-heavy
-        with pdfplumber.open(self.file_path, password=self.password) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                # Pattern: Date ... Paid to/Received from ... Amount
-                
-                # Very simple regex for example
-                # Date format: Feb 20, 2024
-                # Amount: ₹100.00
-                
-                lines = text.split('\n')
-                for line in lines:
-                    # Simple heuristic: Look for lines starting with a date
-                    # And containing an amount
-                    
-                    # Regex for date at start
-                    # This is brittle and would need refining for real PDFs
-                    date_match = re.search(r'^(\w{3}\s\d{1,2},?\s\d{4})', line)
-                    if not date_match:
-                         # Try DD/MM/YYYY
-                        date_match = re.search(r'^(\d{2}/\d{2}/\d{4})', line)
+        # Pattern: Date ... Paid to/Received from ... Amount
+        # Date format: Feb 20, 2024 or DD/MM/YYYY; Amount: ₹100.00, Rs. 100.00 or 100.00
+        lines, page_indexes = self.collect_lines()
 
-                    if date_match:
-                        date_str = date_match.group(1)
-                        date = parse_date(date_str)
-                        
-                        # Look for Amount
-                        # Matches ₹ 123 or Rs. 123 or just 123.00 at end
-                        amount_match = re.search(r'(?:Rs\.?|₹)?\s?([\d,]+\.\d{2})', line)
-                        
-                        if amount_match and date:
-                            amount = float(amount_match.group(1).replace(',', ''))
-                            
-                            # Description is everything else
-                            # Decide type
-                            trans_type = "DEBIT"
-                            if "Received from" in line or "Credit" in line:
-                                trans_type = "CREDIT"
-                            
-                            description = line.replace(date_str, "").replace(amount_match.group(0), "").strip()
-                            
-                            transactions.append({
-                                "date": date,
-                                "description": description,
-                                "amount": amount,
-                                "type": trans_type,
-                                "source": "UPI Wallet"
-                            })
+        # All lines are matched in one vectorized pass (see line_engine)
+        parsed = parse_upi_lines(lines)
+        transactions = []
+        accepted = {}
+        for idx, date, description, paise, trans_type in zip(
+                parsed.index, parsed['date'], parsed['description'], parsed['paise'], parsed['type']):
+            accepted.setdefault(page_indexes[idx], []).append(lines[idx])
+            transactions.append({
+                "date": date,
+                "description": description,
+                "amount": int(paise),
+                "type": trans_type,
+                "source": "UPI Wallet"
+            })
+        self.finish_layout_learning(accepted)
 
         self.transactions = transactions
         return transactions
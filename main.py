@@ -1,26 +1,84 @@
 import os
-import pandas as pd
-from utils.file_utils import list_pdf_files, move_file
-from processors.parser import Parser
+import sys
+import threading
+# Only light, stdlib-backed modules are imported at load time. pandas, pdfplumber,
+# numpy and the extractors are imported inside the functions that need them,
+# so runs with nothing to do (cron/watch wrappers) start fast.
+from utils.file_utils import list_statement_files, is_statement_file, move_file
+from utils.amount_utils import to_rupees
 from processors.categorizer import Categorizer
-from processors.deduplicator import Deduplicator
-from utils.hash_utils import generate_transaction_hash
+from processors.ingest import InMemoryStatement, is_in_memory
+from processors.category_index import CategoryIndex
+from processors.merchant_memo import MerchantMemo
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RAW_DIR = os.path.join(BASE_DIR, 'data', 'raw_pdfs')
 PROCESSED_DIR = os.path.join(BASE_DIR, 'data', 'processed')
 MASTER_FILE = os.path.join(BASE_DIR, 'data', 'master_transactions.xlsx')
+CATEGORY_INDEX_FILE = os.path.join(BASE_DIR, 'data', 'category_index.sqlite')
+MERCHANT_MEMO_FILE = os.path.join(BASE_DIR, 'data', 'merchant_memo.json')
+BATCH_MANIFEST_FILE = os.path.join(BASE_DIR, 'data', 'batch_manifest.json')
+CHECKPOINT_DIR = os.path.join(BASE_DIR, 'data', 'checkpoints')
+LEDGER_DIR = os.path.join(BASE_DIR, 'data', 'ledger')
+# Learned per-issuer transaction regions (see extractors/templates.py)
+LAYOUT_TEMPLATES_FILE = os.path.join(BASE_DIR, 'data', 'layout_templates.json')
+# Recorded page layout for replaying the extractors (see extractors/page_cache.py)
+PAGE_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'page_cache')
+# Ingested statements by issuer/account/period (see processors/fingerprints.py)
+STATEMENT_FINGERPRINTS_FILE = os.path.join(BASE_DIR, 'data', 'statement_fingerprints.json')
+# Files that timed out or were killed in their extraction worker
+QUARANTINE_DIR = os.path.join(BASE_DIR, 'data', 'quarantine')
+# Full-text index over descriptions (see processors/search_index.py)
+SEARCH_INDEX_FILE = os.path.join(BASE_DIR, 'data', 'search_index.sqlite')
+SEARCH_RESULT_LIMIT = 100
 
-import re
+# "excel": everything in MASTER_FILE. "partitioned": one Parquet file per source/year
+# under LEDGER_DIR, so reads and writes touch only the partitions they need.
+LEDGER_LAYOUT = os.environ.get("FINANCE_LEDGER_LAYOUT", "excel")
 
-def scan_and_process(file_paths=None, password=None, source=None):
+# Per-file isolation: each PDF is extracted in a separate worker process with a
+# wall-clock timeout and a memory limit, so one pathological file cannot stall or
+# exhaust the whole batch (see processors/isolation.py). On by default for CLI and
+# batch runs, and for scan_and_process callers such as the Streamlit app, where the
+# worker pool and the hash hand-off keep repeat scans from re-reading the master.
+ISOLATE_FILES = os.environ.get("FINANCE_ISOLATE_FILES", "1") != "0"
+SCAN_ISOLATE_FILES = os.environ.get("FINANCE_SCAN_ISOLATE_FILES", "1") != "0"
+FILE_TIMEOUT_S = float(os.environ.get("FINANCE_FILE_TIMEOUT_S", 300))
+FILE_MEMORY_LIMIT_MB = float(os.environ.get("FINANCE_FILE_MEMORY_LIMIT_MB", 2048))
+
+# Cross-source duplicate matching (bank vs card statements)
+MATCH_DATE_WINDOW_DAYS = 3
+MATCH_AMOUNT_TOLERANCE = 1.0
+DUPLICATE_FLAG_COL = "Possible Duplicate Of"
+
+# `python main.py --check-import-time` fails if importing main takes longer than this
+IMPORT_TIME_BUDGET_MS = 150
+# ...or if importing main pulls in any of these
+HEAVY_MODULES = ("pandas", "numpy", "pdfplumber", "pdfminer", "openpyxl", "pyarrow", "streamlit")
+
+def scan_and_process(file_paths=None, password=None, source=None, progress_callback=None, cancel_event=None,
+                     extractor_options=None, isolate=None, file_timeout=None, memory_limit_mb=None):
     """
-    Scans PDF files, extracts transactions, categorizes, but DOES NOT save to master.
+    Scans PDF statements and CSV/XLS exports, extracts transactions, categorizes,
+    but DOES NOT save to master.
     Args:
         file_paths (list): Optional list of specific file paths to process. If None, scans all in RAW_DIR.
+            Entries may also be InMemoryStatement uploads, which are parsed straight from memory.
+        progress_callback (callable): Optional. Receives progress event dicts
+            ('file_start', 'page', 'file_done'); 'file_done' events carry that file's rows.
+        cancel_event (threading.Event): Optional. When set, the scan stops after the current page
+            and returns whatever was extracted so far.
+        extractor_options (dict): Optional. Passed to the extractors,
+            e.g. {'low_memory': True, 'max_cached_pages': 2, 'rss_budget_mb': 512}.
+            'reingest': True also extracts statements whose fingerprint was already ingested.
+        isolate (bool): Extract each file in a pooled, isolated worker process (default
+            SCAN_ISOLATE_FILES). Files over `file_timeout` seconds or `memory_limit_mb` are quarantined.
     Returns: (DataFrame of new transactions, List of log messages)
     """
+    import pandas as pd
+    from utils.schema_utils import apply_schema
+
     print("Scaning and Processing PDFs...")
     logs = []
     
@@ -28,173 +86,1076 @@ def scan_and_process(file_paths=None, password=None, source=None):
     os.makedirs(RAW_DIR, exist_ok=True)
     os.makedirs(PROCESSED_DIR, exist_ok=True)
     
-    # Initialize components
-    categorizer = Categorizer()
-    deduplicator = Deduplicator(MASTER_FILE)
-    
     if file_paths:
         # Validate paths
-        pdf_files = [p for p in file_paths if os.path.exists(p) and p.endswith('.pdf')]
+        pdf_files = [
+            p for p in file_paths
+            if isinstance(p, InMemoryStatement) or (os.path.exists(p) and is_statement_file(p))
+        ]
     else:
-        pdf_files = list_pdf_files(RAW_DIR)
+        pdf_files = list_statement_files(RAW_DIR)
     
     if not pdf_files:
-        msg = "No PDF files found to process."
+        msg = "No statement files found to process."
         print(msg)
         logs.append(msg)
         return pd.DataFrame(), logs
 
+    if SCAN_ISOLATE_FILES if isolate is None else isolate:
+        # The memo lives in the worker; the master's hashes are loaded here and handed over
+        worker = acquire_file_worker(file_timeout, memory_limit_mb)
+        deduplicator = load_deduplicator(all_partitions=True)
+    else:
+        worker = None
+        merchant_memo = MerchantMemo(MERCHANT_MEMO_FILE, Categorizer())
+        deduplicator = load_deduplicator()
+
     new_transactions = []
     
-    for pdf_path in pdf_files:
-        filename = os.path.basename(pdf_path)
-        print(f"Processing {filename}...")
-        logs.append(f"Processing **{filename}**...")
+    for file_index, pdf_path in enumerate(pdf_files):
+        if cancel_event is not None and cancel_event.is_set():
+            logs.append(f"⏹️ Scan cancelled. {len(pdf_files) - file_index} file(s) not scanned.")
+            break
+
+        filename = os.path.basename(getattr(pdf_path, 'path', pdf_path))
+        _emit_progress(progress_callback, {
+            "stage": "file_start",
+            "file": filename,
+            "file_index": file_index + 1,
+            "files": len(pdf_files)
+        })
+
+        if worker is not None:
+            _, rows, file_logs, _ = extract_isolated(worker, pdf_path, password=password, source=source,
+                                                     extractor_options=extractor_options, deduplicator=deduplicator,
+                                                     progress_callback=progress_callback, cancel_event=cancel_event)
+            logs.extend(file_logs)
+        else:
+            rows = process_file(pdf_path, merchant_memo, deduplicator, logs,
+                                password=password, source=source,
+                                progress_callback=progress_callback, cancel_event=cancel_event,
+                                extractor_options=extractor_options)
+        new_transactions.extend(rows)
+
+        _emit_progress(progress_callback, {
+            "stage": "file_done",
+            "file": filename,
+            "file_index": file_index + 1,
+            "files": len(pdf_files),
+            "rows": rows
+        })
+
+    if worker is not None:
+        release_file_worker(worker)
+    else:
+        merchant_memo.save()
+        if merchant_memo.hits or merchant_memo.misses:
+            print(f"Merchant memo: {merchant_memo.hits} hits, {merchant_memo.misses} misses.")
+            
+    if new_transactions:
+        return apply_schema(pd.DataFrame(new_transactions)), logs
+    else:
+        return pd.DataFrame(), logs
+
+def _emit_progress(progress_callback, event):
+    if progress_callback is not None:
+        progress_callback(event)
+
+def process_file(pdf_path, merchant_memo, deduplicator, logs, password=None, source=None,
+                 progress_callback=None, cancel_event=None, extractor_options=None):
+    """
+    Extracts, cleans, deduplicates and categorizes the transactions of a single PDF
+    (a file path or an InMemoryStatement). Cleaning and categorization go through
+    `merchant_memo` (a MerchantMemo). Appends human readable messages to `logs`.
+    Returns: list of staging rows (dicts) for this file.
+    """
+    import pandas as pd
+    from processors.parser import Parser
+
+    # In-memory uploads are tracked by their pseudo path until committed
+    file_key = getattr(pdf_path, 'path', pdf_path)
+    filename = os.path.basename(file_key)
+    print(f"Processing {filename}...")
+    logs.append(f"Processing **{filename}**...")
+    new_transactions = []
+
+    def on_page(event):
+        # Tag extractor page events with the file they belong to
+        if progress_callback is not None:
+            progress_callback(dict(event, file=filename))
+
+    # Issuer layout templates are on unless the caller set 'layout_templates' (None disables)
+    extractor_options = {'layout_templates': LAYOUT_TEMPLATES_FILE, **(extractor_options or {})}
+    reingest = extractor_options.pop('reingest', False)
+
+    try:
+        parser = Parser(pdf_path, password=password, progress_callback=on_page, cancel_event=cancel_event,
+                        extractor_options=extractor_options)
+
+        # Same issuer, account and period as a committed statement: a re-download
+        ingested = None if reingest else load_fingerprints().get(parser.fingerprint)
+        if ingested:
+            from processors.fingerprints import describe_fingerprint
+            msg = (f"⏭️ {filename}: statement already ingested ({describe_fingerprint(parser.fingerprint)}; "
+                   f"from {ingested['file']} on {ingested['ingested'][:10]}). Skipped.")
+            print(msg)
+            logs.append(msg)
+            return new_transactions
+
+        extracted = parser.parse()
+        count = len(extracted)
+        print(f"  Extracted {count} transactions.")
         
-        try:
-            parser = Parser(pdf_path, password=password)
-            extracted = parser.parse()
-            count = len(extracted)
-            print(f"  Extracted {count} transactions.")
+        # Check for extractor-specific debug logs (from BaseExtractor)
+        if hasattr(parser, 'extractor') and hasattr(parser.extractor, 'debug_logs'):
+             # ALWAYS show logs for debugging "No Changes" issue
+             logs.append("🔍 Detailed Extraction Trace:")
+             # Show last 50 logs
+             for debug_log in parser.extractor.debug_logs[-50:]: 
+                 logs.append(f"- `{debug_log}`")
+             logs.append("--- End Trace ---")
+
+        balance_breaks = getattr(parser.extractor, 'balance_breaks', None)
+        if balance_breaks:
+            logs.append(f"⚠️ {filename}: {len(balance_breaks)} running-balance break(s); rows may be missing or misread. "
+                        f"First: {balance_breaks[0]}")
+
+        # A statement is only recorded as ingested when it was read to the end
+        fingerprint = parser.fingerprint
+        if cancel_event is not None and cancel_event.is_set():
+            logs.append(f"⏹️ {filename}: Scan cancelled part-way. Keeping {count} transactions extracted so far.")
+            fingerprint = None
+
+        if count == 0:
+            logs.append(f"⚠️ Extracted 0 transactions from {filename}. Check password or format.")
+            # Show debug info
+            if hasattr(parser, 'raw_text_debug') and parser.raw_text_debug:
+                logs.append("--- PDF Content Preview (First 3000 chars) ---")
+                logs.append(f"```{parser.raw_text_debug[:3000]}```")
+                logs.append("---------------------------------------------")
+            return new_transactions
             
-            # Check for extractor-specific debug logs (from BaseExtractor)
-            if hasattr(parser, 'extractor') and hasattr(parser.extractor, 'debug_logs'):
-                 # ALWAYS show logs for debugging "No Changes" issue
-                 logs.append("🔍 Detailed Extraction Trace:")
-                 # Show last 50 logs
-                 for debug_log in parser.extractor.debug_logs[-50:]: 
-                     logs.append(f"- `{debug_log}`")
-                 logs.append("--- End Trace ---")
-
-            if count == 0:
-                logs.append(f"⚠️ Extracted 0 transactions from {filename}. Check password or format.")
-                # Show debug info
-                if hasattr(parser, 'raw_text_debug') and parser.raw_text_debug:
-                    logs.append("--- PDF Content Preview (First 3000 chars) ---")
-                    logs.append(f"```{parser.raw_text_debug[:3000]}```")
-                    logs.append("---------------------------------------------")
+        dup_count = 0
+        credit_skipped = 0
+        
+        candidates = []
+        for trans in extracted:
+            # 0. Filter ONLY Debits
+            # Assume parsers return 'type': 'DEBIT' or 'CREDIT'
+            if trans.get('type') == 'CREDIT':
+                credit_skipped += 1
                 continue
-                
-            dup_count = 0
-            credit_skipped = 0
+
+            # Apply Source Override if provided
+            if source:
+                trans['source'] = source
+
+            # 1. Clean Description (Remove leading IDs) and categorize.
+            # Repeat merchants come straight from the memo without any regex/keyword matching.
+            original_desc = trans['description']
+            cleaned_desc, category = merchant_memo.resolve(original_desc)
             
-            for trans in extracted:
-                # 0. Filter ONLY Debits
-                # Assume parsers return 'type': 'DEBIT' or 'CREDIT'
-                if trans.get('type') == 'CREDIT':
-                    credit_skipped += 1
-                    continue
-
-                # Apply Source Override if provided
-                if source:
-                    trans['source'] = source
-
-                # 1. Clean Description (Remove leading IDs)
-                # Matches start of string, digits, optional space/hyphen
-                original_desc = trans['description']
-                cleaned_desc = re.sub(r'^\d+\s*[-]?\s*', '', original_desc).strip()
-                # Also remove "UPI-" or similar prefixes if they remain? 
-                # User's example had "UPI-2177..." inside the text? 
-                # Let's clean standard ID first. User example: "12495376778 UPI-217748023465-NATURALS SS 7"
-                # After removing leading digits: "UPI-217748023465-NATURALS SS 7"
-                # Maybe generic regex for "UPI-xxxx-"? 
-                cleaned_desc = re.sub(r'UPI-\d+-?', '', cleaned_desc).strip()
-                
-                trans['description'] = cleaned_desc
-
-                # 2. Deduplicate (using cleaned description)
-                if deduplicator.is_duplicate(trans):
-                    print(f"  Skipping duplicate: {cleaned_desc} ({trans['amount']})")
-                    dup_count += 1
-                    continue
-                    
-                # 3. Categorize
-                category = categorizer.categorize(cleaned_desc)
-                
-                # 4. Generate Hash (for storage)
-                trans_hash = deduplicator.get_transaction_hash(trans)
-                
-                # 5. Format Date (remove time)
-                date_val = trans['date']
-                if hasattr(date_val, 'date'):
-                    date_val = date_val.date() # YYYY-MM-DD object
-                else:
-                    try:
-                        date_val = pd.to_datetime(date_val).date()
-                    except:
-                        pass # keep as is if fail
-                
-                new_transactions.append({
-                    "Date": date_val,
-                    "Transaction made at": cleaned_desc, # Renamed from Description
-                    "Amount": trans['amount'],
-                    "Category": category,
-                    "Source": trans['source'],
-                    "Hash": trans_hash,
-                    "_filepath": pdf_path # Keep track of file to move later
-                })
+            trans['description'] = cleaned_desc
+            trans['category'] = category
+
+            # 2. Compute the dedupe key once (reused for the stored Hash)
+            candidates.append((trans, deduplicator.get_transaction_key(trans)))
+
+        # 3. Deduplicate the whole file in one batch membership test
+        if candidates:
+            # Partitioned ledger: only the partitions this file's rows could fall into
+            dates = [trans['date'] for trans, _ in candidates]
+            deduplicator.ensure_loaded(
+                sources={trans['source'] for trans, _ in candidates}, start=min(dates), end=max(dates)
+            )
+        duplicate_mask = deduplicator.contains_many([key for _, key in candidates])
+
+        for (trans, trans_key), is_duplicate in zip(candidates, duplicate_mask):
+            if is_duplicate:
+                print(f"  Skipping duplicate: {trans['description']} ({to_rupees(trans['amount'])})")
+                dup_count += 1
+                continue
             
-            if dup_count > 0 or credit_skipped > 0:
-                logs.append(f"ℹ️ {filename}: Extracted {count}. New: {len(new_transactions)}. Skipped: {dup_count} Duplicates, {credit_skipped} Credits.")
+            # 4. Hash for storage (same key as the dedupe check)
+            trans_hash = deduplicator.hash_for_storage(trans, trans_key)
+            
+            # 5. Format Date (remove time)
+            date_val = trans['date']
+            if hasattr(date_val, 'date'):
+                date_val = date_val.date() # YYYY-MM-DD object
             else:
-                logs.append(f"✅ {filename}: Found {count} new transactions.")
-                
-        except Exception as e:
-            err_msg = f"❌ Failed to process {filename}: {repr(e)}"
-            if "Password" in repr(e) or "algorithm" in repr(e):
-                err_msg += " (Check Password?)"
-            print(err_msg)
-            logs.append(err_msg)
+                try:
+                    date_val = pd.to_datetime(date_val).date()
+                except:
+                    pass # keep as is if fail
             
-    if new_transactions:
-        return pd.DataFrame(new_transactions), logs
-    else:
-        return pd.DataFrame(), logs
+            new_transactions.append({
+                "Date": date_val,
+                "Transaction made at": trans['description'], # Renamed from Description
+                "Amount": trans['amount'],
+                "Category": trans['category'],
+                "Source": trans['source'],
+                "Hash": trans_hash,
+                "_filepath": file_key, # Keep track of file to move (or persist) later
+                "_fingerprint": fingerprint # Recorded as ingested on commit (None if cancelled)
+            })
+        
+        if dup_count > 0 or credit_skipped > 0:
+            logs.append(f"ℹ️ {filename}: Extracted {count}. New: {len(new_transactions)}. Skipped: {dup_count} Duplicates, {credit_skipped} Credits.")
+        else:
+            logs.append(f"✅ {filename}: Found {count} new transactions.")
+            
+    except Exception as e:
+        err_msg = f"❌ Failed to process {filename}: {repr(e)}"
+        if "Password" in repr(e) or "algorithm" in repr(e):
+            err_msg += " (Check Password?)"
+        elif isinstance(e, MemoryError):
+            err_msg += " (Try low-memory mode or a larger RSS budget)"
+        print(err_msg)
+        logs.append(err_msg)
+
+    return new_transactions
+
+_master_store = None
 
-def append_to_master(new_df):
+def get_master_store():
     """
-    Appends the provided DataFrame to the master excel file and moves processed PDFs.
+    The process-wide MasterStore (one cached copy of the master per process).
+    """
+    global _master_store
+    if _master_store is None:
+        from processors.master_store import MasterStore
+        _master_store = MasterStore(MASTER_FILE, LEDGER_DIR, layout=LEDGER_LAYOUT)
+    return _master_store
+
+def use_partitioned_ledger():
+    return get_master_store().partitioned
+
+def open_ledger():
+    return get_master_store().ledger
+
+def master_exists():
+    return get_master_store().exists()
+
+def _ledger_signature():
+    return get_master_store().signature()
+
+def read_master(sources=None, start=None, end=None, years=None):
+    """
+    Loads master records. In the partitioned layout only the partitions matching
+    the sources / date range / years are opened; the Excel workbook is parsed
+    once per process and filtered in memory.
+    """
+    return get_master_store().read(sources=sources, start=start, end=end, years=years)
+
+def append_to_master(new_df, ingestor=None):
     """
+    Appends the provided DataFrame to the master records and moves processed PDFs.
+    Writes to the Excel master file, or in the partitioned layout only to the
+    (source, year) partitions that receive rows.
+    In-memory uploads (see processors.ingest) are written to PROCESSED_DIR only now,
+    using the UploadIngestor that staged them.
+    """
+    import pandas as pd
+    from processors.matcher import CrossSourceMatcher, flag_cross_source_duplicates
+    from utils.schema_utils import apply_schema
+
     if new_df.empty:
         return False
+    new_df = apply_schema(new_df)
         
     # Valid columns only (exclude _filepath helper)
     # Note: 'Description' column is now 'Transaction made at'
     required_cols = ["Date", "Transaction made at", "Amount", "Category", "Source", "Hash"]
+    partitioned = use_partitioned_ledger()
     
-    # Load existing data or create new structure
-    if os.path.exists(MASTER_FILE):
-        try:
-            master_df = pd.read_excel(MASTER_FILE)
-            # Handle schema migration if needed
-            if "Description" in master_df.columns and "Transaction made at" not in master_df.columns:
-                master_df.rename(columns={"Description": "Transaction made at"}, inplace=True)
-        except Exception:
-             master_df = pd.DataFrame(columns=required_cols)
-    else:
+    # Only existing rows near the new dates matter for cross-source matching
+    master_signature = _ledger_signature()
+    window = pd.Timedelta(days=MATCH_DATE_WINDOW_DAYS)
+    try:
+        master_df = read_master(start=new_df['Date'].min() - window, end=new_df['Date'].max() + window)
+    except Exception:
         master_df = pd.DataFrame(columns=required_cols)
-        
-    # Concatenate
-    updated_df = pd.concat([master_df, new_df[required_cols]], ignore_index=True)
-    
-    # Ensure Date column is just date (no time)
-    updated_df['Date'] = pd.to_datetime(updated_df['Date']).dt.date
-    
-    updated_df.to_excel(MASTER_FILE, index=False)
-    print(f"Successfully added {len(new_df)} transactions to {MASTER_FILE}")
+    if master_df.empty:
+        master_df = pd.DataFrame(columns=required_cols)
+
+    # Link likely duplicates seen through another source (bank vs card statement)
+    matcher = CrossSourceMatcher(MATCH_DATE_WINDOW_DAYS, MATCH_AMOUNT_TOLERANCE)
+    flagged = flag_cross_source_duplicates(new_df, master_df, matcher, flag_col=DUPLICATE_FLAG_COL)
+    if flagged:
+        print(f"Flagged {flagged} transactions as possible duplicates across sources.")
+    if DUPLICATE_FLAG_COL not in required_cols:
+        required_cols.append(DUPLICATE_FLAG_COL)
+
+    index = CategoryIndex(CATEGORY_INDEX_FILE)
+    index_current = index.source_signature == master_signature
+    search_index = open_search_index()
+    search_current = search_index.source_signature == master_signature
+
+    store = get_master_store()
+    added = store.append(new_df, required_cols)
+    if partitioned:
+        print(f"Successfully added {len(new_df)} transactions to {len(added)} ledger partition(s)")
+        # Rows were grouped per partition in the same order they appear in new_df
+        refs = []
+        for key, (start_pos, count) in added.items():
+            refs.extend([key, start_pos + i] for i in range(count))
+        grouped = new_df.assign(_date=pd.to_datetime(new_df['Date']))
+        grouped = pd.concat([g for _, g in grouped.groupby([grouped['Source'].astype(str), grouped['_date'].dt.year])])
+        new_rows = (grouped["Transaction made at"].tolist(), grouped["Category"].tolist(), refs)
+    else:
+        print(f"Successfully added {len(new_df)} transactions to {MASTER_FILE}")
+        new_rows = (new_df["Transaction made at"].tolist(), new_df["Category"].tolist(), None)
+
+    # Keep the keyword -> row index in step with the appended rows
+    if index_current:
+        index.add_rows(*new_rows)
+        index.source_signature = _ledger_signature()
+    else:
+        load_category_index(index)
+    index.close()
+
+    # Same for the description search index
+    if search_current:
+        search_index.add_rows(new_df)
+        search_index.source_signature = _ledger_signature()
+        search_index.close()
+    else:
+        search_index.close()
+        load_search_index().close()
     
+    # Later re-downloads of these statements are skipped before extraction
+    if '_fingerprint' in new_df.columns and '_filepath' in new_df.columns:
+        fingerprints = load_fingerprints()
+        for fingerprint, pdf_path in new_df[['_fingerprint', '_filepath']].dropna().drop_duplicates().itertuples(index=False):
+            fingerprints.add(fingerprint, os.path.basename(str(pdf_path)))
+        fingerprints.save()
+
     # Move processed files
     if '_filepath' in new_df.columns:
         processed_files = new_df['_filepath'].unique()
         for pdf_path in processed_files:
-            if os.path.exists(pdf_path):
+            if is_in_memory(pdf_path):
+                statement = ingestor.get(pdf_path) if ingestor else None
+                if statement:
+                    ingestor.persist(statement, PROCESSED_DIR)
+                    print(f"Saved {statement.name} to processed.")
+            elif os.path.exists(pdf_path):
                 move_file(pdf_path, PROCESSED_DIR)
                 print(f"Moved {os.path.basename(pdf_path)} to processed.")
                 
     return True
 
+def load_fingerprints():
+    """
+    The index of ingested statement fingerprints (small; read fresh so extraction
+    workers see statements committed after they started).
+    """
+    from processors.fingerprints import FingerprintIndex
+    return FingerprintIndex(STATEMENT_FINGERPRINTS_FILE)
+
+def load_category_index(index=None):
+    """
+    Loads the keyword -> row index, rebuilding it if the master changed
+    behind its back (e.g. edited in Excel or fully re-categorized).
+    """
+    index = index or CategoryIndex(CATEGORY_INDEX_FILE)
+    signature = _ledger_signature()
+    if signature is None or index.source_signature == signature:
+        return index
+
+    store = get_master_store()
+    if store.partitioned:
+        # Row refs are (partition, position) so write-backs touch single partitions
+        index.build([], [])
+        for key in store.select():
+            part = store.read_partition(key)
+            index.add_rows(part["Transaction made at"].tolist(), part["Category"].tolist(),
+                           [(key, pos) for pos in range(len(part))])
+    else:
+        index.build([], [])
+        for df in store.iter_frames():
+            index.add_rows(df["Transaction made at"].tolist(), df["Category"].tolist())
+    index.source_signature = signature
+    return index
+
+def open_search_index():
+    from processors.search_index import SearchIndex
+    return SearchIndex(SEARCH_INDEX_FILE)
+
+def load_search_index():
+    """
+    Opens the description search index, rebuilding it if the master changed
+    behind its back (edited in Excel, re-categorized, cleared).
+    """
+    index = open_search_index()
+    signature = _ledger_signature()
+    if index.source_signature == signature:
+        return index
+
+    store = get_master_store()
+    if signature is None:
+        frames = []
+    elif store.partitioned:
+        frames = (store.read_partition(key) for key in store.select())
+    else:
+        frames = store.iter_frames()
+    index.build(frames)
+    index.source_signature = signature
+    print(f"Rebuilt search index ({len(index)} transactions).")
+    return index
+
+def search_transactions(text, limit=SEARCH_RESULT_LIMIT):
+    """
+    Full-text search over "Transaction made at" across the whole master.
+    Returns (rows, total): up to `limit` matches, newest first, as dicts.
+    """
+    with load_search_index() as index:
+        return index.search(text, limit=limit)
+
+def _write_category_changes(index, changes):
+    """
+    Writes changed Category cells back. In the partitioned layout only the
+    affected ledger partitions are rewritten.
+    The Excel master can't be patched in place: an xlsx file is a zip of XML
+    parts, so any changed cell means writing the whole workbook again. It is
+    streamed from the store's cached chunks rather than loaded into openpyxl.
+    """
+    from utils.schema_utils import as_editable
+    store = get_master_store()
+    if store.partitioned:
+        by_partition = {}
+        for row_id, category in changes.items():
+            key, pos = index.ref(row_id)
+            by_partition.setdefault(key, {})[pos] = category
+        for key, updates in by_partition.items():
+            part = as_editable(store.read_partition(key))
+            for pos, category in updates.items():
+                part.at[pos, "Category"] = category
+            store.write_partition(key, part)
+        return
+
+    def updated_chunks():
+        offset = 0
+        for df in store.iter_frames():
+            updates = {row_id - offset: category for row_id, category in changes.items()
+                       if offset <= row_id < offset + len(df)}
+            offset += len(df)
+            if updates:
+                df = as_editable(df.copy(), ['Category'])
+                df.iloc[list(updates), df.columns.get_loc('Category')] = list(updates.values())
+            yield df
+
+    store.rewrite(updated_chunks())
+
+def recategorize_keyword(keyword, categorizer=None, index=None):
+    """
+    Re-applies categories only to master rows whose description contains `keyword`
+    (after it was added or moved) and writes back the changed categories (see
+    _write_category_changes for what that costs per layout).
+    Returns the number of rows updated.
+    """
+    if not master_exists():
+        return 0
+    categorizer = categorizer or Categorizer()
+    index = index or load_category_index()
+    changes = index.recategorize(keyword, categorizer)
+    if not changes:
+        return 0
+
+    _write_category_changes(index, changes)
+    index.source_signature = _ledger_signature()
+    print(f"Re-categorized {len(changes)} transactions matching '{keyword}'.")
+    return len(changes)
+
+def recategorize_all(sources=None, years=None, categorizer=None):
+    """
+    Re-applies categories to every row in scope. In the partitioned layout only
+    the partitions for the given sources/years are read and rewritten.
+    Returns the number of rows re-categorized.
+    """
+    import pandas as pd
+    from utils.schema_utils import as_editable
+
+    categorizer = categorizer or Categorizer()
+    store = get_master_store()
+    if store.partitioned:
+        count = 0
+        for key in store.select(sources=sources, years=years):
+            part = store.read_partition(key)
+            part['Category'] = part['Transaction made at'].apply(categorizer.categorize)
+            store.write_partition(key, part)
+            count += len(part)
+        return count
+
+    if not store.exists():
+        return 0
+    count = 0
+
+    def recategorized_chunks():
+        nonlocal count
+        for df in store.iter_frames():
+            # Chunks are the store's cached copy; work on our own
+            df = as_editable(df.copy(), ['Category'])
+            scope = pd.Series(True, index=df.index)
+            if sources is not None:
+                scope &= df['Source'].isin(sources)
+            if years is not None:
+                scope &= df['Date'].dt.year.isin(years)
+            df.loc[scope, 'Category'] = df.loc[scope, 'Transaction made at'].apply(categorizer.categorize)
+            count += int(scope.sum())
+            yield df
+
+    store.rewrite(recategorized_chunks())
+    return count
+
+def migrate_to_partitioned():
+    """
+    Copies the Excel master file into the partitioned ledger layout.
+    """
+    from processors.master_store import MasterStore
+
+    ledger = open_ledger()
+    if ledger.exists():
+        print(f"Ledger at {LEDGER_DIR} already has data; not migrating.")
+        return 0
+    workbook = MasterStore(MASTER_FILE)
+    if not workbook.exists():
+        return 0
+    # Partitions only ever hold compact digests
+    migrate_master_hashes(workbook)
+    master_df = workbook.read()
+    added = ledger.append(master_df)
+    print(f"Migrated {len(master_df)} transactions into {len(added)} partitions under {LEDGER_DIR}. "
+          f"Set FINANCE_LEDGER_LAYOUT=partitioned to use them.")
+    return len(master_df)
+
+def migrate_master_hashes(store=None):
+    """
+    Rewrites the master workbook's Hash column from legacy SHA-256 hex to compact
+    BLAKE2b digests. Returns the number of rows whose hash changed.
+    """
+    import pandas as pd
+    from processors.master_store import MasterStore
+    from processors.deduplicator import migrate_hash_column
+
+    # Ledger partitions are always written with digests; this is about the workbook
+    store = store or MasterStore(MASTER_FILE)
+    if not store.exists():
+        return 0
+    master_df = store.read()
+    if master_df.empty:
+        return 0
+    migrated_df = migrate_hash_column(master_df)
+    changed = int((migrated_df['Hash'].astype(str) != master_df['Hash'].astype(str)).sum())
+    if changed:
+        # Keep cross-source links pointing at the migrated hashes
+        if DUPLICATE_FLAG_COL in migrated_df.columns:
+            renamed = dict(zip(master_df['Hash'].astype(str), migrated_df['Hash']))
+            migrated_df[DUPLICATE_FLAG_COL] = migrated_df[DUPLICATE_FLAG_COL].map(
+                lambda h: renamed.get(str(h), h) if pd.notna(h) else h
+            )
+        store.rewrite([migrated_df], list(migrated_df.columns))
+    print(f"Migrated {changed} legacy hashes in {MASTER_FILE}")
+    return changed
+
+def export_master(fmt, output_path=None, chunk_rows=None):
+    """
+    Exports the master records as CSV, Parquet or Arrow IPC.
+    Returns the path written.
+    """
+    import pandas as pd
+    from utils.export_utils import EXPORT_FORMATS, DEFAULT_CHUNK_ROWS, write_export
+
+    store = get_master_store()
+    if not store.exists():
+        raise FileNotFoundError(f"No master records found at {store.location()}")
+    master_df = store.read()
+
+    if output_path is None:
+        output_path = os.path.splitext(MASTER_FILE)[0] + EXPORT_FORMATS[fmt][1]
+    write_export(master_df, fmt, output_path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS)
+    print(f"Exported {len(master_df)} transactions to {output_path}")
+    return output_path
+
+def load_deduplicator(all_partitions=False):
+    """
+    A Deduplicator over the process's cached master. With `all_partitions`, every
+    ledger partition's hashes are loaded up front (for handing to worker processes).
+    """
+    from processors.deduplicator import Deduplicator
+    deduplicator = Deduplicator(get_master_store())
+    if all_partitions:
+        deduplicator.ensure_loaded()
+    # Identifies the loaded hashes when they are sent to workers (see extract_isolated)
+    deduplicator.source_signature = _ledger_signature()
+    return deduplicator
+
+# Per-process state for batch workers (built once per worker, not per file)
+_batch_worker_state = {}
+
+def _init_batch_worker(digests=None):
+    """
+    Per-process state for _batch_extract. `digests` are the master's hashes loaded by
+    the parent (DigestSet.to_array()); without them the master is read here.
+    """
+    from processors.deduplicator import Deduplicator
+    _batch_worker_state['merchant_memo'] = MerchantMemo(MERCHANT_MEMO_FILE, Categorizer())
+    if digests is None:
+        _batch_worker_state['deduplicator'] = Deduplicator(get_master_store())
+    else:
+        _batch_worker_state['deduplicator'] = Deduplicator.from_digests(digests)
+
+def _batch_extract(pdf_path, password=None, source=None, extractor_options=None,
+                   progress_callback=None, cancel_event=None, digests=None, dry_run=False):
+    """
+    Extracts one file for run_batch and isolated scans. Runs in a worker process
+    when workers > 1 or isolation is on. With dry_run the merchant memo is not saved.
+    Returns (pdf_path, rows, logs, error).
+    """
+    if digests is not None or not _batch_worker_state:
+        _init_batch_worker(digests)
+    logs = []
+    rows = process_file(pdf_path, _batch_worker_state['merchant_memo'], _batch_worker_state['deduplicator'], logs,
+                        password=password, source=source, progress_callback=progress_callback,
+                        cancel_event=cancel_event, extractor_options=extractor_options)
+    if not dry_run:
+        _batch_worker_state['merchant_memo'].save()
+    error = next((log for log in logs if log.startswith("❌")), None)
+    return pdf_path, rows, logs, error
+
+def open_file_worker(timeout=None, memory_limit_mb=None):
+    """
+    Starts an isolated extraction worker (see processors/isolation.py) running _batch_extract.
+    Its state is set up lazily from the first job (see _init_batch_worker).
+    """
+    from processors.isolation import FileWorker
+    return FileWorker(
+        _batch_extract,
+        timeout=FILE_TIMEOUT_S if timeout is None else timeout,
+        memory_limit_mb=FILE_MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb
+    )
+
+# Idle isolated workers, kept across scans so each scan doesn't pay for a process
+# start and fresh imports
+_idle_file_workers = []
+_file_workers_lock = threading.Lock()
+
+def acquire_file_worker(timeout=None, memory_limit_mb=None):
+    """
+    An idle pooled FileWorker with these limits, or a new one. Hand it back with
+    release_file_worker().
+    """
+    timeout = FILE_TIMEOUT_S if timeout is None else timeout
+    memory_limit_mb = FILE_MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb
+    with _file_workers_lock:
+        for worker in _idle_file_workers:
+            if worker.timeout == timeout and worker.memory_limit_mb == memory_limit_mb:
+                _idle_file_workers.remove(worker)
+                return worker
+    return open_file_worker(timeout, memory_limit_mb)
+
+def release_file_worker(worker):
+    with _file_workers_lock:
+        if not _idle_file_workers:
+            import atexit
+            atexit.register(close_file_workers)
+        _idle_file_workers.append(worker)
+
+def close_file_workers():
+    with _file_workers_lock:
+        workers = list(_idle_file_workers)
+        _idle_file_workers.clear()
+    for worker in workers:
+        worker.close()
+
+def quarantine_file(pdf_path, reason, dry_run=False):
+    """
+    Moves a file that could not be extracted safely to QUARANTINE_DIR so later runs
+    skip it. In-memory uploads, and every file with dry_run, are only logged.
+    Returns the log line.
+    """
+    path = getattr(pdf_path, 'path', pdf_path)
+    if dry_run:
+        msg = f"[dry run] Would quarantine {os.path.basename(path)}: {reason}"
+        print(msg)
+        return msg
+    dest = None
+    if not is_in_memory(path) and os.path.exists(path):
+        dest = move_file(path, QUARANTINE_DIR)
+    msg = f"🧯 Quarantined {os.path.basename(path)}: {reason}"
+    if dest:
+        msg += f" (moved to {os.path.relpath(dest, BASE_DIR)})"
+    print(msg)
+    return msg
+
+def extract_isolated(worker, pdf_path, password=None, source=None, extractor_options=None, deduplicator=None,
+                     progress_callback=None, cancel_event=None, dry_run=False):
+    """
+    Extracts one file in `worker` (a FileWorker). A file that times out, runs out of
+    memory or kills the worker is quarantined (only reported with dry_run) and
+    yields no rows.
+    `deduplicator` (see load_deduplicator) supplies the master's hashes; they are
+    only sent when the worker hasn't received this set yet.
+    Returns (pdf_path, rows, logs, error).
+    """
+    logs = []
+    kwargs = {}
+    if deduplicator is not None:
+        digests_tag = (deduplicator.source_signature, len(deduplicator.existing_hashes))
+        if worker.state != digests_tag:
+            kwargs['digests'] = deduplicator.existing_hashes.to_array()
+    try:
+        result = worker.run(pdf_path, password=password, source=source, extractor_options=extractor_options,
+                            progress_callback=progress_callback, cancel_event=cancel_event, dry_run=dry_run,
+                            **kwargs)
+        if deduplicator is not None:
+            worker.state = digests_tag
+        _, rows, logs, error = result
+        if not (error and "MemoryError" in error):
+            return result
+        # The worker survived the MemoryError, but its heap is not worth keeping
+        worker.restart()
+        reason = f"out of memory (limit {worker.memory_limit_mb:.0f} MB)"
+    except (TimeoutError, ChildProcessError) as e:
+        reason = str(e)
+    error = quarantine_file(pdf_path, reason, dry_run=dry_run)
+    logs.append(error)
+    return pdf_path, [], logs, error
+
+def run_batch(workers=1, commit_batch_size=20, dry_run=False, password=None, source=None,
+              extractor_options=None, retry_failed=False, isolate=None, file_timeout=None, memory_limit_mb=None):
+    """
+    Headless, resumable batch over RAW_DIR driven by a job manifest.
+    Every file is checkpointed as soon as it is extracted and rows are committed to master
+    every `commit_batch_size` files, so a rerun after a crash picks up where it stopped.
+    With dry_run, files are extracted and counted but nothing is written: no manifest,
+    master, merchant memo or layout template updates.
+    With isolation (default ISOLATE_FILES), `workers` pooled isolated worker processes
+    extract the files; files over the timeout or memory limit are quarantined (with
+    dry_run, only reported). Worker
+    processes get the master's hashes from here instead of reading the master.
+    Returns a summary dict.
+    """
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from processors.batch import BatchManifest, PENDING, EXTRACTED, FAILED
+
+    if dry_run:
+        # Extraction would otherwise learn (and save) issuer layout templates
+        extractor_options = dict(extractor_options or {}, layout_templates=None)
+
+    manifest = BatchManifest(BATCH_MANIFEST_FILE, CHECKPOINT_DIR)
+    manifest.plan(list_statement_files(RAW_DIR))
+    statuses = (PENDING, FAILED) if retry_failed else (PENDING,)
+    todo = [p for p in manifest.with_status(*statuses) if os.path.exists(p)]
+    ready = [p for p in manifest.with_status(EXTRACTED) if os.path.exists(p)]
+    if not dry_run:
+        manifest.save()
+    print(f"Batch: {len(todo)} files to extract, {len(ready)} already extracted (resuming), "
+          f"{workers} worker(s), commit every {commit_batch_size} files{' [DRY RUN]' if dry_run else ''}.")
+
+    summary = {"extracted": 0, "failed": 0, "committed_files": 0, "committed_rows": 0, "dry_run_rows": 0}
+    committed_hashes = set()
+
+    def commit(paths):
+        rows = []
+        for path in paths:
+            rows.extend(manifest.load_checkpoint(path))
+        # Files extracted in the same run were deduplicated against the master as it was
+        # when the workers started; drop repeats across them here
+        unique_rows = []
+        for row in rows:
+            if row["Hash"] not in committed_hashes:
+                committed_hashes.add(row["Hash"])
+                unique_rows.append(row)
+        if unique_rows:
+            append_to_master(pd.DataFrame(unique_rows))
+        # append_to_master only moves files that contributed rows; files with none
+        # (all duplicates, nothing extracted, fingerprint already ingested) are done too
+        for path in paths:
+            if os.path.exists(path):
+                move_file(path, PROCESSED_DIR)
+        manifest.mark_committed(paths)
+        manifest.save()
+        summary["committed_files"] += len(paths)
+        summary["committed_rows"] += len(unique_rows)
+        print(f"Committed {len(unique_rows)} transactions from {len(paths)} files.")
+
+    def handle(result):
+        pdf_path, rows, logs, error = result
+        if error:
+            summary["failed"] += 1
+            print(error)
+            if not dry_run:
+                manifest.mark_failed(pdf_path, error)
+                manifest.save()
+            return
+        summary["extracted"] += 1
+        if dry_run:
+            summary["dry_run_rows"] += len(rows)
+            print(f"[dry run] {os.path.basename(pdf_path)}: {len(rows)} new transactions")
+            return
+        manifest.mark_extracted(pdf_path, rows)
+        manifest.save()
+        ready.append(pdf_path)
+        if len(ready) >= commit_batch_size:
+            commit(ready[:])
+            ready.clear()
+
+    if not dry_run and len(ready) >= commit_batch_size:
+        commit(ready[:])
+        ready.clear()
+
+    isolate = ISOLATE_FILES if isolate is None else isolate
+    if todo and (isolate or (workers > 1 and len(todo) > 1)):
+        # Loaded once here; workers get the hashes instead of each re-reading the master
+        deduplicator = load_deduplicator(all_partitions=True)
+
+    if todo and isolate:
+        # One isolated worker per thread; a killed worker is replaced on its next file
+        from concurrent.futures import ThreadPoolExecutor
+        from queue import Queue
+        idle = Queue()
+        file_workers = [acquire_file_worker(file_timeout, memory_limit_mb) for _ in range(min(workers, len(todo)))]
+        for worker in file_workers:
+            idle.put(worker)
+
+        def extract(pdf_path):
+            worker = idle.get()
+            try:
+                return extract_isolated(worker, pdf_path, password=password, source=source,
+                                        extractor_options=extractor_options, deduplicator=deduplicator,
+                                        dry_run=dry_run)
+            finally:
+                idle.put(worker)
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(file_workers)) as pool:
+                for future in as_completed([pool.submit(extract, p) for p in todo]):
+                    handle(future.result())
+        finally:
+            for worker in file_workers:
+                release_file_worker(worker)
+    elif workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(deduplicator.existing_hashes.to_array(),)) as pool:
+            futures = [pool.submit(_batch_extract, p, password, source, extractor_options, dry_run=dry_run)
+                       for p in todo]
+            for future in as_completed(futures):
+                handle(future.result())
+    else:
+        for pdf_path in todo:
+            handle(_batch_extract(pdf_path, password, source, extractor_options, dry_run=dry_run))
+
+    if ready and not dry_run:
+        commit(ready[:])
+
+    print(f"Batch done: {summary}")
+    return summary
+
+def replay_page_cache(output_path=None, extractor_options=None):
+    """
+    Re-runs extractor selection and parsing for every recorded statement in
+    PAGE_CACHE_DIR without opening any PDF (for iterating on the heuristics).
+    Prints per-file counts; writes all extracted rows as CSV to `output_path` if given.
+    Returns {file name: transaction count}.
+    """
+    import time
+    from extractors.page_cache import PageCache
+    from processors.parser import Parser
+
+    # Templates are learned from full pages; replay the heuristics on their own
+    options = dict(extractor_options or {}, page_cache=PAGE_CACHE_DIR, layout_templates=None)
+    options.pop('reingest', None)
+    entries = PageCache(PAGE_CACHE_DIR).entries()
+    if not entries:
+        print(f"No page recordings in {PAGE_CACHE_DIR}. Run with --record-pages first.")
+        return {}
+
+    counts = {}
+    rows = []
+    start = time.perf_counter()
+    for cache_path, name in entries:
+        try:
+            parser = Parser(cache_path, extractor_options=options)
+            transactions = parser.parse()
+        except Exception as e:
+            print(f"{name}: failed: {repr(e)}")
+            continue
+        extractor = type(parser.extractor).__name__ if parser.extractor else "-"
+        counts[name] = len(transactions)
+        print(f"{name:<40} {extractor:<22} {len(transactions):>5} transactions")
+        rows.extend(dict(t, file=name) for t in transactions)
+    print(f"Replayed {len(entries)} statements in {time.perf_counter() - start:.2f}s, "
+          f"{sum(counts.values())} transactions")
+
+    if output_path:
+        import pandas as pd
+        from utils.amount_utils import series_to_rupees
+        df = pd.DataFrame(rows)
+        if 'amount' in df.columns:
+            df['amount'] = series_to_rupees(df['amount'])
+        df.to_csv(output_path, index=False)
+        print(f"Wrote {len(rows)} rows to {output_path}")
+    return counts
+
+def check_import_time(budget_ms=IMPORT_TIME_BUDGET_MS):
+    """
+    Imports main in a fresh interpreter with -X importtime and checks the cumulative
+    import time against `budget_ms` and that no heavy library was pulled in.
+    Returns True if within budget.
+    """
+    import subprocess
+    probe = (
+        "import sys, main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        return False
+
+    # importtime lines: "import time: self [us] | cumulative | imported package"
+    main_us = None
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == "main":
+            main_us = int(parts[1])
+    heavy = [m for m in result.stdout.strip().split(",") if m]
+
+    ok = True
+    if main_us is not None:
+        print(f"import main: {main_us / 1000:.1f} ms (budget {budget_ms} ms)")
+        if main_us / 1000 > budget_ms:
+            ok = False
+    if heavy:
+        print(f"Heavy modules imported at startup: {', '.join(heavy)}")
+        ok = False
+    print("Import budget OK" if ok else "Import budget EXCEEDED")
+    return ok
+
 if __name__ == "__main__":
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="Process PDF statements and CSV/XLS exports in data/raw_pdfs into the master sheet.")
+    arg_parser.add_argument("--low-memory", action="store_true",
+                            help="Release each page's parsed layout as soon as it is processed (for very large PDFs).")
+    arg_parser.add_argument("--max-cached-pages", type=int, default=2,
+                            help="Pages kept parsed at once in low-memory mode (default: 2).")
+    arg_parser.add_argument("--rss-budget-mb", type=float, default=None,
+                            help="Abort a file if it grows the process RSS by more than this many MB.")
+    arg_parser.add_argument("--text-backend", choices=["pdfplumber", "pypdf2", "pdfminer-fast"], default=None,
+                            help="Text backend for text-only extractors (credit card, UPI). Bank tables always use pdfplumber.")
+    arg_parser.add_argument("--no-layout-templates", action="store_true",
+                            help="Parse full pages instead of the learned per-issuer transactions region.")
+    arg_parser.add_argument("--no-page-prefilter", action="store_true",
+                            help="Parse every page, including those without any date and amount (terms, offers).")
+    arg_parser.add_argument("--reingest", action="store_true",
+                            help="Extract statements even if the same issuer/account/period was already ingested.")
+    arg_parser.add_argument("--record-pages", action="store_true",
+                            help="Record each statement's page layout to data/page_cache (replayed on later runs).")
+    arg_parser.add_argument("--replay-pages", action="store_true",
+                            help="Re-run the extractors on all recorded pages without opening PDFs (use --output for CSV).")
+    arg_parser.add_argument("--no-isolation", action="store_true",
+                            help="Extract files in this process instead of isolated worker processes.")
+    arg_parser.add_argument("--file-timeout", type=float, default=None,
+                            help=f"Quarantine a file whose extraction takes longer than this many seconds (default: {FILE_TIMEOUT_S:.0f}).")
+    arg_parser.add_argument("--file-memory-mb", type=float, default=None,
+                            help=f"Memory limit of an extraction worker in MB (default: {FILE_MEMORY_LIMIT_MB:.0f}).")
+    arg_parser.add_argument("--export", choices=["csv", "parquet", "arrow", "xlsx"],
+                            help="Export the master records in this format instead of processing PDFs.")
+    arg_parser.add_argument("--output", help="Export destination (default: next to the master file).")
+    arg_parser.add_argument("--chunk-rows", type=int, default=None,
+                            help="Rows written per chunk when exporting (default: 50000).")
+    arg_parser.add_argument("--search", metavar="TEXT",
+                            help="Search transaction descriptions (all words, prefix match) and print the matches.")
+    arg_parser.add_argument("--limit", type=int, default=SEARCH_RESULT_LIMIT,
+                            help=f"Maximum rows printed by --search (default: {SEARCH_RESULT_LIMIT}).")
+    arg_parser.add_argument("--migrate-hashes", action="store_true",
+                            help="Rewrite legacy SHA-256 hashes in the master file as compact BLAKE2b digests.")
+    arg_parser.add_argument("--migrate-to-partitioned", action="store_true",
+                            help="Copy the Excel master into the per-source/year Parquet ledger (data/ledger).")
+    arg_parser.add_argument("--check-import-time", nargs="?", type=float, const=IMPORT_TIME_BUDGET_MS, default=None,
+                            metavar="BUDGET_MS", help=f"Check CLI import time against a budget (default {IMPORT_TIME_BUDGET_MS} ms).")
+    batch_group = arg_parser.add_argument_group("batch mode (resumable, checkpointed)")
+    batch_group.add_argument("--batch", action="store_true",
+                             help="Process raw_pdfs with a job manifest; reruns resume from the last checkpoint.")
+    batch_group.add_argument("--workers", type=int, default=1, help="Parallel extraction processes (default: 1).")
+    batch_group.add_argument("--commit-batch-size", type=int, default=20,
+                             help="Commit to the master sheet every N extracted files (default: 20).")
+    batch_group.add_argument("--dry-run", action="store_true", help="Extract and report only; write nothing.")
+    batch_group.add_argument("--retry-failed", action="store_true", help="Also retry files that failed previously.")
+    batch_group.add_argument("--password", default=None, help="Password for protected PDFs.")
+    batch_group.add_argument("--source", default=None, help="Override the source for all files.")
+    args = arg_parser.parse_args()
+
+    if args.check_import_time is not None:
+        sys.exit(0 if check_import_time(args.check_import_time) else 1)
+
+    if args.search is not None:
+        rows, total = search_transactions(args.search, limit=max(1, args.limit))
+        for row in rows:
+            # A master row with a blank Amount cell is indexed with a NULL amount
+            amount = f"{row['Amount']:>12,.2f}" if row['Amount'] is not None else f"{'-':>12}"
+            print(f"{row['Date']}  {amount}  {row['Source']:<12} {row['Category']:<14} {row['Transaction made at']}")
+        shown = f" (showing {len(rows)})" if total > len(rows) else ""
+        print(f"{total} matching transaction(s){shown}.")
+        sys.exit(0)
+
+    if args.migrate_hashes:
+        migrate_master_hashes()
+        sys.exit(0)
+
+    if args.migrate_to_partitioned:
+        migrate_to_partitioned()
+        sys.exit(0)
+
+    if args.export:
+        export_master(args.export, args.output, chunk_rows=args.chunk_rows)
+        sys.exit(0)
+
+    extractor_options = {}
+    if args.low_memory:
+        extractor_options.update(low_memory=True, max_cached_pages=args.max_cached_pages)
+    if args.rss_budget_mb:
+        extractor_options['rss_budget_mb'] = args.rss_budget_mb
+    if args.text_backend:
+        extractor_options['text_backend'] = args.text_backend
+    if args.no_layout_templates:
+        extractor_options['layout_templates'] = None
+    if args.reingest:
+        extractor_options['reingest'] = True
+    if args.no_page_prefilter:
+        extractor_options['page_prefilter'] = False
+    if args.record_pages:
+        extractor_options['page_cache'] = PAGE_CACHE_DIR
+
+    isolation = {
+        'isolate': not args.no_isolation and ISOLATE_FILES,
+        'file_timeout': args.file_timeout,
+        'memory_limit_mb': args.file_memory_mb
+    }
+
+    if args.replay_pages:
+        replay_page_cache(args.output, extractor_options)
+        sys.exit(0)
+
+    # Nothing to do: exit before any heavy import
+    if not list_statement_files(RAW_DIR) and not args.batch:
+        print("No statement files found to process.")
+        sys.exit(0)
+
+    if args.batch:
+        run_batch(workers=max(1, args.workers), commit_batch_size=max(1, args.commit_batch_size),
+                  dry_run=args.dry_run, password=args.password, source=args.source,
+                  extractor_options=extractor_options, retry_failed=args.retry_failed, **isolation)
+        sys.exit(0)
+
     # CLI behavior - automatic
-    df = scan_and_process()
+    df, _ = scan_and_process(password=args.password, source=args.source, extractor_options=extractor_options,
+                             **isolation)
     if not df.empty:
         append_to_master(df)
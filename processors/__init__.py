@@ -1,3 +1,16 @@
-from .parser import Parser
-from .categorizer import Categorizer
-from .deduplicator import Deduplicator
+# Re-exports are resolved lazily so that importing a light submodule
+# (e.g. processors.categorizer) doesn't pull in pdfplumber/pandas.
+_EXPORTS = {
+    "Parser": ".parser",
+    "Categorizer": ".categorizer",
+    "Deduplicator": ".deduplicator",
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        module = importlib.import_module(_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = list(_EXPORTS)
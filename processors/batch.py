@@ -0,0 +1,84 @@
+import json
+import os
+import time
+from datetime import date, datetime
+from utils.hash_utils import generate_file_hash
+
+PENDING = "pending"
+EXTRACTED = "extracted"
+COMMITTED = "committed"
+FAILED = "failed"
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+class BatchManifest:
+    """
+    On-disk job manifest for headless batch runs.
+    Each file moves pending -> extracted (rows checkpointed to disk) -> committed,
+    so a rerun after a crash resumes from the last checkpoint instead of starting over.
+    """
+    def __init__(self, manifest_file, checkpoint_dir):
+        self.manifest_file = manifest_file
+        self.checkpoint_dir = checkpoint_dir
+        self.files = {} # path -> entry dict
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.manifest_file):
+            return
+        try:
+            with open(self.manifest_file, 'r') as f:
+                self.files = json.load(f).get("files", {})
+        except Exception as e:
+            print(f"Error loading batch manifest: {e}")
+
+    def save(self):
+        # Write-then-rename so a crash mid-write never corrupts the manifest
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "files": self.files}, f, indent=1)
+        os.replace(tmp_file, self.manifest_file)
+
+    def plan(self, file_paths):
+        """
+        Adds new files as pending. A file whose content changed since it was
+        planned is reset to pending; unchanged files keep their status, so
+        committed files are not extracted again.
+        """
+        for path in file_paths:
+            content_hash = generate_file_hash(path)
+            entry = self.files.get(path)
+            if entry and entry.get("content_hash") == content_hash:
+                continue
+            self.files[path] = {"status": PENDING, "content_hash": content_hash}
+
+    def with_status(self, *statuses):
+        return [path for path, entry in self.files.items() if entry["status"] in statuses]
+
+    def _checkpoint_path(self, path):
+        return os.path.join(self.checkpoint_dir, f"{self.files[path]['content_hash'][:32]}.json")
+
+    def mark_extracted(self, path, rows):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        checkpoint = self._checkpoint_path(path)
+        with open(checkpoint, 'w') as f:
+            json.dump(rows, f, default=_json_default)
+        self.files[path].update(status=EXTRACTED, checkpoint=checkpoint, rows=len(rows), error=None)
+
+    def mark_failed(self, path, error):
+        self.files[path].update(status=FAILED, error=error)
+
+    def load_checkpoint(self, path):
+        with open(self.files[path]["checkpoint"], 'r') as f:
+            return json.load(f)
+
+    def mark_committed(self, paths):
+        for path in paths:
+            entry = self.files[path]
+            checkpoint = entry.pop("checkpoint", None)
+            if checkpoint and os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            entry["status"] = COMMITTED
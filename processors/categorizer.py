@@ -87,5 +87,30 @@ class Categorizer:
         self.save_rules()
         return True, None
 
+    def move_keyword(self, keyword, category):
+        """
+        Moves an existing keyword to another category (adds it if it doesn't exist yet).
+        Returns the category it was moved from, or None.
+        """
+        previous = self.remove_keyword(keyword, save=False)
+        keyword = keyword.lower().strip()
+        self.rules.setdefault(category, []).append(keyword)
+        self.save_rules()
+        return previous
+
+    def remove_keyword(self, keyword, save=True):
+        """
+        Removes a keyword from whichever category holds it.
+        Returns that category, or None if the keyword was not found.
+        """
+        keyword = keyword.lower().strip()
+        for cat, keywords in self.rules.items():
+            if keyword in keywords:
+                keywords.remove(keyword)
+                if save:
+                    self.save_rules()
+                return cat
+        return None
+
     def get_categories(self):
         return list(self.rules.keys())
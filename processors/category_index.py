@@ -0,0 +1,143 @@
+import json
+import sqlite3
+
+NGRAM_SIZE = 3
+
+def _ngrams(text):
+    """
+    Returns the set of character trigrams of a (lowercased) string.
+    Keywords match as substrings, so trigrams (not whole words) are indexed.
+    """
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+class CategoryIndex:
+    """
+    Inverted index from description trigrams to master row ids.
+    Lets a single keyword change re-evaluate only the rows whose descriptions
+    could contain it, instead of re-categorizing the whole ledger.
+    Row ids are 0-based positions of data rows in the master sheet; with the
+    partitioned ledger each row id also maps to a (partition_key, position) ref.
+    Stored in SQLite: appends insert only the new rows and postings, and a
+    keyword lookup reads one posting list and the candidate rows, never the
+    whole index.
+    """
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.conn = sqlite3.connect(index_file)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # description is lowercased; partition/position only for the partitioned ledger
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS rows (row_id INTEGER PRIMARY KEY, description TEXT, "
+                "category TEXT, partition TEXT, position INTEGER)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings (gram TEXT, row_id INTEGER, "
+                "PRIMARY KEY (gram, row_id)) WITHOUT ROWID"
+            )
+
+    def close(self):
+        self.conn.close()
+
+    @property
+    def source_signature(self):
+        """
+        (size, mtime) of the master the index was last synced with.
+        """
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    @source_signature.setter
+    def source_signature(self, signature):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)",
+                              (json.dumps(signature),))
+
+    def __len__(self):
+        return self.conn.execute("SELECT count(*) FROM rows").fetchone()[0]
+
+    def build(self, descriptions, categories, refs=None):
+        """
+        Rebuilds the index from scratch (e.g. after a full re-categorization).
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM rows")
+            self.conn.execute("DELETE FROM postings")
+        self.add_rows(descriptions, categories, refs)
+
+    def add_rows(self, descriptions, categories, refs=None):
+        """
+        Indexes rows appended to the end of the master sheet
+        (or, with `refs`, to the given ledger partitions).
+        """
+        first_id = len(self)
+        rows, postings = [], []
+        for offset, (desc, category) in enumerate(zip(descriptions, categories)):
+            row_id = first_id + offset
+            desc_lower = str(desc).lower() if desc is not None else ""
+            partition, position = refs[offset] if refs is not None else (None, None)
+            rows.append((row_id, desc_lower, category, partition, position))
+            postings.extend((gram, row_id) for gram in _ngrams(desc_lower))
+        with self.conn:
+            self.conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?)", postings)
+
+    def ref(self, row_id):
+        """
+        (partition_key, position) of a row in the partitioned ledger.
+        """
+        return self.conn.execute("SELECT partition, position FROM rows WHERE row_id = ?", (row_id,)).fetchone()
+
+    def rows_containing(self, keyword):
+        """
+        Returns the sorted row ids whose description contains `keyword`.
+        """
+        keyword = keyword.lower().strip()
+        if not keyword:
+            return []
+        grams = _ngrams(keyword)
+        if grams:
+            # The rarest trigram's posting list bounds the candidates
+            counts = dict(self.conn.execute(
+                f"SELECT gram, count(*) FROM postings WHERE gram IN ({','.join('?' * len(grams))}) GROUP BY gram",
+                list(grams)
+            ))
+            if len(counts) < len(grams):
+                return []
+            rarest = min(counts, key=counts.get)
+            cursor = self.conn.execute(
+                "SELECT rows.row_id FROM postings JOIN rows ON rows.row_id = postings.row_id "
+                "WHERE postings.gram = ? AND instr(rows.description, ?) > 0 ORDER BY rows.row_id",
+                (rarest, keyword)
+            )
+        else:
+            # Keywords shorter than a trigram can't use the index
+            cursor = self.conn.execute(
+                "SELECT row_id FROM rows WHERE instr(description, ?) > 0 ORDER BY row_id", (keyword,)
+            )
+        return [row_id for (row_id,) in cursor]
+
+    def recategorize(self, keyword, categorizer):
+        """
+        Re-evaluates the rows that could be affected by `keyword`.
+        Returns {row_id: new_category} for rows whose category actually changed
+        (the index is updated, the caller writes them back to master).
+        """
+        keyword = keyword.lower().strip()
+        changes = {}
+        for row_id, description, category in self._rows(self.rows_containing(keyword)):
+            new_category = categorizer.categorize(description)
+            if new_category != category:
+                changes[row_id] = new_category
+        with self.conn:
+            self.conn.executemany("UPDATE rows SET category = ? WHERE row_id = ?",
+                                  [(category, row_id) for row_id, category in changes.items()])
+        return changes
+
+    def _rows(self, row_ids, chunk_size=500):
+        for start in range(0, len(row_ids), chunk_size):
+            chunk = row_ids[start:start + chunk_size]
+            yield from self.conn.execute(
+                f"SELECT row_id, description, category FROM rows WHERE row_id IN ({','.join('?' * len(chunk))}) "
+                "ORDER BY row_id", chunk
+            )
@@ -1,41 +1,202 @@
-import pandas as pd
-import os
-from utils.hash_utils import generate_transaction_hash
+import numpy as np
+from utils.amount_utils import to_rupees
+from utils.hash_utils import (
+    generate_transaction_hash, generate_transaction_digest, legacy_hash_to_key, DIGEST_SIZE
+)
+
+DIGEST_DTYPE = f"S{DIGEST_SIZE}"
+
+class DigestSet:
+    """
+    Compact set of 16-byte transaction keys: a sorted numpy array for the
+    loaded history plus a small Python set for keys added since.
+    """
+    def __init__(self, keys=()):
+        keys = list(keys)
+        self._sorted = np.unique(np.array(keys, dtype=DIGEST_DTYPE)) if keys else np.array([], dtype=DIGEST_DTYPE)
+        self._pending = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._pending)
+
+    def __contains__(self, key):
+        return bool(self.contains_many([key])[0])
+
+    def add(self, key):
+        self._pending.add(key)
+
+    def update(self, keys):
+        """
+        Merges a batch of keys into the sorted array.
+        """
+        keys = list(keys)
+        if keys:
+            self._sorted = np.union1d(self._sorted, np.array(keys, dtype=DIGEST_DTYPE))
+
+    def to_array(self):
+        """
+        All keys as one sorted numpy array (compact and picklable, e.g. to hand the
+        loaded history to a worker process).
+        """
+        if not self._pending:
+            return self._sorted
+        return np.union1d(self._sorted, np.array(list(self._pending), dtype=DIGEST_DTYPE))
+
+    @classmethod
+    def from_array(cls, array):
+        digests = cls()
+        digests._sorted = np.asarray(array, dtype=DIGEST_DTYPE)
+        return digests
+
+    def contains_many(self, keys):
+        """
+        Batch membership test. Returns a boolean numpy array aligned with `keys`.
+        """
+        if not len(keys):
+            return np.zeros(0, dtype=bool)
+        arr = np.array(keys, dtype=DIGEST_DTYPE)
+        found = np.zeros(len(arr), dtype=bool)
+        if len(self._sorted):
+            pos = np.searchsorted(self._sorted, arr)
+            in_range = pos < len(self._sorted)
+            found[in_range] = self._sorted[pos[in_range]] == arr[in_range]
+        if self._pending:
+            found |= np.array([k in self._pending for k in keys], dtype=bool)
+        return found
+
+def migrate_hash_column(df):
+    """
+    Migration path for masters written with 64-char SHA-256 hex hashes:
+    rewrites the Hash column as 32-char hex BLAKE2b digests recomputed from the row.
+    Rows already holding a 32-char digest are kept as is.
+    """
+    if df.empty:
+        return df
+    df = df.copy()
+    if "Description" in df.columns and "Transaction made at" not in df.columns:
+        df.rename(columns={"Description": "Transaction made at"}, inplace=True)
+    hashes = df['Hash'].astype(str) if 'Hash' in df.columns else [""] * len(df)
+    df['Hash'] = [
+        h if len(h) == DIGEST_SIZE * 2 else generate_transaction_digest(date, amount, desc, source).hex()
+        for h, date, amount, desc, source in zip(
+            hashes, df['Date'], df['Amount'], df['Transaction made at'], df['Source']
+        )
+    ]
+    return df
 
 class Deduplicator:
-    def __init__(self, master_file_path):
-        self.master_file_path = master_file_path
-        self.existing_hashes = set()
+    """
+    Duplicate detection against the master records (a MasterStore).
+    digest_mode 'blake2b' (default) keys transactions by a 16-byte BLAKE2b digest;
+    'sha256' keeps the legacy SHA-256 hex hashes (stored truncated to 16 bytes).
+    With the partitioned ledger, hashes are loaded lazily per partition via ensure_loaded().
+    Without a store (see from_digests) it checks against a fixed set of keys.
+    """
+    def __init__(self, store, digest_mode="blake2b"):
+        self.store = store
+        self.digest_mode = digest_mode
+        self.existing_hashes = DigestSet()
+        self._loaded_partitions = set()
         self.load_existing_hashes()
 
+    @classmethod
+    def from_digests(cls, digests, digest_mode="blake2b"):
+        """
+        A Deduplicator over keys loaded elsewhere (a DigestSet.to_array() array),
+        so worker processes don't re-read the master.
+        """
+        deduplicator = cls(None, digest_mode=digest_mode)
+        deduplicator.existing_hashes = DigestSet.from_array(digests)
+        return deduplicator
+
     def load_existing_hashes(self):
         """
-        Loads hashes from the master excel file to memory.
+        Loads hashes from the master workbook to memory (through the store's cached copy).
+        """
+        if self.store is None or self.store.partitioned:
+            return
+        try:
+            keys = []
+            for df in self.store.iter_frames():
+                if 'Hash' in df.columns:
+                    keys.extend(self._keys_from_master(df))
+            self.existing_hashes = DigestSet(keys)
+        except Exception as e:
+            print(f"Error loading existing hashes: {e}")
+
+    def ensure_loaded(self, sources=None, start=None, end=None):
         """
-        if os.path.exists(self.master_file_path):
+        Loads the hashes of ledger partitions overlapping the given sources/date range
+        that haven't been loaded yet. No-op for the Excel master.
+        """
+        if self.store is None or not self.store.partitioned:
+            return
+        for key in self.store.select(sources=sources, start=start, end=end):
+            if key in self._loaded_partitions:
+                continue
             try:
-                df = pd.read_excel(self.master_file_path)
+                df = self.store.read_partition(key)
                 if 'Hash' in df.columns:
-                    self.existing_hashes = set(df['Hash'].astype(str).tolist())
+                    self.existing_hashes.update(self._keys_from_master(df))
+                self._loaded_partitions.add(key)
             except Exception as e:
-                print(f"Error loading existing hashes: {e}")
+                print(f"Error loading hashes for partition {key}: {e}")
+
+    def _keys_from_master(self, df):
+        keys = []
+        if self.digest_mode == "blake2b":
+            # Legacy SHA-256 rows are migrated on the fly by recomputing from their fields
+            df = migrate_hash_column(df)
+            for h in df['Hash']:
+                keys.append(bytes.fromhex(h))
+        else:
+            for h in df['Hash'].dropna().astype(str):
+                if len(h) == 64:
+                    keys.append(legacy_hash_to_key(h))
+        return keys
+
+    def get_transaction_key(self, transaction):
+        """
+        Computes the 16-byte key of a transaction once; use it for both
+        the duplicate check and the stored Hash (key.hex()).
+        """
+        if self.digest_mode == "blake2b":
+            return generate_transaction_digest(
+                transaction['date'],
+                transaction['amount'],
+                transaction['description'],
+                transaction['source']
+            )
+        return legacy_hash_to_key(generate_transaction_hash(
+            transaction['date'],
+            to_rupees(transaction['amount']),
+            transaction['description'],
+            transaction['source']
+        ))
+
+    def contains_many(self, keys):
+        return self.existing_hashes.contains_many(keys)
 
     def is_duplicate(self, transaction):
         """
         Checks if a transaction is a duplicate.
         """
-        trans_hash = generate_transaction_hash(
-            transaction['date'], 
-            transaction['amount'], 
-            transaction['description'], 
-            transaction['source']
-        )
-        return trans_hash in self.existing_hashes
+        return self.get_transaction_key(transaction) in self.existing_hashes
+
+    def hash_for_storage(self, transaction, key):
+        """
+        The value stored in the master Hash column for a transaction whose key was already computed.
+        """
+        if self.digest_mode == "blake2b":
+            return key.hex()
+        return self.get_transaction_hash(transaction)
 
     def get_transaction_hash(self, transaction):
+        if self.digest_mode == "blake2b":
+            return self.get_transaction_key(transaction).hex()
         return generate_transaction_hash(
-            transaction['date'], 
-            transaction['amount'], 
-            transaction['description'], 
+            transaction['date'],
+            to_rupees(transaction['amount']),
+            transaction['description'],
             transaction['source']
         )
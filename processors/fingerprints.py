@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import time
+from utils.date_utils import parse_date
+from utils.file_utils import file_lock, write_json_atomic
+
+# Statement fingerprints: issuer + masked account/card number + statement period,
+# read from page 1. A re-downloaded statement has different bytes (new metadata,
+# regenerated file) but the same fingerprint, so it can be skipped before any
+# extraction instead of having every row dropped by the deduplicator.
+
+_DATE = (
+    r'\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}'
+    r'|\d{4}-\d{2}-\d{2}'
+    r'|\d{1,2}[\s-][A-Za-z]{3,9}[\s,-]+\d{2,4}'
+    r'|[A-Za-z]{3,9}\s\d{1,2},?\s\d{4}'
+)
+# "Statement Period: 01/10/2025 to 31/10/2025", "Period From 01 Oct 2025 To 31 Oct 2025"
+PERIOD_RE = re.compile(
+    rf'(?:period|from)\s*(?:from)?\s*[:.]?\s*({_DATE})\s*(?:to|-|–)\s*({_DATE})', re.IGNORECASE
+)
+# Card statements often only print the statement date
+STATEMENT_DATE_RE = re.compile(rf'statement\s+date\s*[:.]?\s*({_DATE})', re.IGNORECASE)
+# Masked card/account numbers: "XXXX XXXX XXXX 1234", "4375 XXXX XXXX 1234", "xxxxxxx1234"
+MASKED_NUMBER_RE = re.compile(r'(?:[\dXx*]{4}[\s-]?){1,3}[Xx*]{2,}[\s-]?(\d{4})\b|[Xx*]{4,}[\s-]?(\d{4})\b')
+# Unmasked account numbers: "A/c No: 123456789012", "Account Number : 50100012345678"
+ACCOUNT_NUMBER_RE = re.compile(r'(?:a/c|account)\s*(?:no\.?|number|#)\s*[:.]?\s*\d*(\d{4})\b', re.IGNORECASE)
+
+def _account_suffix(text):
+    match = MASKED_NUMBER_RE.search(text)
+    if match:
+        return match.group(1) or match.group(2)
+    match = ACCOUNT_NUMBER_RE.search(text)
+    if match:
+        return match.group(1)
+    return None
+
+def _period(text):
+    match = PERIOD_RE.search(text)
+    if match:
+        start, end = parse_date(match.group(1)), parse_date(match.group(2))
+        if start and end:
+            return start, end
+    match = STATEMENT_DATE_RE.search(text)
+    if match:
+        date = parse_date(match.group(1))
+        if date:
+            return date, date
+    return None
+
+def statement_fingerprint(first_page_text, issuer=None):
+    """
+    Returns "issuer|account last 4|period start|period end", or None when page 1
+    doesn't show both an account/card number and a statement period.
+    """
+    if not first_page_text:
+        return None
+    account = _account_suffix(first_page_text)
+    period = _period(first_page_text)
+    if account is None or period is None:
+        return None
+    return f"{issuer or 'unknown'}|{account}|{period[0]}|{period[1]}"
+
+def describe_fingerprint(fingerprint):
+    issuer, account, start, end = fingerprint.split("|")
+    period = start if start == end else f"{start} to {end}"
+    return f"{issuer} ••{account}, {period}"
+
+class FingerprintIndex:
+    """
+    Persistent set of ingested statement fingerprints -> {file, ingested}.
+    """
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.entries = {}
+        self._added = {}
+        self.load()
+
+    def load(self):
+        self.entries = self._read_entries()
+
+    def _read_entries(self):
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading statement fingerprints: {e}")
+            return {}
+
+    def save(self):
+        """
+        Adds this index's new fingerprints to the file's current ones and writes
+        the result back, under a file lock (extraction workers read it).
+        """
+        if not self._added:
+            return
+        try:
+            with file_lock(self.index_file):
+                entries = self._read_entries()
+                for fingerprint, entry in self._added.items():
+                    entries.setdefault(fingerprint, entry)
+                write_json_atomic(self.index_file, entries, indent=1, sort_keys=True)
+            self.entries = entries
+            self._added = {}
+        except Exception as e:
+            print(f"Error saving statement fingerprints: {e}")
+
+    def get(self, fingerprint):
+        return self.entries.get(fingerprint) if fingerprint else None
+
+    def add(self, fingerprint, file_name):
+        if not fingerprint or fingerprint in self.entries:
+            return
+        self.entries[fingerprint] = self._added[fingerprint] = {
+            "file": file_name, "ingested": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
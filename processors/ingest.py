@@ -0,0 +1,132 @@
+import json
+import os
+from utils.hash_utils import generate_content_hash, generate_file_hash
+from utils.file_utils import is_statement_file
+
+UPLOAD_PREFIX = "upload://"
+
+class InMemoryStatement:
+    """
+    An uploaded statement kept in memory until it is committed.
+    `path` is a pseudo path used as the `_filepath` of its staged rows.
+    """
+    def __init__(self, name, data, content_hash=None):
+        self.name = name
+        self.data = bytes(data)
+        self.content_hash = content_hash or generate_content_hash(self.data)
+        self.path = f"{UPLOAD_PREFIX}{self.content_hash[:16]}/{name}"
+
+    def __repr__(self):
+        return f"InMemoryStatement({self.name!r}, {len(self.data)} bytes)"
+
+def is_in_memory(path):
+    return isinstance(path, str) and path.startswith(UPLOAD_PREFIX)
+
+class UploadIngestor:
+    """
+    Takes upload buffers directly, skips statements that were already seen
+    (staged, in raw_pdfs or processed) by content hash, and only writes
+    them to disk when asked to persist (on commit or explicit save).
+    """
+    def __init__(self, raw_dir, processed_dir, index_file=None):
+        self.raw_dir = raw_dir
+        self.processed_dir = processed_dir
+        self.index_file = index_file or os.path.join(os.path.dirname(raw_dir), 'file_hashes.json')
+        self.staged = {} # content_hash -> InMemoryStatement
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading file hash index: {e}")
+        return {}
+
+    def _save_index(self):
+        try:
+            with open(self.index_file, 'w') as f:
+                json.dump(self._index, f, indent=1)
+        except Exception as e:
+            print(f"Error saving file hash index: {e}")
+
+    def known_hashes(self):
+        """
+        Returns {content_hash: location} for every statement on disk in raw/processed.
+        File hashes are cached by (size, mtime) so unchanged files are not re-read.
+        """
+        known = {}
+        changed = False
+        seen_paths = set()
+        for location, directory in (("raw", self.raw_dir), ("processed", self.processed_dir)):
+            if not os.path.exists(directory):
+                continue
+            for filename in os.listdir(directory):
+                if not is_statement_file(filename):
+                    continue
+                path = os.path.join(directory, filename)
+                seen_paths.add(path)
+                stat = os.stat(path)
+                entry = self._index.get(path)
+                if not entry or entry[0] != stat.st_size or entry[1] != stat.st_mtime:
+                    entry = [stat.st_size, stat.st_mtime, generate_file_hash(path)]
+                    self._index[path] = entry
+                    changed = True
+                known[entry[2]] = location
+        # Forget files that no longer exist
+        for path in list(self._index):
+            if path not in seen_paths:
+                del self._index[path]
+                changed = True
+        if changed:
+            self._save_index()
+        return known
+
+    def add(self, name, data):
+        """
+        Stages an upload buffer.
+        Returns (InMemoryStatement or None, reason). reason is None when newly staged,
+        otherwise 'staged', 'raw' or 'processed' naming where the content was already seen.
+        """
+        content_hash = generate_content_hash(data)
+        if content_hash in self.staged:
+            return self.staged[content_hash], "staged"
+        location = self.known_hashes().get(content_hash)
+        if location:
+            return None, location
+        statement = InMemoryStatement(name, data, content_hash=content_hash)
+        self.staged[content_hash] = statement
+        return statement, None
+
+    def get(self, path):
+        """
+        Looks up a staged statement by its pseudo path.
+        """
+        for statement in self.staged.values():
+            if statement.path == path:
+                return statement
+        return None
+
+    def discard(self, statement):
+        self.staged.pop(statement.content_hash, None)
+
+    def persist(self, statement, dest_dir):
+        """
+        Writes a staged statement to dest_dir (renaming on clashes) and unstages it.
+        Returns the written path.
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        base, ext = os.path.splitext(statement.name)
+        dest_path = os.path.join(dest_dir, statement.name)
+        counter = 1
+        while os.path.exists(dest_path):
+            dest_path = os.path.join(dest_dir, f"{base}_{counter}{ext}")
+            counter += 1
+        with open(dest_path, 'wb') as f:
+            f.write(statement.data)
+        stat = os.stat(dest_path)
+        self._index[dest_path] = [stat.st_size, stat.st_mtime, statement.content_hash]
+        self._save_index()
+        self.discard(statement)
+        return dest_path
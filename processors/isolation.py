@@ -0,0 +1,159 @@
+import multiprocessing
+import time
+
+# Isolated extraction workers.
+# Each worker is a separate process that extracts one file at a time, with a
+# wall-clock timeout per file and a hard address-space/data limit on the process.
+# A file that runs over either limit only takes its worker down; the next file
+# gets a fresh one and the rest of the batch carries on.
+
+# How often the parent checks the timeout and the cancel flag while waiting
+POLL_INTERVAL_S = 0.2
+# Grace period for a worker to exit on close() before it is killed
+SHUTDOWN_GRACE_S = 2.0
+
+def _limit_memory(memory_limit_mb):
+    """
+    Caps the worker's heap (RLIMIT_DATA, falling back to RLIMIT_AS) so runaway
+    allocations raise MemoryError in the worker instead of exhausting the host.
+    No-op where the resource module is unavailable (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = int(memory_limit_mb * 1024 * 1024)
+    for name in ("RLIMIT_DATA", "RLIMIT_AS"):
+        rlimit = getattr(resource, name, None)
+        if rlimit is None:
+            continue
+        try:
+            _, hard = resource.getrlimit(rlimit)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(rlimit, (limit, hard))
+            return
+        except (ValueError, OSError):
+            continue
+
+def _worker_loop(conn, target, initializer, memory_limit_mb, cancel_event):
+    if memory_limit_mb:
+        _limit_memory(memory_limit_mb)
+    if initializer is not None:
+        initializer()
+
+    def emit(event):
+        conn.send(("event", event))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        args, kwargs = job
+        try:
+            result = target(*args, progress_callback=emit, cancel_event=cancel_event, **kwargs)
+            conn.send(("done", result))
+        except BaseException as e:
+            conn.send(("error", repr(e)))
+
+class FileWorker:
+    """
+    One long-lived extraction process, started on first use.
+    run() sends a job and relays the worker's progress events until the result
+    arrives. A job that runs past `timeout` seconds, or kills the process (memory
+    limit, OOM killer, segfault in a native library), ends the worker: run()
+    raises TimeoutError or ChildProcessError and the next run() starts a new one.
+    `target` must be a picklable module-level function taking
+    progress_callback and cancel_event keyword arguments.
+    """
+    def __init__(self, target, initializer=None, timeout=None, memory_limit_mb=None):
+        self.target = target
+        self.initializer = initializer
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        # spawn, not fork: the Streamlit server and scan jobs run threads
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._cancel_event = None
+        self.restarts = 0
+        # Caller-defined tag for state sent to the current process; cleared when it goes away
+        self.state = None
+
+    def _start(self):
+        parent_conn, child_conn = self._context.Pipe()
+        self._cancel_event = self._context.Event()
+        self._process = self._context.Process(
+            target=_worker_loop,
+            args=(child_conn, self.target, self.initializer, self.memory_limit_mb, self._cancel_event),
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def _kill(self):
+        if self._process is not None and self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process, self._conn = None, None
+        self.state = None
+
+    def restart(self):
+        """
+        Drops the current worker (e.g. after a MemoryError left it in a bad state).
+        """
+        self._kill()
+        self.restarts += 1
+
+    def run(self, *args, progress_callback=None, cancel_event=None, **kwargs):
+        if self._process is None or not self._process.is_alive():
+            self._start()
+        self._cancel_event.clear()
+        self._conn.send((args, kwargs))
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self._cancel_event.set()
+            wait = POLL_INTERVAL_S
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.restart()
+                    raise TimeoutError(f"timed out after {self.timeout:.0f}s")
+                wait = min(wait, remaining)
+
+            if self._conn.poll(wait):
+                try:
+                    kind, payload = self._conn.recv()
+                except (EOFError, OSError):
+                    kind, payload = None, None
+                if kind == "event":
+                    if progress_callback is not None:
+                        progress_callback(payload)
+                    continue
+                if kind == "done":
+                    return payload
+                if kind == "error":
+                    self.restart()
+                    raise ChildProcessError(f"worker failed: {payload}")
+            if not self._process.is_alive():
+                exitcode = self._process.exitcode
+                self.restart()
+                raise ChildProcessError(f"worker exited with code {exitcode}")
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(None)
+            self._process.join(SHUTDOWN_GRACE_S)
+        except (OSError, BrokenPipeError):
+            pass
+        self._kill()
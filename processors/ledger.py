@@ -0,0 +1,150 @@
+import json
+import os
+import re
+import pandas as pd
+from utils.schema_utils import apply_schema, concat_frames
+from utils.amount_utils import series_to_paise
+
+# Partition files store Amount as int64 paise (manifest "amount_unit"), the same
+# unit as the frames; partitions written before that hold float rupees and are
+# converted when read
+AMOUNT_UNIT = "paise"
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', str(text).lower()).strip('-') or "unknown"
+
+class PartitionedLedger:
+    """
+    Ledger split into one Parquet file per (source, year):
+        <root>/<source-slug>/<year>.parquet
+    plus <root>/manifest.json describing every partition (rows, date range).
+    Readers open only the partitions a filter needs; writers rewrite only the
+    partitions that received rows.
+    """
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.manifest_file = os.path.join(root_dir, 'manifest.json')
+        self.partitions = {} # "<source-slug>/<year>" -> entry
+        self.load_manifest()
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r') as f:
+                    self.partitions = json.load(f).get("partitions", {})
+            except Exception as e:
+                print(f"Error loading ledger manifest: {e}")
+
+    def save_manifest(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"partitions": self.partitions}, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.manifest_file)
+
+    def __len__(self):
+        return sum(entry["rows"] for entry in self.partitions.values())
+
+    def exists(self):
+        return bool(self.partitions)
+
+    def sources(self):
+        return sorted({entry["source"] for entry in self.partitions.values()})
+
+    def years(self):
+        return sorted({entry["year"] for entry in self.partitions.values()})
+
+    def select(self, sources=None, start=None, end=None, years=None):
+        """
+        Returns the partition keys overlapping the given sources / date range / years.
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        keys = []
+        for key, entry in sorted(self.partitions.items()):
+            if sources is not None and entry["source"] not in sources:
+                continue
+            if years is not None and entry["year"] not in years:
+                continue
+            if start is not None and entry["max_date"] and pd.Timestamp(entry["max_date"]) < start:
+                continue
+            if end is not None and entry["min_date"] and pd.Timestamp(entry["min_date"]) > end:
+                continue
+            keys.append(key)
+        return keys
+
+    def partition_path(self, key):
+        return os.path.join(self.root_dir, self.partitions[key]["path"])
+
+    def read_partition(self, key, columns=None):
+        df = pd.read_parquet(self.partition_path(key), columns=columns)
+        if 'Amount' in df.columns and self.partitions[key].get("amount_unit") != AMOUNT_UNIT:
+            df['Amount'] = series_to_paise(df['Amount'])
+        return apply_schema(df)
+
+    def read(self, sources=None, start=None, end=None, years=None, columns=None):
+        """
+        Reads only the matching partitions. Rows outside [start, end] are dropped.
+        """
+        keys = self.select(sources=sources, start=start, end=end, years=years)
+        frames = [self.read_partition(key, columns=columns) for key in keys]
+        if not frames:
+            return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+        df = concat_frames(frames)
+        if (start is not None or end is not None) and 'Date' in df.columns:
+            dates = pd.to_datetime(df['Date'])
+            mask = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= dates >= pd.Timestamp(start)
+            if end is not None:
+                mask &= dates <= pd.Timestamp(end)
+            df = df[mask].reset_index(drop=True)
+        return df
+
+    def write_partition(self, key, df, source=None, year=None):
+        """
+        Replaces one partition's file and refreshes its manifest entry.
+        """
+        entry = self.partitions.get(key) or {"source": source, "year": year, "path": f"{key}.parquet"}
+        path = os.path.join(self.root_dir, entry["path"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df = df.copy()
+        df['Date'] = pd.to_datetime(df['Date'])
+        if 'Amount' in df.columns:
+            df['Amount'] = df['Amount'].astype("Int64")
+        tmp_path = path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        entry.update(
+            amount_unit=AMOUNT_UNIT,
+            rows=len(df),
+            min_date=df['Date'].min().strftime("%Y-%m-%d") if len(df) else None,
+            max_date=df['Date'].max().strftime("%Y-%m-%d") if len(df) else None
+        )
+        self.partitions[key] = entry
+
+    def append(self, df):
+        """
+        Appends rows to their (source, year) partitions, touching only those.
+        Returns {partition_key: (first_new_position, rows_added)}.
+        """
+        if df.empty:
+            return {}
+        df = df.copy()
+        dates = pd.to_datetime(df['Date'])
+        df['Date'] = dates
+        added = {}
+        for (source, year), group in df.groupby([df['Source'].astype(str), dates.dt.year]):
+            year = int(year)
+            key = f"{_slug(source)}/{year}"
+            if key in self.partitions:
+                existing = self.read_partition(key)
+                start_pos = len(existing)
+                combined = concat_frames([existing, group])
+            else:
+                start_pos = 0
+                combined = apply_schema(group.reset_index(drop=True))
+            self.write_partition(key, combined, source=source, year=year)
+            added[key] = (start_pos, len(group))
+        self.save_manifest()
+        return added
@@ -0,0 +1,226 @@
+import os
+import threading
+import pandas as pd
+from utils.schema_utils import apply_schema, concat_frames, with_rupees
+from utils.amount_utils import series_to_paise
+
+# Columns renamed since older master files were written
+LEGACY_COLUMNS = {"Description": "Transaction made at"}
+
+def migrate_columns(df):
+    """
+    Renames legacy master columns in place (e.g. Description -> Transaction made at).
+    """
+    renames = {old: new for old, new in LEGACY_COLUMNS.items() if old in df.columns and new not in df.columns}
+    if renames:
+        df.rename(columns=renames, inplace=True)
+    return df
+
+def filter_frame(df, sources=None, start=None, end=None, years=None):
+    """
+    Keeps the rows matching the given sources / date range / years.
+    """
+    if df.empty or (sources is None and start is None and end is None and years is None):
+        return df
+    mask = pd.Series(True, index=df.index)
+    if sources is not None:
+        mask &= df['Source'].isin(sources)
+    if years is not None:
+        mask &= df['Date'].dt.year.isin(years)
+    if start is not None:
+        mask &= df['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Date'] <= pd.Timestamp(end)
+    return df[mask]
+
+def _signature(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+class MasterStore:
+    """
+    Single owner of the master records: loading (legacy column migration and the
+    dtype schema), filtered reads and writes, for the Excel workbook or the
+    partitioned ledger.
+    Keeps one in-process copy, invalidated when the file's (size, mtime) changes
+    and extended in place after appends, so a scan-then-commit cycle parses the
+    master at most once.
+    """
+    def __init__(self, master_file, ledger_dir=None, layout="excel"):
+        self.master_file = master_file
+        self.ledger_dir = ledger_dir
+        self.layout = layout
+        self._lock = threading.RLock()
+        # Excel: cached chunks of the sheet (appends add a chunk, no full concat)
+        self._frames = None
+        self._frames_signature = None
+        # Ledger: partition key -> (file signature, frame)
+        self._partitions = {}
+        self._ledger = None
+        self._ledger_signature = None
+        self.loads = 0 # full parses of the master, for diagnostics
+
+    @property
+    def partitioned(self):
+        return self.layout == "partitioned"
+
+    @property
+    def ledger(self):
+        """
+        The PartitionedLedger, re-read when its manifest changed on disk.
+        """
+        from processors.ledger import PartitionedLedger
+        with self._lock:
+            signature = _signature(os.path.join(self.ledger_dir, 'manifest.json'))
+            if self._ledger is None or signature != self._ledger_signature:
+                self._ledger = PartitionedLedger(self.ledger_dir)
+                self._ledger_signature = signature
+            return self._ledger
+
+    def location(self):
+        return self.ledger_dir if self.partitioned else self.master_file
+
+    def exists(self):
+        if self.partitioned:
+            return self.ledger.exists()
+        return os.path.exists(self.master_file)
+
+    def signature(self):
+        """
+        Changes whenever the master data changes (workbook, or ledger manifest).
+        """
+        if self.partitioned:
+            return _signature(self.ledger.manifest_file)
+        return _signature(self.master_file)
+
+    def invalidate(self):
+        with self._lock:
+            self._frames = None
+            self._frames_signature = None
+            self._partitions = {}
+
+    # --- Excel workbook ---
+
+    def header(self):
+        """
+        Column names of the stored master (after legacy renames).
+        """
+        from utils.excel_utils import read_excel_header
+        if not os.path.exists(self.master_file):
+            return []
+        return [LEGACY_COLUMNS.get(c, c) for c in read_excel_header(self.master_file)]
+
+    def _stream_chunks(self):
+        from utils.excel_utils import iter_excel_chunks
+        for df in iter_excel_chunks(self.master_file):
+            df = migrate_columns(df)
+            # The workbook shows rupees; frames carry integer paise
+            if 'Amount' in df.columns:
+                df['Amount'] = series_to_paise(df['Amount'])
+            yield apply_schema(df)
+
+    def iter_frames(self):
+        """
+        Yields the whole Excel master as typed chunks, parsing the file only if the
+        cached copy is missing or stale.
+        """
+        with self._lock:
+            signature = _signature(self.master_file)
+            if signature is None:
+                self._frames, self._frames_signature = None, None
+                return
+            if self._frames is None or self._frames_signature != signature:
+                self._frames = list(self._stream_chunks())
+                self._frames_signature = signature
+                self.loads += 1
+            frames = list(self._frames)
+        for df in frames:
+            yield df
+
+    def _write_excel(self, frames, columns):
+        from utils.excel_utils import write_excel
+        tmp_file = self.master_file + ".tmp.xlsx"
+        write_excel((with_rupees(df) for df in frames), tmp_file, columns=columns)
+        os.replace(tmp_file, self.master_file)
+
+    # --- Partitioned ledger ---
+
+    def select(self, sources=None, start=None, end=None, years=None):
+        return self.ledger.select(sources=sources, start=start, end=end, years=years)
+
+    def _partition(self, key):
+        ledger = self.ledger
+        with self._lock:
+            signature = _signature(ledger.partition_path(key))
+            cached = self._partitions.get(key)
+            if cached is None or cached[0] != signature:
+                cached = (signature, ledger.read_partition(key))
+                self._partitions[key] = cached
+                self.loads += 1
+            return cached[1]
+
+    def read_partition(self, key):
+        """
+        A copy of one ledger partition (safe to modify and write back).
+        """
+        return self._partition(key).copy()
+
+    def write_partition(self, key, df):
+        ledger = self.ledger
+        ledger.write_partition(key, df)
+        ledger.save_manifest()
+        with self._lock:
+            self._partitions.pop(key, None)
+            self._ledger_signature = _signature(ledger.manifest_file)
+
+    # --- Both layouts ---
+
+    def read(self, sources=None, start=None, end=None, years=None):
+        """
+        Returns the matching master rows as one typed frame. The partitioned layout
+        only touches the matching partitions.
+        """
+        if self.partitioned:
+            frames = [self._partition(key) for key in self.select(sources=sources, start=start, end=end, years=years)]
+        else:
+            frames = list(self.iter_frames())
+        return concat_frames([filter_frame(df, sources, start, end, years) for df in frames])
+
+    def append(self, new_df, columns):
+        """
+        Appends rows (restricted to `columns`, plus any extra columns already stored).
+        Returns the ledger's {partition_key: (first_position, rows)} for the
+        partitioned layout, else None.
+        """
+        new_df = apply_schema(new_df[columns])
+        if self.partitioned:
+            ledger = self.ledger
+            added = ledger.append(new_df)
+            with self._lock:
+                for key in added:
+                    self._partitions.pop(key, None)
+                self._ledger_signature = _signature(ledger.manifest_file)
+            return added
+
+        with self._lock:
+            header = self.header()
+            all_columns = header + [c for c in columns if c not in header]
+            existing = list(self.iter_frames())
+            # Stream the existing rows, then the new ones, into a fresh workbook
+            self._write_excel(existing + [new_df], all_columns)
+            # Keep the cached copy instead of re-parsing what we just wrote
+            self._frames = existing + [new_df.reset_index(drop=True)]
+            self._frames_signature = _signature(self.master_file)
+        return None
+
+    def rewrite(self, frames, columns=None):
+        """
+        Replaces the Excel master with `frames` (an iterable of chunks).
+        """
+        with self._lock:
+            try:
+                self._write_excel(frames, columns or self.header())
+            finally:
+                self.invalidate()
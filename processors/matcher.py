@@ -0,0 +1,94 @@
+from bisect import bisect_left
+import pandas as pd
+
+class CrossSourceMatcher:
+    """
+    Links likely duplicates across sources, e.g. the same spend seen in the bank
+    statement ("ACH - ...") and in the credit card statement.
+    Both sides are sorted by (amount, date) and merged within an amount tolerance
+    and a date window, so matching is O(n log n) instead of pairwise.
+    Amounts are compared as integer paise.
+    """
+    def __init__(self, date_window_days=3, amount_tolerance=1.0):
+        self.date_window_days = date_window_days
+        self.amount_tolerance = amount_tolerance
+        self.tolerance_paise = int(round(amount_tolerance * 100))
+
+    def match(self, left_df, right_df):
+        """
+        Matches rows of left_df against rows of right_df from a *different* Source.
+        Both frames need Date, Amount and Source columns.
+        Each right row is linked to at most one left row (closest amount, then closest date).
+        Returns a list of (left_index, right_index) label pairs.
+        """
+        left = self._sorted_rows(left_df)
+        right = self._sorted_rows(right_df)
+        if not left or not right:
+            return []
+
+        right_amounts = [row[0] for row in right]
+        used = set()
+        matches = []
+
+        for amount, day, left_idx, source in left:
+            # Jump to the first right row within the amount tolerance
+            pos = bisect_left(right_amounts, amount - self.tolerance_paise)
+            best = None
+            while pos < len(right) and right[pos][0] <= amount + self.tolerance_paise:
+                r_amount, r_day, right_idx, r_source = right[pos]
+                pos += 1
+                if right_idx in used or r_source == source:
+                    continue
+                day_gap = abs(r_day - day)
+                if day_gap > self.date_window_days:
+                    continue
+                score = (abs(r_amount - amount), day_gap)
+                if best is None or score < best[0]:
+                    best = (score, right_idx)
+            if best is not None:
+                used.add(best[1])
+                matches.append((left_idx, best[1]))
+        return matches
+
+    def _sorted_rows(self, df):
+        if df is None or df.empty:
+            return []
+        dates = pd.to_datetime(df['Date'], errors='coerce')
+        amounts = df['Amount']
+        rows = []
+        for idx, date, amount, source in zip(df.index, dates, amounts, df['Source']):
+            if pd.isna(date) or pd.isna(amount):
+                continue
+            rows.append((int(amount), date.toordinal(), idx, str(source)))
+        rows.sort()
+        return rows
+
+def flag_cross_source_duplicates(new_df, master_df, matcher, hash_col="Hash", flag_col="Possible Duplicate Of"):
+    """
+    Sets `flag_col` on rows of new_df that look like the same transaction as a row
+    from another source, either already in master_df or elsewhere in new_df.
+    The flag holds the Hash of the matched row. Returns the number of rows flagged.
+    """
+    if flag_col not in new_df.columns:
+        new_df[flag_col] = None
+
+    # Only master rows near the new rows' dates can match
+    new_dates = pd.to_datetime(new_df['Date'], errors='coerce')
+    candidates = master_df
+    if master_df is not None and not master_df.empty and new_dates.notna().any():
+        window = pd.Timedelta(days=matcher.date_window_days)
+        master_dates = pd.to_datetime(master_df['Date'], errors='coerce')
+        candidates = master_df[(master_dates >= new_dates.min() - window) & (master_dates <= new_dates.max() + window)]
+
+    flagged = 0
+    for new_idx, master_idx in matcher.match(new_df, candidates):
+        new_df.at[new_idx, flag_col] = candidates.at[master_idx, hash_col]
+        flagged += 1
+
+    # Pairs inside the batch (e.g. a bank and a card statement committed together)
+    unflagged = new_df[new_df[flag_col].isna()]
+    for left_idx, right_idx in matcher.match(unflagged, unflagged):
+        if pd.isna(new_df.at[right_idx, flag_col]) and pd.isna(new_df.at[left_idx, flag_col]):
+            new_df.at[right_idx, flag_col] = new_df.at[left_idx, hash_col]
+            flagged += 1
+    return flagged
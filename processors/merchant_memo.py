@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from utils.file_utils import file_lock, write_json_atomic
+
+# Cleanup applied to every extracted description before dedupe/categorization.
+# Part of the memo version: changing these invalidates memoized merchants.
+CLEANUP_PATTERNS = [
+    # Leading numeric IDs, e.g. "12495376778 UPI-217748023465-NATURALS SS 7"
+    (r'^\d+\s*[-]?\s*', ''),
+    # Remaining "UPI-<ref>-" prefixes, e.g. "UPI-217748023465-NATURALS SS 7"
+    (r'UPI-\d+-?', ''),
+]
+_COMPILED_PATTERNS = [(re.compile(pattern), repl) for pattern, repl in CLEANUP_PATTERNS]
+
+def clean_merchant(description):
+    """
+    Strips reference numbers and prefixes from an extracted description.
+    """
+    cleaned = description or ""
+    for pattern, repl in _COMPILED_PATTERNS:
+        cleaned = pattern.sub(repl, cleaned).strip()
+    return cleaned
+
+def memo_version(rules):
+    """
+    Hash of the categorization rules and cleanup regexes the memo entries depend on.
+    """
+    payload = json.dumps({"rules": rules, "cleanup": CLEANUP_PATTERNS}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+class MerchantMemo:
+    """
+    Persistent LRU memo: raw description -> (cleaned merchant, category).
+    Repeat merchants skip all regex and keyword matching. Entries are dropped
+    wholesale when the rules or cleanup regexes change (version mismatch).
+    """
+    def __init__(self, memo_file, categorizer, max_entries=50000):
+        self.memo_file = memo_file
+        self.categorizer = categorizer
+        self.max_entries = max_entries
+        self.version = memo_version(categorizer.rules)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        entries = self._read_entries()
+        if entries is None:
+            # Rules or cleanup changed since the memo was written
+            self._dirty = True
+        self.entries = entries or OrderedDict()
+
+    def _read_entries(self):
+        """
+        The memo file's entries; None if they were written for other rules.
+        """
+        if not os.path.exists(self.memo_file):
+            return OrderedDict()
+        try:
+            with open(self.memo_file, 'r') as f:
+                data = json.load(f)
+            if data.get("version") != self.version:
+                return None
+            return OrderedDict((raw, (merchant, category)) for raw, merchant, category in data.get("entries", []))
+        except Exception as e:
+            print(f"Error loading merchant memo: {e}")
+            return OrderedDict()
+
+    def save(self):
+        """
+        Merges this memo's entries into the file's current ones (other processes
+        and threads save too) and writes the result back, under a file lock.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+        try:
+            with file_lock(self.memo_file):
+                entries = self._read_entries() or OrderedDict()
+                with self._lock:
+                    # Ours are at least as recent: they go last (most recently used)
+                    for raw, result in self.entries.items():
+                        entries.pop(raw, None)
+                        entries[raw] = result
+                    while len(entries) > self.max_entries:
+                        entries.popitem(last=False)
+                    self.entries = entries
+                    data = {
+                        "version": self.version,
+                        "entries": [[raw, merchant, category] for raw, (merchant, category) in entries.items()]
+                    }
+                write_json_atomic(self.memo_file, data)
+        except Exception as e:
+            print(f"Error saving merchant memo: {e}")
+
+    def resolve(self, raw_description):
+        """
+        Returns (cleaned merchant, category) for a raw extracted description.
+        """
+        with self._lock:
+            cached = self.entries.get(raw_description)
+            if cached is not None:
+                self.entries.move_to_end(raw_description)
+                self.hits += 1
+                return cached
+
+        merchant = clean_merchant(raw_description)
+        result = (merchant, self.categorizer.categorize(merchant))
+
+        with self._lock:
+            self.misses += 1
+            self.entries[raw_description] = result
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._dirty = True
+        return result
@@ -1,21 +1,56 @@
-import pdfplumber
+from extractors.base_extractor import open_pdf
+from extractors.page_cache import PageCache
 from extractors.bank_extractor import BankExtractor
 from extractors.creditcard_extractor import CreditCardExtractor
 from extractors.upi_extractor import UPIExtractor
+from extractors.tabular_extractor import TabularExtractor
+from utils.file_utils import is_tabular_file
+from processors.fingerprints import statement_fingerprint
+
+# Issuer detection from page 1 text (lowercased). Used to pick per-issuer settings.
+ISSUER_KEYWORDS = {
+    "sbi_card": ["sbi card"],
+    "axis": ["axis bank"],
+    "icici": ["icici bank"],
+    "hdfc": ["hdfc bank"],
+    "phonepe": ["phonepe"],
+    "google_pay": ["google pay"],
+    "paytm": ["paytm"],
+}
+
+def detect_issuer(text_lower):
+    for issuer, keywords in ISSUER_KEYWORDS.items():
+        if any(k in text_lower for k in keywords):
+            return issuer
+    return None
 
 class Parser:
-    def __init__(self, file_path, password=None):
+    def __init__(self, file_path, password=None, progress_callback=None, cancel_event=None, extractor_options=None):
         self.file_path = file_path
         self.password = password
+        # Passed through to the extractor (e.g. low_memory, rss_budget_mb)
+        self.extractor_options = extractor_options or {}
         self.raw_text_debug = ""
+        self.issuer = None
+        # Issuer + account + statement period from page 1 (see processors/fingerprints.py)
+        self.fingerprint = None
         self.extractor = self._select_extractor()
+        if self.extractor:
+            self.extractor.progress_callback = progress_callback
+            self.extractor.cancel_event = cancel_event
+            # Keys the issuer layout template (see extractors/templates.py)
+            self.extractor.issuer = self.issuer
 
     def _select_extractor(self):
         """
         Heuristic to select the correct extractor based on file content.
         """
+        # CSV/XLS exports: columns come from the bank's mapping, no PDF to open
+        if is_tabular_file(getattr(self.file_path, 'name', self.file_path)):
+            return self._build_extractor(TabularExtractor)
+
         # Allow errors (like invalid password) to bubble up to main.py
-        with pdfplumber.open(self.file_path, password=self.password) as pdf:
+        with self._open_document() as pdf:
             if not pdf.pages:
                 raise ValueError("PDF has no pages.")
                 
@@ -27,24 +62,62 @@ class Parser:
             self.raw_text_debug = first_page_text[:3000] # First 3000 chars
             
             first_page_text_lower = first_page_text.lower()
+            self.issuer = detect_issuer(first_page_text_lower)
+            self.fingerprint = statement_fingerprint(first_page_text, self.issuer)
             
             if "credit card" in first_page_text_lower or ("statement date" in first_page_text_lower and "payment due" in first_page_text_lower):
-                return CreditCardExtractor(self.file_path, password=self.password)
+                return self._build_extractor(CreditCardExtractor)
             
             # Check for Bank Statement (stronger indicators)
             # "savings a/c", "current a/c", "account summary", "account balance"
             elif any(k in first_page_text_lower for k in ["savings a/c", "current a/c", "account summary", "account balance", "account statement"]):
-                return BankExtractor(self.file_path, password=self.password)
+                return self._build_extractor(BankExtractor)
 
             # UPI apps usually mention the app name
             elif "phonepe" in first_page_text_lower or "google pay" in first_page_text_lower or "paytm" in first_page_text_lower:
-                return UPIExtractor(self.file_path, password=self.password)
+                return self._build_extractor(UPIExtractor)
             
             # Last resort fallback
             else:
-                return BankExtractor(self.file_path, password=self.password)
+                return self._build_extractor(BankExtractor)
+
+    def _open_document(self):
+        """
+        Opens the statement for extractor selection: from its page recording if one
+        exists, otherwise the PDF itself (the extractor records the full parse).
+        """
+        cache_dir = self.extractor_options.get('page_cache')
+        if cache_dir:
+            return PageCache(cache_dir).open(self.file_path, password=self.password, record=False)
+        return open_pdf(self.file_path, password=self.password)
+
+    def _build_extractor(self, extractor_cls):
+        """
+        Instantiates the extractor with the configured options. The text backend can be
+        chosen per issuer or per extractor via options['text_backends'], e.g.
+        {"sbi_card": "pypdf2", "CreditCardExtractor": "pdfminer-fast"},
+        falling back to options['text_backend'].
+        """
+        options = dict(self.extractor_options)
+        per_target = options.pop('text_backends', None) or {}
+        backend = per_target.get(self.issuer) or per_target.get(extractor_cls.__name__) or options.get('text_backend')
+        options['text_backend'] = backend
+        return extractor_cls(self.file_path, password=self.password, **options)
 
     def parse(self):
-        if self.extractor:
-            return self.extractor.extract_transactions()
-        return []
+        if not self.extractor:
+            return []
+        transactions = self.extractor.extract_transactions()
+        cancelled = self.extractor.cancel_event is not None and self.extractor.cancel_event.is_set()
+        if not transactions and self.extractor.used_layout_template and not cancelled:
+            # The issuer's learned region matched nothing: layout changed, re-parse full pages
+            self.extractor.debug_logs.append(f"Layout template {self.extractor.layout_key} matched nothing; dropped it")
+            self.extractor.forget_layout_template()
+            transactions = self.extractor.extract_transactions()
+            cancelled = self.extractor.cancel_event is not None and self.extractor.cancel_event.is_set()
+        if not transactions and self.extractor.skipped_pages and not cancelled:
+            # Nothing on the pages that passed the pre-filter: parse every page before giving up
+            self.extractor.debug_logs.append("No transactions on pre-filtered pages; re-parsing all pages")
+            self.extractor.page_prefilter = False
+            transactions = self.extractor.extract_transactions()
+        return transactions
@@ -0,0 +1,117 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from utils.schema_utils import apply_schema
+
+class ScanJob:
+    """
+    A single background scan. Holds live progress, logs and the rows of every
+    file finished so far, so the UI can render partial results while it runs.
+    """
+    def __init__(self, file_paths, password=None, source=None, extractor_options=None):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.file_paths = list(file_paths)
+        self.password = password
+        self.source = source
+        self.extractor_options = extractor_options
+        self.status = "queued" # queued | running | done | cancelled | failed
+        self.error = None
+        self.logs = []
+        self.progress = {
+            "file": None,
+            "file_index": 0,
+            "files": len(self.file_paths),
+            "page": 0,
+            "pages": 0,
+            "transactions": 0
+        }
+        self._rows = []
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def is_active(self):
+        return self.status in ("queued", "running")
+
+    def results(self):
+        """
+        Returns a DataFrame of all rows collected so far (also after a cancel).
+        """
+        with self._lock:
+            rows = list(self._rows)
+        return apply_schema(pd.DataFrame(rows)) if rows else pd.DataFrame()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.progress), list(self.logs)
+
+    def _on_progress(self, event):
+        with self._lock:
+            stage = event.get("stage")
+            if stage == "file_start":
+                self.progress.update(file=event["file"], file_index=event["file_index"],
+                                     files=event["files"], page=0, pages=0)
+            elif stage == "page":
+                self.progress.update(page=event["page"], pages=event["pages"])
+            elif stage == "file_done":
+                self._rows.extend(event.get("rows", []))
+                self.progress["transactions"] = len(self._rows)
+
+    def run(self, scan_fn):
+        self.status = "running"
+        try:
+            _, logs = scan_fn(
+                file_paths=self.file_paths,
+                password=self.password,
+                source=self.source,
+                progress_callback=self._on_progress,
+                cancel_event=self._cancel_event,
+                extractor_options=self.extractor_options
+            )
+            with self._lock:
+                self.logs = logs
+            self.status = "cancelled" if self._cancel_event.is_set() else "done"
+        except Exception as e:
+            self.error = repr(e)
+            self.status = "failed"
+        return self
+
+class ScanJobManager:
+    """
+    Worker pool for scan jobs. Meant to be created once per process
+    (e.g. via st.cache_resource) so jobs survive Streamlit reruns.
+    Finished jobs hold their rows and logs; only the last `keep_finished` are kept.
+    """
+    def __init__(self, scan_fn, max_workers=2, keep_finished=5):
+        self.scan_fn = scan_fn
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan")
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_paths, password=None, source=None, extractor_options=None):
+        job = ScanJob(file_paths, password=password, source=source, extractor_options=extractor_options)
+        with self._lock:
+            self._prune()
+            self.jobs[job.job_id] = job
+        self.executor.submit(job.run, self.scan_fn)
+        return job
+
+    def _prune(self):
+        # Jobs are kept in submission order; drop all but the newest finished ones
+        finished = [job_id for job_id, job in self.jobs.items() if not job.is_active]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancel()
+        return job
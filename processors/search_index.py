@@ -0,0 +1,136 @@
+import json
+import re
+import sqlite3
+
+# Full-text search over "Transaction made at".
+# One SQLite database next to the master: an FTS5 table of descriptions (with the
+# row's date, amount, category, source and hash stored alongside, unindexed) so a
+# query is answered from the index alone, without loading the master. Rows are
+# added as they are appended to master; the index is rebuilt when the master
+# changes behind its back (same signature check as the category index).
+# SQLite builds without FTS5 fall back to a plain table scanned with LIKE.
+
+COLUMNS = ("Date", "Transaction made at", "Amount", "Category", "Source", "Hash")
+# Bumped when the stored rows change shape (2: amounts as integer paise);
+# an index from another version reports no signature and is rebuilt
+INDEX_VERSION = 2
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def match_query(text):
+    """
+    User text -> FTS5 query: every word must appear, as a word prefix
+    ("swig amaz" matches "UPI-SWIGGY" and "AMAZON PAY").
+    """
+    return " ".join(f'"{token}"*' for token in TOKEN_RE.findall(text.lower()))
+
+def _paise_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class SearchIndex:
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.conn = sqlite3.connect(index_file)
+        self.fts = self._create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _create_tables(self):
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS transactions USING fts5("
+                "description, date UNINDEXED, amount UNINDEXED, category UNINDEXED, "
+                "source UNINDEXED, hash UNINDEXED, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            return True
+        except sqlite3.OperationalError:
+            # No FTS5 in this SQLite build
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS transactions "
+                "(description TEXT, date TEXT, amount INTEGER, category TEXT, source TEXT, hash TEXT)"
+            )
+            return False
+
+    @property
+    def source_signature(self):
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        if meta.get('version') != str(INDEX_VERSION) or 'source_signature' not in meta:
+            return None
+        return json.loads(meta['source_signature'])
+
+    @source_signature.setter
+    def source_signature(self, signature):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  [('source_signature', json.dumps(signature)), ('version', str(INDEX_VERSION))])
+
+    def __len__(self):
+        return self.conn.execute("SELECT count(*) FROM transactions").fetchone()[0]
+
+    def build(self, frames):
+        """
+        Rebuilds the index from scratch from an iterable of master frames.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM transactions")
+        for df in frames:
+            self.add_rows(df)
+
+    def add_rows(self, df):
+        """
+        Indexes master rows (a DataFrame with the master columns).
+        """
+        if df.empty:
+            return
+        rows = zip(
+            df["Transaction made at"].fillna("").astype(str).tolist(),
+            df["Date"].astype(str).str[:10].tolist(),
+            # Integer paise; NULL for a missing amount
+            [_paise_or_none(value) for value in df["Amount"]],
+            df["Category"].astype(str).tolist(),
+            df["Source"].astype(str).tolist(),
+            df["Hash"].astype(str).tolist(),
+        )
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO transactions (description, date, amount, category, source, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def search(self, text, limit=100):
+        """
+        Returns (rows, total): up to `limit` matching rows, newest first, as dicts
+        keyed by the master column names, and the number of matches.
+        """
+        if self.fts:
+            query = match_query(text)
+            if not query:
+                return [], 0
+            where, params = "transactions MATCH ?", [query]
+        else:
+            tokens = TOKEN_RE.findall(text.lower())
+            if not tokens:
+                return [], 0
+            where = " AND ".join("lower(description) LIKE ?" for _ in tokens)
+            params = [f"%{token}%" for token in tokens]
+
+        total = self.conn.execute(f"SELECT count(*) FROM transactions WHERE {where}", params).fetchone()[0]
+        cursor = self.conn.execute(
+            f"SELECT date, description, amount, category, source, hash FROM transactions "
+            f"WHERE {where} ORDER BY date DESC LIMIT ?", params + [int(limit)]
+        )
+        rows = []
+        for date, description, paise, category, source, digest in cursor:
+            amount = paise / 100 if paise is not None else None
+            rows.append(dict(zip(COLUMNS, (date, description, amount, category, source, digest))))
+        return rows, total
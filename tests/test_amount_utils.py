@@ -0,0 +1,46 @@
+import pytest
+from utils.amount_utils import parse_amount, parse_marker, format_paise, to_paise, CREDIT, DEBIT
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,57,733.02", (15773302, None)),
+    ("157,733.02", (15773302, None)),
+    ("250", (25000, None)),
+    ("99.5", (9950, None)),
+    ("0.05", (5, None)),
+    ("-1,200.00", (-120000, None)),
+    ("+40.00", (4000, None)),
+    ("36,089.00 Cr", (3608900, CREDIT)),
+    ("36,089.00Dr", (3608900, DEBIT)),
+    ("500.00 C", (50000, CREDIT)),
+    ("500.00 dr.", (50000, DEBIT)),
+    ("₹ 1,000.00", (100000, None)),
+    ("Rs. 75.25", (7525, None)),
+    ("INR 12", (1200, None)),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+@pytest.mark.parametrize("text", [None, "", "   ", "abc", "12.345", "1,2,3", "25/11/2025", "12.00 XY", ".50"])
+def test_parse_amount_rejects_non_amounts(text):
+    assert parse_amount(text) is None
+
+@pytest.mark.parametrize("paise, expected", [
+    (15773302, "157733.02"),
+    (5, "0.05"),
+    (0, "0.00"),
+    (-120050, "-1200.50"),
+])
+def test_format_paise(paise, expected):
+    assert format_paise(paise) == expected
+
+def test_format_paise_matches_legacy_rupee_formatting():
+    # Transaction digests used f"{rupees:.2f}"; paise must produce the same text
+    for rupees in ("0.10", "19.99", "1234.50", "99999.99"):
+        assert format_paise(to_paise(rupees)) == f"{float(rupees):.2f}"
+
+@pytest.mark.parametrize("token, expected", [
+    ("Cr", CREDIT), ("DR", DEBIT), ("cr.", CREDIT),
+    ("12,345.00Cr", None), ("CREDIT", None), ("", None), (None, None),
+])
+def test_parse_marker_accepts_only_standalone_markers(token, expected):
+    assert parse_marker(token) == expected
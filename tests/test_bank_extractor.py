@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pdfplumber")
+
+from extractors.bank_extractor import text_row_direction
+from extractors.reconcile import reconcile_balances
+from utils.amount_utils import parse_amount, CREDIT, DEBIT
+
+def amount_candidate(parts, k):
+    val, marker = parse_amount(parts[-k])
+    return {'val': val, 'k': k, 'token': parts[-k], 'is_credit': marker == CREDIT, 'is_debit': marker == DEBIT}
+
+def test_balance_suffix_is_only_a_hint():
+    # "amount balanceCr": the Cr belongs to the balance, the row is a withdrawal
+    parts = "05/10/2025 UPI/SWIGGY/ORDER 500.00 12,345.00Cr".split()
+    marker, hint = text_row_direction(parts, amount_candidate(parts, 2))
+    assert (marker, hint) == (None, CREDIT)
+
+    chain = [
+        {"paise": None, "balance": 1284500, "marker": None, "hint": None},
+        {"paise": 50000, "balance": 1234500, "marker": marker, "hint": hint},
+    ]
+    types, breaks = reconcile_balances(chain)
+    assert types == [None, "DEBIT"]
+    assert breaks == []
+
+def test_standalone_marker_token_is_explicit():
+    parts = "05/10/2025 SALARY OCT 50,000.00 Cr 62,345.00".split()
+    assert text_row_direction(parts, amount_candidate(parts, 3)) == (CREDIT, None)
+
+def test_amount_suffix_is_explicit():
+    parts = "05/10/2025 REFUND 250.00Cr 12,595.00".split()
+    assert text_row_direction(parts, amount_candidate(parts, 2)) == (CREDIT, None)
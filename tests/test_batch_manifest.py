@@ -0,0 +1,65 @@
+import os
+from processors.batch import BatchManifest, PENDING, EXTRACTED, COMMITTED, FAILED
+
+def make_manifest(tmp_path):
+    return BatchManifest(str(tmp_path / "batch_manifest.json"), str(tmp_path / "checkpoints"))
+
+def write_statement(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+def test_plan_adds_new_files_as_pending(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write_statement(tmp_path, "a.pdf", b"statement a")
+    b = write_statement(tmp_path, "b.pdf", b"statement b")
+    manifest.plan([a, b])
+    assert sorted(manifest.with_status(PENDING)) == sorted([a, b])
+
+def test_extracted_rows_survive_a_restart(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write_statement(tmp_path, "a.pdf", b"statement a")
+    manifest.plan([a])
+    rows = [{"Date": "2025-10-01", "Amount": 25000, "Transaction made at": "SWIGGY"}]
+    manifest.mark_extracted(a, rows)
+    manifest.save()
+
+    resumed = make_manifest(tmp_path)
+    resumed.plan([a])
+    assert resumed.with_status(EXTRACTED) == [a]
+    assert resumed.load_checkpoint(a) == rows
+
+def test_committed_file_is_not_planned_again(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write_statement(tmp_path, "a.pdf", b"statement a")
+    manifest.plan([a])
+    manifest.mark_extracted(a, [])
+    checkpoint = manifest.files[a]["checkpoint"]
+    manifest.mark_committed([a])
+    manifest.save()
+
+    resumed = make_manifest(tmp_path)
+    resumed.plan([a])
+    assert resumed.with_status(COMMITTED) == [a]
+    assert resumed.with_status(PENDING) == []
+    assert not os.path.exists(checkpoint)
+
+def test_changed_file_is_reset_to_pending(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write_statement(tmp_path, "a.pdf", b"statement a")
+    manifest.plan([a])
+    manifest.mark_extracted(a, [])
+    manifest.mark_committed([a])
+
+    write_statement(tmp_path, "a.pdf", b"statement a, re-downloaded")
+    manifest.plan([a])
+    assert manifest.with_status(PENDING) == [a]
+
+def test_failed_file_keeps_its_error(tmp_path):
+    manifest = make_manifest(tmp_path)
+    a = write_statement(tmp_path, "a.pdf", b"statement a")
+    manifest.plan([a])
+    manifest.mark_failed(a, "PDF is encrypted")
+    manifest.plan([a])
+    assert manifest.with_status(FAILED) == [a]
+    assert manifest.files[a]["error"] == "PDF is encrypted"
@@ -0,0 +1,65 @@
+import pytest
+from processors.category_index import CategoryIndex
+
+class KeywordCategorizer:
+    def __init__(self, rules):
+        self.rules = rules
+
+    def categorize(self, description):
+        for keyword, category in self.rules.items():
+            if keyword in description.lower():
+                return category
+        return "Uncategorized"
+
+@pytest.fixture
+def index(tmp_path):
+    index = CategoryIndex(str(tmp_path / "category_index.sqlite"))
+    index.add_rows(["UPI-SWIGGY BANGALORE", "AMAZON PAY INDIA", "Swiggy Instamart"],
+                   ["Food", "Shopping", "Food"])
+    yield index
+    index.close()
+
+def test_rows_containing_matches_substrings_case_insensitively(index):
+    assert index.rows_containing("swiggy") == [0, 2]
+    assert index.rows_containing("AMAZON") == [1]
+    assert index.rows_containing("zomato") == []
+
+def test_short_keywords_scan_descriptions(index):
+    assert index.rows_containing("pa") == [1]
+    assert index.rows_containing("  ") == []
+
+def test_add_rows_continues_row_ids(index):
+    index.add_rows(["ZOMATO ORDER"], ["Food"])
+    assert len(index) == 4
+    assert index.rows_containing("zomato") == [3]
+
+def test_build_replaces_rows(index):
+    index.build(["ZOMATO ORDER"], ["Food"])
+    assert len(index) == 1
+    assert index.rows_containing("swiggy") == []
+    assert index.rows_containing("zomato") == [0]
+
+def test_recategorize_returns_only_changed_rows(index):
+    categorizer = KeywordCategorizer({"instamart": "Groceries", "swiggy": "Food"})
+    assert index.recategorize("instamart", categorizer) == {2: "Groceries"}
+    # The index keeps the new category; nothing left to change
+    assert index.recategorize("instamart", categorizer) == {}
+
+def test_refs_map_rows_to_ledger_partitions(tmp_path):
+    index = CategoryIndex(str(tmp_path / "category_index.sqlite"))
+    index.add_rows(["SWIGGY", "AMAZON"], ["Food", "Shopping"], refs=[("2025-10", 0), ("2025-11", 4)])
+    assert tuple(index.ref(1)) == ("2025-11", 4)
+    index.close()
+
+def test_index_persists_with_its_source_signature(tmp_path):
+    path = str(tmp_path / "category_index.sqlite")
+    index = CategoryIndex(path)
+    assert index.source_signature is None
+    index.add_rows(["SWIGGY"], ["Food"])
+    index.source_signature = [1024, 1700000000.0]
+    index.close()
+
+    reopened = CategoryIndex(path)
+    assert reopened.source_signature == [1024, 1700000000.0]
+    assert reopened.rows_containing("swig") == [0]
+    reopened.close()
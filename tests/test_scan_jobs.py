@@ -0,0 +1,35 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("pandas")
+
+from processors.scan_jobs import ScanJobManager
+
+def wait_until_finished(job):
+    deadline = time.monotonic() + 5
+    while job.is_active and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_submit_keeps_only_the_newest_finished_jobs():
+    release = threading.Event()
+
+    def scan_fn(file_paths, **kwargs):
+        if file_paths == ["slow.pdf"]:
+            release.wait(5)
+        return None, []
+
+    manager = ScanJobManager(scan_fn, max_workers=2, keep_finished=2)
+    running = manager.submit(["slow.pdf"])
+    finished = []
+    for i in range(4):
+        job = manager.submit([f"{i}.pdf"])
+        wait_until_finished(job)
+        finished.append(job)
+    manager.submit(["last.pdf"])
+
+    # The running job is never dropped, however old
+    assert manager.get(running.job_id) is running
+    assert [manager.get(job.job_id) for job in finished] == [None, None, finished[2], finished[3]]
+    release.set()
+    manager.executor.shutdown(wait=True)
@@ -0,0 +1,98 @@
+import re
+
+# Amounts as integer paise (1/100 rupee).
+# Statement amounts are parsed once, in a single regex pass, into exact integers
+# and stay integers through extraction, staging, dedupe, matching and the ledger;
+# sums are exact. Rupees are only derived (paise / 100) for display and exports,
+# and the Excel master keeps rupee cells for people reading it.
+
+# Optional sign and currency, Indian (1,57,733.02) or western (157,733.02)
+# grouping, up to two decimals, and an optional Cr/Dr (or C/D) suffix.
+AMOUNT_RE = re.compile(
+    r'^\s*(?P<sign>[-+])?\s*(?:₹|rs\.?|inr)?\s*'
+    r'(?P<units>\d{1,3}(?:,\d{2,3})+|\d+)'
+    r'(?:\.(?P<frac>\d{1,2}))?'
+    r'\s*(?P<marker>cr|dr|c|d)?\.?\s*$',
+    re.IGNORECASE
+)
+CREDIT = "CR"
+DEBIT = "DR"
+# A Cr/Dr marker printed as its own token after the amount
+MARKER_RE = re.compile(r'^(?P<marker>cr|dr)\.?$', re.IGNORECASE)
+
+def parse_amount(text):
+    """
+    Parses an amount string into (paise, marker), e.g.
+    "1,57,733.02" -> (15773302, None), "36,089.00 Cr" -> (3608900, "CR").
+    marker is "CR", "DR" or None. Returns None if `text` is not an amount.
+    """
+    if not text:
+        return None
+    match = AMOUNT_RE.match(text)
+    if not match:
+        return None
+    sign, units, frac, marker = match.group('sign', 'units', 'frac', 'marker')
+    paise = int(units.replace(',', '')) * 100 + (int(frac.ljust(2, '0')) if frac else 0)
+    if sign == '-':
+        paise = -paise
+    if marker:
+        marker = CREDIT if marker[0] in 'cC' else DEBIT
+    return paise, marker
+
+def parse_marker(token):
+    """
+    Parses a standalone marker token ("Cr", "DR.") into "CR"/"DR"; None for
+    anything else, including amounts carrying a suffix ("12,345.00Cr").
+    """
+    match = MARKER_RE.match(token or "")
+    if not match:
+        return None
+    return CREDIT if match.group('marker')[0] in 'cC' else DEBIT
+
+def parse_amounts(series):
+    """
+    parse_amount over a pandas Series of strings.
+    Returns a DataFrame with 'paise' (nullable Int64) and 'marker' columns.
+    """
+    import pandas as pd
+    parts = series.astype("string").str.extract(AMOUNT_RE)
+    units = pd.to_numeric(parts['units'].str.replace(',', '', regex=False), errors='coerce').astype("Int64")
+    frac = pd.to_numeric(parts['frac'].fillna('0').str.ljust(2, '0'), errors='coerce').astype("Int64")
+    paise = units * 100 + frac
+    paise = paise.where(parts['sign'] != '-', -paise)
+    marker = parts['marker'].str[0].str.upper().map({'C': CREDIT, 'D': DEBIT})
+    return pd.DataFrame({"paise": paise, "marker": marker}, index=series.index)
+
+def format_paise(paise):
+    """
+    Integer paise -> exact two-decimal rupee string, e.g. 15773302 -> "157733.02".
+    """
+    sign = "-" if paise < 0 else ""
+    units, frac = divmod(abs(int(paise)), 100)
+    return f"{sign}{units}.{frac:02d}"
+
+def to_paise(amount):
+    """
+    Rupees (float, int or numeric string) -> integer paise, rounded to the nearest paisa.
+    """
+    return int(round(float(amount) * 100))
+
+def to_rupees(paise):
+    """
+    Integer paise -> rupees as the float nearest to the exact two-decimal value.
+    """
+    return paise / 100
+
+def series_to_paise(series):
+    """
+    Rupee amounts (any numeric dtype) -> nullable Int64 paise.
+    """
+    import pandas as pd
+    return (pd.to_numeric(series, errors='coerce') * 100).round().astype("Int64")
+
+def series_to_rupees(series):
+    """
+    Integer paise -> float64 rupees.
+    """
+    import pandas as pd
+    return pd.to_numeric(series, errors='coerce').astype("float64") / 100
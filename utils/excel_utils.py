@@ -0,0 +1,100 @@
+from datetime import date, datetime
+import numbers
+import pandas as pd
+
+# Streaming Excel I/O for the master workbook.
+# Reads go through openpyxl's read-only mode and writes through xlsxwriter's
+# constant_memory mode, so neither side ever holds the whole sheet in memory.
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+DEFAULT_CHUNK_ROWS = 50000
+DATE_FORMAT = "yyyy-mm-dd"
+
+def read_excel_header(path):
+    """
+    Returns the header row of the first sheet without loading the rest.
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        for row in workbook.active.iter_rows(max_row=1, values_only=True):
+            return [str(v) for v in row if v is not None]
+        return []
+    finally:
+        workbook.close()
+
+def iter_excel_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yields the first sheet as DataFrames of up to `chunk_rows` rows.
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(v) if v is not None else f"Unnamed: {i}" for i, v in enumerate(header)]
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+def _write_cell(sheet, row, col, value, date_format):
+    if value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and value != value):
+        return
+    if isinstance(value, pd.Timestamp):
+        sheet.write_datetime(row, col, value.to_pydatetime(), date_format)
+    elif isinstance(value, datetime):
+        sheet.write_datetime(row, col, value, date_format)
+    elif isinstance(value, date):
+        sheet.write_datetime(row, col, datetime(value.year, value.month, value.day), date_format)
+    elif isinstance(value, numbers.Number) and not isinstance(value, bool):
+        sheet.write_number(row, col, float(value))
+    else:
+        sheet.write_string(row, col, str(value))
+
+def write_excel(frames, dest, columns=None, sheet_name="Sheet1"):
+    """
+    Streams DataFrames into a single-sheet xlsx in constant memory, one row at a time,
+    with typed date and number cells.
+    Args:
+        frames: Iterable of DataFrames (e.g. chunks of the master plus the new rows).
+        dest: File path or writable binary file object.
+        columns (list): Header; defaults to the first frame's columns. Frames are
+            aligned to it (missing columns are left blank).
+    Returns the number of data rows written.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(dest, {'constant_memory': True})
+    sheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({'bold': True})
+    date_format = workbook.add_format({'num_format': DATE_FORMAT})
+    row = 0
+    try:
+        for frame in frames:
+            if columns is None:
+                columns = list(frame.columns)
+            if row == 0:
+                sheet.write_row(0, 0, columns, header_format)
+                row = 1
+            frame = frame.reindex(columns=columns)
+            for values in frame.itertuples(index=False, name=None):
+                for col, value in enumerate(values):
+                    _write_cell(sheet, row, col, value, date_format)
+                row += 1
+        if row == 0 and columns:
+            sheet.write_row(0, 0, columns, header_format)
+            row = 1
+    finally:
+        workbook.close()
+    return max(row - 1, 0)
@@ -0,0 +1,89 @@
+import io
+
+# format -> (mime type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+}
+
+DEFAULT_CHUNK_ROWS = 50000
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet/Arrow export needs pyarrow. Install it with: pip install pyarrow")
+
+def iter_chunks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yields successive row slices of a DataFrame (no copy of the whole frame),
+    with amounts converted from paise to rupees for the export.
+    """
+    from utils.schema_utils import with_rupees
+    for start in range(0, len(df), chunk_rows):
+        yield with_rupees(df.iloc[start:start + chunk_rows])
+
+def write_export(df, fmt, dest, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Writes a DataFrame as CSV, Parquet, Arrow IPC or xlsx, chunk by chunk.
+    Args:
+        df (DataFrame): Frame to export (e.g. the master records).
+        fmt (str): One of EXPORT_FORMATS.
+        dest: File path or writable binary file object.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+
+    if fmt == "csv":
+        _write_csv(df, dest, chunk_rows)
+    elif fmt == "xlsx":
+        from utils.excel_utils import write_excel
+        write_excel(iter_chunks(df, chunk_rows), dest, columns=list(df.columns))
+    else:
+        _write_arrow(df, fmt, dest, chunk_rows)
+
+def export_bytes(df, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Same as write_export but returns the encoded bytes (for download buttons).
+    """
+    buffer = io.BytesIO()
+    write_export(df, fmt, buffer, chunk_rows=chunk_rows)
+    return buffer.getvalue()
+
+def _write_csv(df, dest, chunk_rows):
+    own_file = isinstance(dest, str)
+    raw = open(dest, 'wb') if own_file else dest
+    try:
+        text = io.TextIOWrapper(raw, encoding='utf-8', newline='', write_through=True)
+        if len(df) == 0:
+            df.to_csv(text, index=False)
+        for i, chunk in enumerate(iter_chunks(df, chunk_rows)):
+            chunk.to_csv(text, index=False, header=(i == 0))
+        text.flush()
+        # Don't let the wrapper close the caller's file object
+        text.detach()
+    finally:
+        if own_file:
+            raw.close()
+
+def _write_arrow(df, fmt, dest, chunk_rows):
+    pa = _require_pyarrow()
+    from utils.schema_utils import with_rupees
+    schema = pa.Schema.from_pandas(with_rupees(df.iloc[:chunk_rows]), preserve_index=False)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(dest, schema)
+    else:
+        import pyarrow.ipc
+        writer = pa.ipc.new_file(dest, schema)
+
+    try:
+        for chunk in iter_chunks(df, chunk_rows):
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        writer.close()
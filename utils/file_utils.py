@@ -1,5 +1,80 @@
+import contextlib
+import json
 import os
 import shutil
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory file locks; writers in one process are still serialized
+    fcntl = None
+
+# Statement formats the pipeline ingests: PDFs plus tabular bank exports
+TABULAR_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+STATEMENT_EXTENSIONS = ('.pdf',) + TABULAR_EXTENSIONS
+
+def is_statement_file(name):
+    return str(name).lower().endswith(STATEMENT_EXTENSIONS)
+
+def is_tabular_file(name):
+    return str(name).lower().endswith(TABULAR_EXTENSIONS)
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on `path` for a read-modify-write: a thread lock
+    within this process plus an flock on "<path>.lock" across processes.
+    """
+    with _path_locks_guard:
+        thread_lock = _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def write_atomic(path, write, mode='w', opener=open):
+    """
+    Write-then-rename: `write(f)` fills a uniquely named temp file next to
+    `path`, which then replaces it, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        with opener(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_json_atomic(path, data, **dump_options):
+    write_atomic(path, lambda f: json.dump(data, f, **dump_options))
+
+def list_statement_files(directory):
+    """
+    Returns the PDF statements and CSV/XLS exports in the given directory.
+    """
+    if not os.path.exists(directory):
+        return []
+
+    return [
+        os.path.join(directory, f)
+        for f in os.listdir(directory)
+        if is_statement_file(f)
+    ]
 
 def list_pdf_files(directory):
     """
@@ -77,7 +152,7 @@ def reset_processed_files(processed_dir, raw_dir):
         
     for filename in os.listdir(processed_dir):
         src = os.path.join(processed_dir, filename)
-        if os.path.isfile(src) and filename.lower().endswith('.pdf'):
+        if os.path.isfile(src) and is_statement_file(filename):
             try:
                 # Use move_file logic or simple shutil
                 # We can reuse move_file but we need to handle the import or just simple move logic
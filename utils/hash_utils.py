@@ -1,4 +1,5 @@
 import hashlib
+from utils.amount_utils import format_paise
 
 def generate_transaction_hash(date, amount, description, source):
     """
@@ -15,3 +16,53 @@ def generate_transaction_hash(date, amount, description, source):
     
     # Generate SHA-256 hash
     return hashlib.sha256(unique_str.encode('utf-8')).hexdigest()
+
+def generate_content_hash(data):
+    """
+    Generates a SHA-256 hash of raw file content (bytes), used to recognise
+    the same statement regardless of its file name.
+    """
+    return hashlib.sha256(bytes(data)).hexdigest()
+
+def generate_file_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Same as generate_content_hash, but streams the file from disk in chunks.
+    """
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+DIGEST_SIZE = 16
+
+def _normalize_date(date):
+    if not date:
+        return ""
+    if hasattr(date, 'strftime'):
+        return date.strftime("%Y-%m-%d")
+    return str(date)[:10]
+
+def _normalize_amount(paise):
+    try:
+        return format_paise(paise)
+    except (TypeError, ValueError):
+        return ""
+
+def generate_transaction_digest(date, paise, description, source):
+    """
+    Compact 16-byte BLAKE2b digest of a transaction (amount in integer paise).
+    Inputs are normalized (YYYY-MM-DD dates, 2-decimal amounts) so the digest
+    can be recomputed from rows read back from the master file; digests match
+    those written when amounts were rupee floats.
+    """
+    desc_str = str(description).strip().lower() if description else ""
+    source_str = str(source).strip().lower() if source else ""
+    unique_str = f"{_normalize_date(date)}|{_normalize_amount(paise)}|{desc_str}|{source_str}"
+    return hashlib.blake2b(unique_str.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+def legacy_hash_to_key(hex_hash):
+    """
+    Truncates a legacy 64-char SHA-256 hex hash to a 16-byte key.
+    """
+    return bytes.fromhex(hex_hash[:DIGEST_SIZE * 2])
@@ -0,0 +1,18 @@
+import os
+
+def current_rss_mb():
+    """
+    Returns the resident set size of this process in MB, or None if it cannot be read.
+    Uses /proc on Linux and falls back to psutil when installed.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
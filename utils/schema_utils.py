@@ -0,0 +1,78 @@
+import pandas as pd
+
+# One explicit dtype schema for staging and master frames.
+# Repeated strings (category, source, file) become categoricals, dates datetime64,
+# hashes a compact Arrow string column, and amounts integer paise (nullable int64,
+# see utils/amount_utils.py). Frames are converted to rupees only for display and
+# exports (with_rupees).
+
+DATE_COLUMNS = ["Date"]
+CATEGORICAL_COLUMNS = ["Category", "Source", "_filepath", "_fingerprint"]
+HASH_COLUMNS = ["Hash", "Possible Duplicate Of"]
+AMOUNT_COLUMNS = ["Amount"]
+# Nullable so a blank cell in an edited master doesn't fail the whole load
+AMOUNT_DTYPE = "Int64"
+
+def _hash_dtype():
+    # Arrow-backed strings keep 32-char hex digests in one contiguous buffer
+    # instead of a Python str object per row; fall back to object without pyarrow
+    try:
+        import pyarrow
+        return "string[pyarrow]"
+    except ImportError:
+        return object
+
+def apply_schema(df):
+    """
+    Returns `df` with the transaction schema applied to whichever of its columns exist.
+    Safe to call repeatedly (already-typed columns are left as they are).
+    """
+    if df is None or df.empty:
+        return df
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns and df[col].dtype != AMOUNT_DTYPE:
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype(AMOUNT_DTYPE)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    hash_dtype = _hash_dtype()
+    for col in HASH_COLUMNS:
+        if col in df.columns and df[col].dtype != hash_dtype:
+            df[col] = df[col].astype(hash_dtype)
+    return df
+
+def with_rupees(df):
+    """
+    Copy of a frame with amount columns in rupees (float), for display and exports.
+    """
+    from utils.amount_utils import series_to_rupees
+    if df is None or df.empty:
+        return df
+    columns = [col for col in AMOUNT_COLUMNS if col in df.columns]
+    if not columns:
+        return df
+    return df.assign(**{col: series_to_rupees(df[col]) for col in columns})
+
+def as_editable(df, columns=CATEGORICAL_COLUMNS):
+    """
+    Turns categorical columns back into plain values so new labels can be assigned
+    (e.g. before re-categorizing rows in place).
+    """
+    for col in columns:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+def concat_frames(frames):
+    """
+    Concatenates frames and re-applies the schema (categoricals with different
+    categories would otherwise fall back to object).
+    """
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    return apply_schema(pd.concat(frames, ignore_index=True))